@@ -0,0 +1,285 @@
+# bench.py
+"""
+Benchmark suite for fava-forecast.
+
+Generates (or reuses) a seeded synthetic ledger, times the main entry points
+and writes the results as JSON. Compare two result files from the same
+machine to spot regressions between commits:
+
+  python benchmarks/bench.py --size small --out before.json
+  git checkout <other-commit>
+  python benchmarks/bench.py --size small --out after.json --compare before.json
+
+Requires fava-forecast to be importable (pip install -e .); the
+BudgetForecast.data case also needs fava and flask.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, replace
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+from synth import LedgerSpec, generate
+
+import fava_forecast.beancount_io as bio
+from fava_forecast.budgets import budget_items_from_entries, budget_table, clear_budget_cache, load_budget_items
+from fava_forecast.forecast import run_budget_report, run_forecast
+from fava_forecast.infer import infer_budgets
+from fava_forecast.instrument import Recorder, recording
+from fava_forecast.rates import clear_rate_cache, load_prices_to_op
+
+
+SIZES: Dict[str, LedgerSpec] = {
+    "tiny": LedgerSpec(postings=1_000, future_postings=100, prices=10, budgets=50),
+    "small": LedgerSpec(postings=10_000, future_postings=1_000, prices=100, budgets=500),
+    "medium": LedgerSpec(postings=100_000, future_postings=5_000, prices=1_000, budgets=2_000),
+    "large": LedgerSpec(postings=1_000_000, future_postings=20_000, prices=10_000, budgets=5_000),
+}
+
+
+# ----------------------------------------------------------------
+# Timing
+# ----------------------------------------------------------------
+def measure(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    """Run `fn` `repeat` times (calling `setup` before each run, untimed)."""
+    runs: List[float] = []
+    counters: Dict[str, int] = {}
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        rec = Recorder()
+        with recording(rec):
+            start = time.perf_counter()
+            fn()
+            runs.append(time.perf_counter() - start)
+        counters = rec.as_dict()["counters"]  # same work every run; keep the last
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "runs": runs,
+        "counters": counters,
+    }
+
+
+def _cold_start() -> None:
+    """Drop the parsed ledgers, rate tables and budgets kept in this process."""
+    with bio._LEDGERS_LOCK:
+        bio._LEDGERS.clear()
+    clear_rate_cache()
+    clear_budget_cache()
+
+
+# ----------------------------------------------------------------
+# Cases
+# ----------------------------------------------------------------
+def _csv_lines(n: int) -> List[str]:
+    curs = ["CRC", "USD", "EUR", "GBP", "BTC.X"]
+    lines = ["currency," + ",".join(f"sum(position) ({c})" for c in curs)]
+    for i in range(n):
+        col = i % len(curs)
+        cells = [""] * len(curs)
+        cells[col] = f"{i * 1.25:.2f}"
+        lines.append(f"{curs[col]}," + ",".join(cells))
+    return lines
+
+
+def _table_lines(n: int) -> List[str]:
+    curs = ["CRC", "USD", "EUR", "GBP", "BTC.X"]
+    return [f"{curs[i % len(curs)]:<8}{i * 1.25:>14.2f} {curs[i % len(curs)]}" for i in range(n)]
+
+
+def build_cases(paths: Dict[str, str], spec: LedgerSpec) -> Dict[str, Dict[str, Any]]:
+    today = datetime.date.fromisoformat(spec.today)
+    until = (today + datetime.timedelta(days=90)).isoformat()
+    forecast_kwargs = dict(
+        journal=paths["main"],
+        budgets=paths["budgets"],
+        prices=paths["prices"],
+        until=until,
+        today=spec.today,
+        future_journal=paths["future"],
+        accounts=paths["accounts"],
+        cache=None,
+    )
+    budget_items = load_budget_items(paths["budgets"])
+    budget_entries = bio.load_ledger(paths["budgets"])[0] if bio.api_available() else []
+    main_entries = bio.load_ledger(paths["main"])[0]
+    tables = {mode: budget_table(budget_items, mode) for mode in ("average", "calendar", "lump")}
+    weeks = [today + datetime.timedelta(days=7 * w) for w in range(1, 53)]
+    csv_lines = _csv_lines(10_000)
+    table_lines = _table_lines(10_000)
+
+    cases: Dict[str, Dict[str, Any]] = {
+        "run_forecast[api,cold]": {
+            "fn": lambda: run_forecast(engine="api", **forecast_kwargs),
+            "setup": _cold_start,
+        },
+        "run_forecast[api,warm]": {
+            "fn": lambda: run_forecast(engine="api", **forecast_kwargs),
+        },
+        "run_forecast[subprocess]": {
+            "fn": lambda: run_forecast(engine="subprocess", **forecast_kwargs),
+        },
+        "run_budget_report[api]": {
+            "fn": lambda: run_budget_report(paths["main"], paths["budgets"], paths["prices"], today=spec.today,
+                                            engine="api", cache=None),
+        },
+        "load_prices_to_op": {
+            "fn": lambda: load_prices_to_op(paths["prices"], "CRC", today),
+            "setup": clear_rate_cache,
+        },
+        "load_budget_items": {
+            "fn": lambda: load_budget_items(paths["budgets"]),
+        },
+        "budget_items_from_entries": {
+            "fn": lambda: budget_items_from_entries(budget_entries),
+        },
+        "budget_totals[52 windows]": {
+            "fn": lambda: tables["average"].totals(today, weeks),
+        },
+        "budget_totals[calendar,52 windows]": {
+            "fn": lambda: tables["calendar"].totals(today, weeks),
+        },
+        "budget_totals[lump,52 windows]": {
+            "fn": lambda: tables["lump"].totals(today, weeks),
+        },
+        "budget_breakdown[by account,52 windows]": {
+            "fn": lambda: [w.by_account for w in tables["average"].breakdown(today, weeks)],
+        },
+        "infer_budgets[seasonal]": {
+            "fn": lambda: infer_budgets(main_entries, today, seasonal=True),
+        },
+        "beanquery_csv_amounts[10k]": {
+            "fn": lambda: bio.beanquery_csv_amounts(csv_lines),
+        },
+        "beanquery_grouped_amounts[10k]": {
+            "fn": lambda: bio.beanquery_grouped_amounts(table_lines),
+        },
+    }
+
+    data_case = _fava_data_case(paths, spec, until)
+    if data_case is not None:
+        cases["BudgetForecast.data"] = data_case
+    return cases
+
+
+def _fava_data_case(paths: Dict[str, str], spec: LedgerSpec, until: str) -> Optional[Dict[str, Any]]:
+    try:
+        from flask import Flask
+        import fava_forecast.fava_ext as fx
+    except ImportError:
+        return None
+
+    class _Ledger:
+        beancount_file_path = paths["main"]
+        options = {"filename": paths["main"]}
+
+    app = Flask(__name__)
+    url = f"/extension/budget-forecast/?today={spec.today}&until={until}&currency=CRC"
+    state: Dict[str, Any] = {}
+
+    def setup() -> None:
+        # fresh extension -> no per-parameter result cache between runs
+        state["ext"] = fx.BudgetForecast(_Ledger(), config="engine=api")
+
+    def run() -> None:
+        with app.test_request_context(url):
+            state["ext"].data()
+
+    return {"fn": run, "setup": setup}
+
+
+# ----------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print median time per case relative to `baseline` (ratio > 1 is slower)."""
+    print(f"\n{'case':<34} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, res in current["results"].items():
+        old = baseline.get("results", {}).get(name)
+        if old is None:
+            print(f"{name:<34} {'—':>10} {res['median'] * 1000:>8.1f}ms {'new':>7}")
+            continue
+        ratio = res["median"] / old["median"] if old["median"] else float("inf")
+        print(f"{name:<34} {old['median'] * 1000:>8.1f}ms {res['median'] * 1000:>8.1f}ms {ratio:>6.2f}x")
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    ap = argparse.ArgumentParser(description="fava-forecast benchmarks")
+    ap.add_argument("--size", choices=SIZES, default="small", help="Ledger size preset (default: small)")
+    ap.add_argument("--postings", type=int, help="Override postings in main.bean")
+    ap.add_argument("--prices", type=int, help="Override number of price lines")
+    ap.add_argument("--budgets", type=int, help="Override number of budget lines")
+    ap.add_argument("--seed", type=int, default=0, help="Generator seed (default: 0)")
+    ap.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: 5)")
+    ap.add_argument("--only", action="append", default=[],
+                    help="Run only cases whose name contains this text (repeatable)")
+    ap.add_argument("--data-dir", default=None,
+                    help="Where to keep generated ledgers (default: a temp dir per spec)")
+    ap.add_argument("--out", default=None, help="Write JSON results to this file")
+    ap.add_argument("--compare", default=None, help="Baseline JSON file to compare against")
+    args = ap.parse_args(argv)
+
+    spec = replace(SIZES[args.size], seed=args.seed)
+    for field in ("postings", "prices", "budgets"):
+        if getattr(args, field) is not None:
+            spec = replace(spec, **{field: getattr(args, field)})
+
+    tag = f"{spec.postings}p-{spec.prices}x-{spec.budgets}b-s{spec.seed}"
+    data_dir = args.data_dir or os.path.join(tempfile.gettempdir(), "fava-forecast-bench", tag)
+    print(f"Ledger: {tag} in {data_dir}")
+    paths = generate(data_dir, spec)
+
+    results: Dict[str, Any] = {}
+    for name, case in build_cases(paths, spec).items():
+        if args.only and not any(o in name for o in args.only):
+            continue
+        res = measure(case["fn"], args.repeat, case.get("setup"))
+        results[name] = res
+        print(f"{name:<34} median {res['median'] * 1000:>10.1f} ms   min {res['min'] * 1000:>10.1f} ms")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "spec": asdict(spec),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=lambda o: str(o) if isinstance(o, Decimal) else o)
+        print(f"Results written to {args.out}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# synth.py
+"""
+Seeded generator of synthetic ledgers for the benchmarks.
+
+Writes main.bean (includes accounts.bean), future.bean, accounts.bean,
+prices.bean and budgets.bean. The same seed and sizes always produce
+byte-identical files, so timings from different commits are comparable.
+"""
+import datetime
+import json
+import os
+import random
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+
+OP_CURRENCY = "CRC"
+CURRENCIES = ["USD", "EUR", "GBP", "JPY", "BTC", "ETH", "MXN", "CAD", "CHF", "VBTLX"]
+FREQS = ["weekly", "monthly", "quarterly", "yearly"]
+
+
+@dataclass(frozen=True)
+class LedgerSpec:
+    postings: int = 1_000          # postings in main.bean (two per transaction)
+    future_postings: int = 200     # postings in future.bean (all #planned)
+    prices: int = 10               # price lines
+    budgets: int = 100             # custom "budget" lines
+    expense_accounts: int = 50
+    seed: int = 0
+    today: str = "2025-01-01"      # main.bean ends here, future.bean starts here
+    days: int = 365                # history length before `today`
+
+
+def _accounts(spec: LedgerSpec) -> List[str]:
+    accounts = [
+        "Assets:Bank:Checking",
+        "Assets:Bank:Savings",
+        "Assets:Broker",
+        "Liabilities:Card",
+        "Income:Salary",
+        "Income:Interest",
+        "Equity:Opening",
+    ]
+    accounts += [f"Expenses:Cat{i:04d}" for i in range(spec.expense_accounts)]
+    return accounts
+
+
+def _amount(rng: random.Random) -> str:
+    return f"{rng.randint(100, 2_000_000) / 100:.2f}"
+
+
+def _write_accounts(path: str, spec: LedgerSpec) -> None:
+    start = datetime.date.fromisoformat(spec.today) - datetime.timedelta(days=spec.days + 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for cur in [OP_CURRENCY] + CURRENCIES:
+            f.write(f"{start} commodity {cur}\n")
+        for acc in _accounts(spec):
+            f.write(f"{start} open {acc}\n")
+
+
+def _write_transactions(f, rng: random.Random, spec: LedgerSpec, n_postings: int,
+                        first: datetime.date, days: int, planned: bool) -> None:
+    expenses = [a for a in _accounts(spec) if a.startswith("Expenses:")]
+    tag = " #planned" if planned else ""
+    for i in range(max(n_postings // 2, 0)):
+        date = first + datetime.timedelta(days=i * days // max(n_postings // 2, 1))
+        cur = OP_CURRENCY if rng.random() < 0.8 else rng.choice(CURRENCIES[:3])
+        kind = rng.random()
+        if kind < 0.1:
+            f.write(f'{date} * "Salary {i}"{tag}\n')
+            f.write(f"  Assets:Bank:Checking  {_amount(rng)} {cur}\n")
+            f.write("  Income:Salary\n\n")
+        elif kind < 0.2:
+            f.write(f'{date} * "Card {i}"{tag}\n')
+            f.write(f"  {rng.choice(expenses)}  {_amount(rng)} {cur}\n")
+            f.write("  Liabilities:Card\n\n")
+        else:
+            f.write(f'{date} * "Payee {rng.randrange(500)}" "Purchase {i}"{tag}\n')
+            f.write(f"  {rng.choice(expenses)}  {_amount(rng)} {cur}\n")
+            f.write("  Assets:Bank:Checking\n\n")
+
+
+def _write_main(path: str, rng: random.Random, spec: LedgerSpec) -> None:
+    today = datetime.date.fromisoformat(spec.today)
+    start = today - datetime.timedelta(days=spec.days)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'option "operating_currency" "{OP_CURRENCY}"\n')
+        f.write('include "accounts.bean"\n\n')
+        f.write(f'{start} * "Opening balance"\n')
+        f.write(f"  Assets:Bank:Checking  50000000.00 {OP_CURRENCY}\n")
+        f.write("  Equity:Opening\n\n")
+        _write_transactions(f, rng, spec, spec.postings, start, spec.days, planned=False)
+
+
+def _write_future(path: str, rng: random.Random, spec: LedgerSpec) -> None:
+    today = datetime.date.fromisoformat(spec.today)
+    with open(path, "w", encoding="utf-8") as f:
+        _write_transactions(f, rng, spec, spec.future_postings, today, 365, planned=True)
+
+
+def _write_prices(path: str, rng: random.Random, spec: LedgerSpec) -> None:
+    today = datetime.date.fromisoformat(spec.today)
+    base = {cur: rng.uniform(0.5, 900.0) for cur in CURRENCIES}
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(spec.prices):
+            cur = CURRENCIES[i % len(CURRENCIES)]
+            date = today - datetime.timedelta(days=(spec.prices - i) * spec.days // max(spec.prices, 1))
+            if cur in ("ETH", "VBTLX"):
+                quote = "USD"  # crossed through USD
+            else:
+                quote = OP_CURRENCY
+            value = base[cur] * rng.uniform(0.9, 1.1)
+            f.write(f"{date} price {cur} {value:.4f} {quote}\n")
+
+
+def _write_budgets(path: str, rng: random.Random, spec: LedgerSpec) -> None:
+    today = datetime.date.fromisoformat(spec.today)
+    expenses = [a for a in _accounts(spec) if a.startswith("Expenses:")]
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(spec.budgets):
+            start = today - datetime.timedelta(days=rng.randrange(spec.days))
+            cur = OP_CURRENCY if rng.random() < 0.9 else "USD"
+            f.write(
+                f'{start} custom "budget" "{expenses[i % len(expenses)]}" '
+                f'"{rng.choice(FREQS)}" {rng.randint(1, 50_000)} {cur}\n'
+            )
+
+
+def generate(out_dir: str, spec: LedgerSpec) -> Dict[str, str]:
+    """
+    Write a synthetic ledger for `spec` into `out_dir` and return its paths.
+    Files are reused when `out_dir` already holds a ledger for the same spec.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    names = ("main", "future", "accounts", "prices", "budgets")
+    paths = {name: os.path.join(out_dir, f"{name}.bean") for name in names}
+    manifest = os.path.join(out_dir, "spec.json")
+
+    try:
+        with open(manifest, "r", encoding="utf-8") as f:
+            if json.load(f) == asdict(spec) and all(os.path.exists(p) for p in paths.values()):
+                return paths
+    except (OSError, ValueError):
+        pass
+
+    rng = random.Random(spec.seed)
+    _write_accounts(paths["accounts"], spec)
+    _write_main(paths["main"], rng, spec)
+    _write_future(paths["future"], rng, spec)
+    _write_prices(paths["prices"], rng, spec)
+    _write_budgets(paths["budgets"], rng, spec)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump(asdict(spec), f, indent=2)
+    return paths
@@ -0,0 +1,204 @@
+import datetime
+from bisect import bisect_right
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+Row = Tuple[str, Decimal]  # (currency, amount)
+Buckets = Dict[str, Dict[str, Decimal]]  # bucket -> {currency: amount}
+
+# Bucket names, in the order run_forecast reports them
+BUCKETS = ("assets", "liabs", "income", "expenses")
+
+
+# ----------------------------------------------------------------
+# Single-pass aggregation over loaded entries
+# ----------------------------------------------------------------
+def aggregate_buckets(
+    entries: Iterable,
+    today: datetime.date,
+    until: datetime.date,
+) -> Buckets:
+    """
+    Walk the postings of all transactions once and fill every forecast bucket.
+
+    Equivalent to the four grouped queries in forecast.py:
+      assets / liabs     - date < until, excluding #planned transactions
+      income / expenses  - today <= date < until (all transactions)
+
+    Amounts are posting units summed per currency.
+    """
+    return aggregate_horizons(entries, today, [until])[0]
+
+
+def aggregate_horizons(
+    entries: Iterable,
+    today: datetime.date,
+    untils: Sequence[datetime.date],
+) -> List[Buckets]:
+    """
+    `aggregate_buckets` for several `until` dates in one pass.
+
+    `untils` must be sorted ascending. Each posting is added to the slice
+    between the two cutoffs around its date (found by bisection); the slices
+    are then summed cumulatively, so result k covers every date < untils[k].
+    """
+    if not untils:
+        return []
+    last = untils[-1]
+    bins: List[Buckets] = [{name: {} for name in BUCKETS} for _ in untils]
+
+    for entry in entries:
+        postings = getattr(entry, "postings", None)
+        if not postings:
+            continue
+        date = entry.date
+        if date >= last:
+            continue
+        part = bins[bisect_right(untils, date)]
+        in_window = date >= today
+        planned = "planned" in (entry.tags or ())
+
+        for p in postings:
+            account = p.account
+            if account.startswith("Assets"):
+                if planned:
+                    continue
+                acc = part["assets"]
+            elif account.startswith("Liabilities"):
+                if planned:
+                    continue
+                acc = part["liabs"]
+            elif in_window and account.startswith("Income"):
+                acc = part["income"]
+            elif in_window and account.startswith("Expenses"):
+                acc = part["expenses"]
+            else:
+                continue
+            units = p.units
+            if units is None or units.number is None:
+                continue
+            cur = units.currency
+            acc[cur] = acc.get(cur, Decimal("0")) + units.number
+
+    return cumulative_buckets(bins)
+
+
+# ----------------------------------------------------------------
+# Actual spending per budgeted account
+# ----------------------------------------------------------------
+def _owner(account: str, since: Dict[str, datetime.date], memo: Dict[str, Optional[str]]) -> Optional[str]:
+    """The deepest account in `since` that is `account` or one of its parents."""
+    try:
+        return memo[account]
+    except KeyError:
+        pass
+    name: Optional[str] = account
+    while name is not None and name not in since:
+        name = name.rsplit(":", 1)[0] if ":" in name else None
+    memo[account] = name
+    return name
+
+
+def aggregate_spending(
+    entries: Iterable,
+    since: Dict[str, datetime.date],
+    until: datetime.date,
+) -> Dict[str, Dict[str, Decimal]]:
+    """
+    Actual spending per budgeted account in one pass over the postings.
+
+    `since` maps each budgeted account to the first day counted for it; a
+    posting on an Expenses account counts toward its deepest budgeted parent
+    (or itself) when dated in [since[parent], until). Transactions tagged
+    #planned are skipped. Returns {account: {currency: amount}}.
+    """
+    if not since:
+        return {}
+    first = min(since.values())
+    memo: Dict[str, Optional[str]] = {}
+    out: Dict[str, Dict[str, Decimal]] = {}
+    for entry in entries:
+        postings = getattr(entry, "postings", None)
+        if not postings:
+            continue
+        date = entry.date
+        if date < first or date >= until or "planned" in (entry.tags or ()):
+            continue
+        for p in postings:
+            if not p.account.startswith("Expenses"):
+                continue
+            owner = _owner(p.account, since, memo)
+            if owner is None or date < since[owner]:
+                continue
+            units = p.units
+            if units is None or units.number is None:
+                continue
+            acc = out.setdefault(owner, {})
+            acc[units.currency] = acc.get(units.currency, Decimal("0")) + units.number
+    return out
+
+
+def bin_spending_rows(
+    rows: Iterable[Tuple[datetime.date, str, str, Decimal]],
+    since: Dict[str, datetime.date],
+    until: datetime.date,
+) -> Dict[str, Dict[str, Decimal]]:
+    """`aggregate_spending` over (date, account, currency, amount) rows grouped by date."""
+    memo: Dict[str, Optional[str]] = {}
+    out: Dict[str, Dict[str, Decimal]] = {}
+    for date, account, cur, amt in rows:
+        owner = _owner(account, since, memo)
+        if owner is None or date < since[owner] or date >= until:
+            continue
+        acc = out.setdefault(owner, {})
+        acc[cur] = acc.get(cur, Decimal("0")) + amt
+    return out
+
+
+def cumulative_buckets(bins: Iterable[Buckets], names: Iterable[str] = BUCKETS) -> List[Buckets]:
+    """Running totals of consecutive bucket slices: result k = bins[0] + ... + bins[k]."""
+    names = tuple(names)
+    out: List[Buckets] = []
+    running: Buckets = {name: {} for name in names}
+    for part in bins:
+        running = merge_buckets([running, part], names)
+        out.append(running)
+    return out
+
+
+def bin_dated_rows(
+    rows: Iterable[Tuple[datetime.date, str, Decimal]],
+    untils: Sequence[datetime.date],
+) -> List[List[Row]]:
+    """
+    Cumulative (currency, amount) rows per cutoff from date-grouped rows:
+    result k sums every row dated before untils[k] (sorted ascending).
+    """
+    if not untils:
+        return []
+    last = untils[-1]
+    bins: List[Buckets] = [{"rows": {}} for _ in untils]
+    for date, cur, amt in rows:
+        if date >= last:
+            continue
+        acc = bins[bisect_right(untils, date)]["rows"]
+        acc[cur] = acc.get(cur, Decimal("0")) + amt
+    return [bucket_rows(b, "rows") for b in cumulative_buckets(bins, ("rows",))]
+
+
+def merge_buckets(parts: Iterable[Buckets], names: Iterable[str] = BUCKETS) -> Buckets:
+    """Sum several bucket dicts (e.g. one per journal), keeping first-seen currency order."""
+    names = tuple(names)
+    out: Buckets = {name: {} for name in names}
+    for part in parts:
+        for name in names:
+            acc = out[name]
+            for cur, amt in part.get(name, {}).items():
+                acc[cur] = acc.get(cur, Decimal("0")) + amt
+    return out
+
+
+def bucket_rows(buckets: Buckets, name: str) -> List[Row]:
+    """Bucket as a (currency, amount) row list, as returned by the grouped queries."""
+    return list(buckets.get(name, {}).items())
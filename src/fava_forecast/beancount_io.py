@@ -1,17 +1,67 @@
 # beancount_io.py
+import asyncio
+import csv
+import datetime
+import io
+import json
 import os
 import re
+import socket
 import subprocess
+import threading
 from decimal import Decimal
-from typing import List, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .errors import WorkerUnavailableError
+from .instrument import count, stage
+
+try:
+    from beancount import loader as bc_loader
+    from beancount.parser import printer as bc_printer
+    from beanquery.query import run_query as bq_run_query
+    from beanquery.query_render import render_csv as bq_render_csv
+    from beanquery.query_render import render_text as bq_render_text
+except ImportError:  # pragma: no cover - exercised only without beancount/beanquery
+    bc_loader = None
+    bc_printer = None
+    bq_run_query = None
+    bq_render_csv = None
+    bq_render_text = None
 
 
 Row = Tuple[str, Decimal]  # (currency, amount)
 
+# Query engines:
+#   "api"        - load the ledger once and query it through the beanquery API
+#   "subprocess" - spawn `bean-query` for every query (legacy path)
+#   "auto"       - "api" when beancount/beanquery are importable, else "subprocess"
+ENGINES = ("auto", "api", "subprocess")
+
+# Unix socket of a resident bean-query worker (see worker.py); when set and
+# reachable, the subprocess engine sends its queries there instead
+WORKER_ENV = "FAVA_FORECAST_WORKER"
+
+# Any valid Beancount commodity name (same shape as beancount.core.amount.CURRENCY_RE)
+CURRENCY_PATTERN = r"[A-Z][A-Z0-9'._-]*[A-Z0-9]?|/[A-Z0-9'._-]*[A-Z](?:[A-Z0-9'._-]*[A-Z0-9])?"
+
+_TABLE_DECOR = "─=|+- "
+
+_RX_GROUPED_LINE = re.compile(
+    rf"^({CURRENCY_PATTERN})\s+([-+]?\d[\d_,]*(?:\.\d+)?)\s+(?:{CURRENCY_PATTERN})$"
+)
+
 
 # ----------------------------------------------------------------
 # Core bean-query runners
 # ----------------------------------------------------------------
+def _run_bean_query(cmd: List[str]) -> "subprocess.CompletedProcess[str]":
+    with stage("bean-query"):
+        proc = subprocess.run(cmd, text=True, capture_output=True)
+    count("subprocesses")
+    count("bytes_parsed", len(proc.stdout))
+    return proc
+
+
 def beanquery_run_lines(journal_path: str, query: str) -> tuple[List[str], List[str]]:
     """
     Run `bean-query` on the given journal and return (lines, warnings).
@@ -19,8 +69,15 @@ def beanquery_run_lines(journal_path: str, query: str) -> tuple[List[str], List[
     if not os.path.exists(journal_path):
         raise FileNotFoundError(f"Journal file not found: {journal_path}")
 
+    sock = worker_socket()
+    if sock is not None:
+        try:
+            return worker_query(sock, journal_path, query, "text")
+        except WorkerUnavailableError:
+            pass  # fall back to a one-off bean-query process
+
     cmd = ["bean-query", journal_path, query]
-    proc = subprocess.run(cmd, text=True, capture_output=True)
+    proc = _run_bean_query(cmd)
     if proc.returncode != 0:
         raise RuntimeError(f"bean-query failed: {proc.stderr.strip() or proc.stdout.strip()}")
 
@@ -41,7 +98,7 @@ def beanquery_table_body(lines: List[str]) -> List[str]:
     body: List[str] = []
     for ln in lines:
         # Skip decorative/separator lines
-        if set(ln).issubset(set("─=|+- ")):
+        if not ln.strip(_TABLE_DECOR):
             continue
         # Skip header or summary lines
         if ln.lower().startswith(("currency", "sum", "total")):
@@ -63,8 +120,9 @@ def beanquery_grouped_amounts(body_lines: List[str]) -> List[Row]:
       [('USD', Decimal('10.00')), ('CRC', Decimal('1000.00'))]
     """
     out: List[Row] = []
-    rx = re.compile(r"^([A-Z]{2,6})\s+([-+]?\d[\d_,]*(?:\.\d+)?)\s+[A-Z]{2,6}$")
+    rx = _RX_GROUPED_LINE
 
+    count("rows_parsed", len(body_lines))
     for ln in body_lines:
         m = rx.match(ln.strip())
         if not m:
@@ -75,6 +133,488 @@ def beanquery_grouped_amounts(body_lines: List[str]) -> List[Row]:
     return out
 
 
+# ----------------------------------------------------------------
+# Machine-readable output (bean-query -f csv -m)
+# ----------------------------------------------------------------
+def beanquery_run_csv(journal_path: str, query: str) -> tuple[List[str], List[str]]:
+    """
+    Run `bean-query` with numberified CSV output and return (lines, warnings).
+    Numberified inventories come out as one plain number column per currency.
+    """
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"Journal file not found: {journal_path}")
+
+    sock = worker_socket()
+    if sock is not None:
+        try:
+            return worker_query(sock, journal_path, query, "csv")
+        except WorkerUnavailableError:
+            pass  # fall back to a one-off bean-query process
+
+    cmd = ["bean-query", "-f", "csv", "-m", journal_path, query]
+    proc = _run_bean_query(cmd)
+    if proc.returncode != 0:
+        raise RuntimeError(f"bean-query failed: {proc.stderr.strip() or proc.stdout.strip()}")
+
+    warns = [ln.strip() for ln in proc.stderr.splitlines() if ln.strip()]
+    return proc.stdout.splitlines(), warns
+
+
+def _csv_amount_cells(lines: Iterable[str], cur_col: int) -> Iterator[Tuple[List[str], str, Decimal]]:
+    """
+    Yield (row, currency, amount) from numberified CSV whose currency is in
+    column `cur_col` and whose amounts follow it.
+    """
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header or len(header) < cur_col + 2:
+        return
+
+    by_cur: Dict[str, int] = {}
+    for idx, name in enumerate(header[cur_col + 1:], start=cur_col + 1):
+        if name.endswith(")") and " (" in name:
+            by_cur[name[name.rindex(" (") + 2:-1]] = idx
+    single = cur_col + 1 if not by_cur else None
+
+    for row in reader:
+        if len(row) <= cur_col:
+            continue
+        cur = row[cur_col]
+        idx = single if single is not None else by_cur.get(cur)
+        if idx is None or idx >= len(row):
+            continue
+        cell = row[idx].strip()
+        if not cell:
+            continue
+        yield row, cur, Decimal(cell.replace(",", "").replace("_", ""))
+    count("rows_parsed", reader.line_num - 1)
+
+
+def beanquery_csv_amounts(lines: Iterable[str]) -> List[Row]:
+    """
+    Parse numberified CSV from a grouped (currency, amount) query in one pass.
+
+    Input example:
+      ['currency,sum(position) (USD),sum(position) (BTC.X)',
+       'USD,10.00,',
+       'BTC.X,,0.5']
+    Output:
+      [('USD', Decimal('10.00')), ('BTC.X', Decimal('0.5'))]
+
+    The header is inspected once to map each per-currency column; a single
+    untagged amount column (e.g. sum(number)) is used for every row.
+    """
+    return [(cur, amt) for _row, cur, amt in _csv_amount_cells(lines, 0)]
+
+
+def beanquery_csv_dated_amounts(lines: Iterable[str]) -> List[Tuple[datetime.date, str, Decimal]]:
+    """
+    Parse numberified CSV from a (date, currency, amount) query grouped by date.
+
+    Input example:
+      ['date,currency,sum(position) (CRC)',
+       '2025-01-01,CRC,100']
+    Output:
+      [(date(2025, 1, 1), 'CRC', Decimal('100'))]
+    """
+    return [
+        (datetime.date.fromisoformat(row[0]), cur, amt)
+        for row, cur, amt in _csv_amount_cells(lines, 1)
+    ]
+
+
+def beanquery_csv_account_amounts(lines: Iterable[str]) -> List[Tuple[datetime.date, str, str, Decimal]]:
+    """
+    Parse numberified CSV from a (date, account, currency, amount) query
+    grouped by date, account and currency.
+
+    Input example:
+      ['date,account,currency,sum(position) (CRC)',
+       '2025-01-01,Expenses:Food,CRC,100']
+    Output:
+      [(date(2025, 1, 1), 'Expenses:Food', 'CRC', Decimal('100'))]
+    """
+    return [
+        (datetime.date.fromisoformat(row[0]), row[1], cur, amt)
+        for row, cur, amt in _csv_amount_cells(lines, 2)
+    ]
+
+
+# ----------------------------------------------------------------
+# In-process engine (beancount.loader + beanquery API)
+# ----------------------------------------------------------------
+# Parsed ledgers keyed by absolute journal path:
+#   path -> (stamp, entries, errors, options)
+_LEDGERS: Dict[str, Tuple[Any, list, list, dict]] = {}
+_LEDGERS_MAX = 4
+_LEDGERS_LOCK = threading.Lock()
+
+
+def api_available() -> bool:
+    """True if the in-process engine (beancount + beanquery) can be used."""
+    return bc_loader is not None and bq_run_query is not None
+
+
+def resolve_engine(engine: str) -> str:
+    """Map an engine name from ENGINES to the concrete "api" or "subprocess"."""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown query engine: {engine!r} (expected one of {', '.join(ENGINES)})")
+    if engine == "auto":
+        return "api" if api_available() else "subprocess"
+    if engine == "api" and not api_available():
+        raise RuntimeError("In-process engine requires the beancount and beanquery packages")
+    return engine
+
+
+def _files_stamp(paths: List[str]) -> Tuple[Tuple[str, int, int], ...]:
+    """(path, mtime_ns, size) for every file; missing files get (-1, -1)."""
+    out = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            out.append((p, st.st_mtime_ns, st.st_size))
+        except OSError:
+            out.append((p, -1, -1))
+    return tuple(out)
+
+
+def _format_load_error(err: Any) -> str:
+    return f"{bc_printer.render_source(err.source)} {err.message}".strip()
+
+
+def load_ledger(journal_path: str) -> Tuple[list, List[str], dict]:
+    """
+    Load a journal with beancount.loader and keep it in memory.
+
+    The parsed ledger is reused until the journal or any file it includes
+    changes (mtime/size). Returns (entries, warnings, options).
+    """
+    if not api_available():
+        raise RuntimeError("In-process engine requires the beancount and beanquery packages")
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"Journal file not found: {journal_path}")
+
+    key = os.path.abspath(journal_path)
+    with _LEDGERS_LOCK:
+        cached = _LEDGERS.get(key)
+    if cached is not None:
+        stamp, entries, warns, options = cached
+        if _files_stamp([p for (p, _m, _s) in stamp]) == stamp:
+            return entries, warns, options
+
+    # parse outside the lock so different journals can load concurrently
+    with stage("ledger-load"):
+        entries, errors, options = bc_loader.load_file(key)
+    files = list(options.get("include") or [key])
+    if key not in files:
+        files.append(key)
+    warns = [_format_load_error(e) for e in errors]
+    stamp = _files_stamp(files)
+    count("bytes_parsed", sum(size for _p, _m, size in stamp if size > 0))
+
+    with _LEDGERS_LOCK:
+        _LEDGERS.pop(key, None)
+        while len(_LEDGERS) >= _LEDGERS_MAX:
+            _LEDGERS.pop(next(iter(_LEDGERS)))
+        _LEDGERS[key] = (stamp, entries, warns, options)
+        return entries, warns, options
+
+
+def _value_amount(cur: str, value: Any) -> Optional[Decimal]:
+    """
+    Reduce a beanquery result cell to a Decimal amount of `cur`.
+    Accepts Decimal, Amount, Position and Inventory values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, (int, float)):
+        return Decimal(str(value))
+    units = getattr(value, "units", None)
+    if units is not None:  # Position
+        value = units
+    number = getattr(value, "number", None)
+    if number is not None:  # Amount
+        return number
+    total = Decimal("0")
+    for pos in value:  # Inventory: sum units of the grouped currency
+        if pos.units.currency == cur:
+            total += pos.units.number
+    return total
+
+
+def beanquery_run_rows(journal_path: str, query: str) -> Tuple[List[Row], List[str]]:
+    """
+    Run a grouped query in-process and return typed rows and loader warnings.
+
+    The query must select (currency, amount-like) columns, e.g.
+      SELECT currency, sum(position) ... GROUP BY currency
+    """
+    entries, warns, options = load_ledger(journal_path)
+    try:
+        with stage("beanquery-api"):
+            _types, rows = bq_run_query(entries, options, query)
+        count("rows_parsed", len(rows))
+    except Exception as exc:
+        raise RuntimeError(f"beanquery failed: {exc}") from exc
+
+    out: List[Row] = []
+    for row in rows:
+        if len(row) < 2 or not isinstance(row[0], str):
+            continue
+        amt = _value_amount(row[0], row[1])
+        if amt is not None:
+            out.append((row[0], amt))
+    return out, list(warns)
+
+
+def beanquery_run_lines_api(journal_path: str, query: str) -> Tuple[List[str], List[str]]:
+    """
+    In-process counterpart of `beanquery_run_lines`: same (lines, warnings)
+    shape, rendered with bean-query's own text renderer.
+    """
+    entries, warns, options = load_ledger(journal_path)
+    try:
+        with stage("beanquery-api"):
+            types, rows = bq_run_query(entries, options, query)
+        count("rows_parsed", len(rows))
+    except Exception as exc:
+        raise RuntimeError(f"beanquery failed: {exc}") from exc
+
+    buf = io.StringIO()
+    if rows:
+        bq_render_text(types, rows, options["dcontext"], buf)
+    lines = [ln.strip() for ln in buf.getvalue().splitlines() if ln.strip()]
+    return lines, list(warns)
+
+
+def beanquery_run_csv_api(journal_path: str, query: str) -> Tuple[List[str], List[str]]:
+    """
+    In-process counterpart of `beanquery_run_csv`: numberified CSV lines and warnings.
+    """
+    entries, warns, options = load_ledger(journal_path)
+    try:
+        with stage("beanquery-api"):
+            types, rows = bq_run_query(entries, options, query, numberify=True)
+        count("rows_parsed", len(rows))
+    except Exception as exc:
+        raise RuntimeError(f"beanquery failed: {exc}") from exc
+
+    buf = io.StringIO()
+    bq_render_csv(types, rows, options["dcontext"], buf)
+    return buf.getvalue().splitlines(), list(warns)
+
+
+def beanquery_grouped_rows(journal_path: str, query: str, engine: str = "auto") -> Tuple[List[Row], List[str]]:
+    """
+    Run a grouped (currency, amount) query with the selected engine.
+    Returns (rows, warnings).
+    """
+    if resolve_engine(engine) == "api":
+        return beanquery_run_rows(journal_path, query)
+    lines, warns = beanquery_run_csv(journal_path, query)
+    return beanquery_csv_amounts(lines), warns
+
+
+def beanquery_dated_rows(
+    journal_path: str, query: str, engine: str = "auto"
+) -> Tuple[List[Tuple[datetime.date, str, Decimal]], List[str]]:
+    """
+    Run a (date, currency, amount) query grouped by date with the selected engine.
+    Returns (rows, warnings).
+    """
+    if resolve_engine(engine) == "api":
+        entries, warns, options = load_ledger(journal_path)
+        try:
+            with stage("beanquery-api"):
+                _types, rows = bq_run_query(entries, options, query)
+            count("rows_parsed", len(rows))
+        except Exception as exc:
+            raise RuntimeError(f"beanquery failed: {exc}") from exc
+        out = []
+        for row in rows:
+            if len(row) < 3 or not isinstance(row[1], str):
+                continue
+            amt = _value_amount(row[1], row[2])
+            if amt is not None:
+                out.append((row[0], row[1], amt))
+        return out, list(warns)
+    lines, warns = beanquery_run_csv(journal_path, query)
+    return beanquery_csv_dated_amounts(lines), warns
+
+
+def beanquery_lines(journal_path: str, query: str, engine: str = "auto") -> Tuple[List[str], List[str]]:
+    """
+    Run a query with the selected engine and return text (lines, warnings).
+    """
+    if resolve_engine(engine) == "api":
+        return beanquery_run_lines_api(journal_path, query)
+    return beanquery_run_lines(journal_path, query)
+
+
+# ----------------------------------------------------------------
+# Resident worker client
+# ----------------------------------------------------------------
+def worker_socket() -> Optional[str]:
+    """Socket path of the resident worker from $FAVA_FORECAST_WORKER, if it exists."""
+    path = os.environ.get(WORKER_ENV)
+    if path and os.path.exists(path):
+        return path
+    return None
+
+
+def worker_request(socket_path: str, request: Dict[str, Any], timeout: float = 600.0) -> Dict[str, Any]:
+    """
+    Send one JSON request line to the worker and return its JSON reply.
+
+    Raises WorkerUnavailableError if the worker cannot be reached, and
+    RuntimeError if it reports a failed request.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            with sock.makefile("rb") as f:
+                line = f.readline()
+    except (OSError, AttributeError) as exc:  # AttributeError: no AF_UNIX on this platform
+        raise WorkerUnavailableError(f"bean-query worker at {socket_path} is unavailable: {exc}") from exc
+    if not line:
+        raise WorkerUnavailableError(f"bean-query worker at {socket_path} closed the connection")
+
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise RuntimeError(f"bean-query failed: {reply.get('error', 'unknown worker error')}")
+    return reply
+
+
+def worker_query(socket_path: str, journal_path: str, query: str, fmt: str = "text") -> Tuple[List[str], List[str]]:
+    """
+    Run a query on the resident worker. `fmt` is "text" (like beanquery_run_lines)
+    or "csv" (like beanquery_run_csv). Returns (lines, warnings).
+    """
+    with stage("worker-query"):
+        reply = worker_request(
+            socket_path,
+            {"op": "query", "journal": os.path.abspath(journal_path), "query": query, "format": fmt},
+        )
+    return list(reply.get("lines", [])), list(reply.get("warnings", []))
+
+
+async def worker_query_async(
+    socket_path: str,
+    journal_path: str,
+    query: str,
+    fmt: str = "text",
+    timeout: Optional[float] = None,
+) -> Tuple[List[str], List[str]]:
+    """Non-blocking `worker_query` over asyncio streams."""
+    request = {"op": "query", "journal": os.path.abspath(journal_path), "query": query, "format": fmt}
+    try:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    except (OSError, AttributeError) as exc:
+        raise WorkerUnavailableError(f"bean-query worker at {socket_path} is unavailable: {exc}") from exc
+    try:
+        writer.write((json.dumps(request) + "\n").encode("utf-8"))
+        await writer.drain()
+        line = await asyncio.wait_for(reader.readline(), timeout)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"bean-query worker timed out after {timeout}s") from None
+    finally:
+        writer.close()
+    if not line:
+        raise WorkerUnavailableError(f"bean-query worker at {socket_path} closed the connection")
+
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise RuntimeError(f"bean-query failed: {reply.get('error', 'unknown worker error')}")
+    return list(reply.get("lines", [])), list(reply.get("warnings", []))
+
+
+# ----------------------------------------------------------------
+# Non-blocking runners (asyncio subprocesses)
+# ----------------------------------------------------------------
+async def _bean_query_async(args: List[str], timeout: Optional[float]) -> Tuple[str, str]:
+    """
+    Run `bean-query *args` without blocking the event loop; returns (stdout, stderr).
+    On timeout or cancellation the process is killed before the error propagates.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        "bean-query",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    count("subprocesses")
+    try:
+        with stage("bean-query"):
+            out, err = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        await _kill(proc)
+        raise RuntimeError(f"bean-query timed out after {timeout}s") from None
+    except asyncio.CancelledError:
+        await _kill(proc)
+        raise
+
+    count("bytes_parsed", len(out))
+    stdout = out.decode("utf-8", errors="replace")
+    stderr = err.decode("utf-8", errors="replace")
+    if proc.returncode != 0:
+        raise RuntimeError(f"bean-query failed: {stderr.strip() or stdout.strip()}")
+    return stdout, stderr
+
+
+async def _kill(proc: "asyncio.subprocess.Process") -> None:
+    """Kill the process and drain its pipes so the transport closes cleanly."""
+    if proc.returncode is None:
+        proc.kill()
+    await proc.communicate()
+
+
+async def beanquery_run_lines_async(
+    journal_path: str,
+    query: str,
+    timeout: Optional[float] = None,
+) -> Tuple[List[str], List[str]]:
+    """Non-blocking `beanquery_run_lines` with an optional per-query timeout."""
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"Journal file not found: {journal_path}")
+
+    sock = worker_socket()
+    if sock is not None:
+        try:
+            return await worker_query_async(sock, journal_path, query, "text", timeout)
+        except WorkerUnavailableError:
+            pass  # fall back to a one-off bean-query process
+
+    stdout, stderr = await _bean_query_async([journal_path, query], timeout)
+    lines = [ln.strip() for ln in stdout.splitlines() if ln.strip()]
+    warns = [ln.strip() for ln in stderr.splitlines() if ln.strip()]
+    return lines, warns
+
+
+async def beanquery_run_csv_async(
+    journal_path: str,
+    query: str,
+    timeout: Optional[float] = None,
+) -> Tuple[List[str], List[str]]:
+    """Non-blocking `beanquery_run_csv` with an optional per-query timeout."""
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"Journal file not found: {journal_path}")
+
+    sock = worker_socket()
+    if sock is not None:
+        try:
+            return await worker_query_async(sock, journal_path, query, "csv", timeout)
+        except WorkerUnavailableError:
+            pass  # fall back to a one-off bean-query process
+
+    stdout, stderr = await _bean_query_async(["-f", "csv", "-m", journal_path, query], timeout)
+    warns = [ln.strip() for ln in stderr.splitlines() if ln.strip()]
+    return stdout.splitlines(), warns
+
+
 # ----------------------------------------------------------------
 # Combined convenience function
 # ----------------------------------------------------------------
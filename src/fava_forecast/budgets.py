@@ -1,10 +1,29 @@
 # budgets.py
+import calendar
 import datetime
+import heapq
 import os
 import re
-from dataclasses import dataclass
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from functools import cached_property, partial
 from decimal import Decimal
-from typing import Dict, Iterable, List, Optional, Tuple
+from fractions import Fraction
+from math import lcm
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .beancount_io import load_ledger
+from .cache import QueryCache, journal_files, journal_fingerprint
+from .instrument import count, stage
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
 
 
 # -------------------------------
@@ -17,6 +36,7 @@ class BudgetItem:
     freq: str                # one of: weekly, monthly, quarterly, yearly
     amount: Decimal
     currency: str
+    end: Optional[datetime.date] = None   # exclusive; None = until superseded
 
 
 # -------------------------------
@@ -30,11 +50,20 @@ FREQ_DAYS: Dict[str, Decimal] = {
     "yearly":    Decimal("365.25"),
 }
 
+# How a budget's amount is spread over time:
+#   average  - evenly over FREQ_DAYS (a month is always 30.4375 days)
+#   calendar - evenly over each real period (a February is 28 or 29 days)
+#   lump     - the whole amount on each period start (rent, insurance)
+BUDGET_MODES = ("average", "calendar", "lump")
+
 _RX_BUDGET = re.compile(
     r'^(\d{4}-\d{2}-\d{2})\s+custom\s+"budget"\s+"([^"]+)"\s+"'
-    r'(weekly|monthly|quarterly|yearly)"\s+([\d_]+(?:\.\d+)?)\s+([A-Z]{3,6})\s*$'
+    r'(weekly|monthly|quarterly|yearly)"\s+([\d_]+(?:\.\d+)?)\s+([A-Z]{3,6})'
+    r'(?:\s+(\d{4}-\d{2}-\d{2}))?\s*$'
 )
 
+_NO_END = datetime.date.max.toordinal()
+
 
 # -------------------------------
 # Parsing
@@ -42,15 +71,24 @@ _RX_BUDGET = re.compile(
 def parse_budget_line(line: str) -> Optional[BudgetItem]:
     """
     Parse a single budgets.bean line into BudgetItem.
+    An optional trailing date ends the budget (exclusive):
+      2025-01-01 custom "budget" "Expenses:Gym" "monthly" 40 USD 2025-07-01
     Returns None if line doesn't match the custom 'budget' format.
     """
     m = _RX_BUDGET.match(line.strip())
     if not m:
         return None
-    start_s, account, freq, amt_s, cur = m.groups()
+    start_s, account, freq, amt_s, cur, end_s = m.groups()
     start = datetime.date.fromisoformat(start_s)
     amount = Decimal(amt_s.replace("_", ""))
-    return BudgetItem(start=start, account=account, freq=str(freq), amount=amount, currency=cur)
+    end = datetime.date.fromisoformat(end_s) if end_s else None
+    return BudgetItem(start=start, account=account, freq=str(freq), amount=amount, currency=cur, end=end)
+
+
+def format_budget_line(item: BudgetItem) -> str:
+    """The budgets.bean line of `item`; parse_budget_line reads it back unchanged."""
+    line = f'{item.start.isoformat()} custom "budget" "{item.account}" "{item.freq}" {item.amount:f} {item.currency}'
+    return f"{line} {item.end.isoformat()}" if item.end is not None else line
 
 
 def load_budget_items(path: str) -> List[BudgetItem]:
@@ -61,14 +99,276 @@ def load_budget_items(path: str) -> List[BudgetItem]:
     if not os.path.exists(path):
         return []
     items: List[BudgetItem] = []
-    with open(path, "r", encoding="utf-8") as f:
+    count("bytes_parsed", os.path.getsize(path))
+    n_lines = 0
+    with stage("budgets-parse"), open(path, "r", encoding="utf-8") as f:
         for line in f:
+            n_lines += 1
             bi = parse_budget_line(line)
             if bi is not None:
                 items.append(bi)
+    count("rows_parsed", n_lines)
     return items
 
 
+# -------------------------------
+# Budget history
+# -------------------------------
+class BudgetIndex:
+    """
+    Budget items resolved into per-account intervals. A later entry for an
+    account supersedes the earlier one from its start date (on the same date
+    the later line wins), so the earlier budget ends there unless it ends
+    sooner on its own.
+
+    Per account the intervals are disjoint and sorted, so `active` bisects each
+    account's list and touches only the budgets overlapping the window.
+    `table` memoizes the compiled budgets of recent windows.
+    """
+
+    def __init__(self, items: Iterable[BudgetItem]) -> None:
+        self._tables: "OrderedDict[Tuple[Any, ...], Any]" = OrderedDict()
+        by_account: Dict[str, List[Tuple[int, BudgetItem]]] = {}
+        for pos, it in enumerate(items):
+            by_account.setdefault(it.account, []).append((pos, it))
+
+        # account -> (start ordinals, end ordinals, (file position, item))
+        self._accounts: Dict[str, Tuple[List[int], List[int], List[Tuple[int, BudgetItem]]]] = {}
+        for account, entries in by_account.items():
+            entries.sort(key=lambda e: e[1].start)      # stable: file order on equal dates
+            starts: List[int] = []
+            ends: List[int] = []
+            kept: List[Tuple[int, BudgetItem]] = []
+            for k, (pos, it) in enumerate(entries):
+                end = it.end
+                if k + 1 < len(entries):
+                    nxt = entries[k + 1][1].start
+                    end = nxt if end is None else min(end, nxt)
+                if end is not None and end <= it.start:
+                    continue                            # superseded on its own start date
+                starts.append(it.start.toordinal())
+                ends.append(end.toordinal() if end is not None else _NO_END)
+                kept.append((pos, it if end == it.end else replace(it, end=end)))
+            self._accounts[account] = (starts, ends, kept)
+
+    def items(self) -> List[BudgetItem]:
+        """Every resolved budget, in file order."""
+        return [it for _pos, it in sorted(e for _s, _e, kept in self._accounts.values() for e in kept)]
+
+    def active(self, since: datetime.date, until: datetime.date) -> List[BudgetItem]:
+        """Resolved budgets overlapping [since, until), in file order."""
+        lo, hi = since.toordinal(), until.toordinal()
+        found: List[Tuple[int, BudgetItem]] = []
+        for starts, ends, kept in self._accounts.values():
+            k = bisect_right(ends, lo)                  # first interval still running at `since`
+            while k < len(kept) and starts[k] < hi:
+                found.append(kept[k])
+                k += 1
+        found.sort(key=itemgetter(0))
+        return [it for _pos, it in found]
+
+    def table(self, since: datetime.date, until: datetime.date, mode: str = "average") -> Any:
+        """`budget_table` of the budgets active in [since, until), reused for repeated windows."""
+        key = (since, until, mode)
+        with _BUDGETS_LOCK:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                return table
+        table = budget_table(self.active(since, until), mode)
+        with _BUDGETS_LOCK:
+            self._tables[key] = table
+            while len(self._tables) > _TABLES_MAX:
+                self._tables.popitem(last=False)
+        return table
+
+
+# Parsed budgets files, keyed by (abspath, mtime_ns, size); LRU across ledgers
+_BUDGETS: "OrderedDict[Tuple[str, int, int], BudgetIndex]" = OrderedDict()
+_BUDGETS_MAX = 8
+_TABLES_MAX = 16
+_BUDGETS_LOCK = threading.Lock()
+
+
+def load_budget_index(path: str) -> BudgetIndex:
+    """
+    BudgetIndex of a budgets.bean file, cached for the whole process: the file
+    is parsed again only when its mtime or size changes (LRU, _BUDGETS_MAX
+    files). Missing file -> empty index. Treat the result as read-only.
+    """
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return BudgetIndex([])
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _BUDGETS_LOCK:
+        index = _BUDGETS.get(key)
+        if index is not None:
+            _BUDGETS.move_to_end(key)
+    if index is not None:
+        count("budget_cache_hits")
+        return index
+    count("budget_cache_misses")
+
+    index = BudgetIndex(load_budget_items(path))
+    with _BUDGETS_LOCK:
+        for stale in [k for k in _BUDGETS if k[0] == path]:
+            del _BUDGETS[stale]
+        _BUDGETS[key] = index
+        while len(_BUDGETS) > _BUDGETS_MAX:
+            _BUDGETS.popitem(last=False)
+    return index
+
+
+def clear_budget_cache() -> None:
+    """Forget every parsed budgets file and ledger budget index."""
+    with _BUDGETS_LOCK:
+        _BUDGETS.clear()
+        _LEDGER_BUDGETS.clear()
+
+
+# -------------------------------
+# Budgets from a loaded ledger
+# -------------------------------
+def budget_items_from_entries(entries: Iterable[Any]) -> List[BudgetItem]:
+    """
+    BudgetItems from loaded Beancount entries: every Custom entry of type
+    "budget" with the values (account, frequency, amount[, end date]), in
+    entry order. Entries with other values are skipped, like unparsable lines.
+    """
+    items: List[BudgetItem] = []
+    for entry in entries:
+        if getattr(entry, "type", None) != "budget":
+            continue
+        values = [getattr(v, "value", v) for v in getattr(entry, "values", None) or ()]
+        if len(values) not in (3, 4):
+            continue
+        account, freq, amount = values[:3]
+        end = values[3] if len(values) == 4 else None
+        number = getattr(amount, "number", None)
+        currency = getattr(amount, "currency", None)
+        if (
+            not isinstance(account, str)
+            or freq not in FREQ_DAYS
+            or not isinstance(number, Decimal)
+            or not isinstance(currency, str)
+            or not (end is None or isinstance(end, datetime.date))
+        ):
+            continue
+        items.append(BudgetItem(entry.date, account, freq, number, currency, end))
+    return items
+
+
+def _encode_items(items: Iterable[BudgetItem]) -> List[List[Optional[str]]]:
+    return [
+        [it.start.isoformat(), it.account, it.freq, str(it.amount), it.currency,
+         it.end.isoformat() if it.end is not None else None]
+        for it in items
+    ]
+
+
+def _decode_items(data: Iterable[List[Optional[str]]]) -> List[BudgetItem]:
+    return [
+        BudgetItem(datetime.date.fromisoformat(start), account, freq, Decimal(amount), currency,
+                   datetime.date.fromisoformat(end) if end is not None else None)
+        for start, account, freq, amount, currency, end in data
+    ]
+
+
+def ledger_budget_items(journal_path: str, cache: Optional[QueryCache] = None) -> List[BudgetItem]:
+    """
+    Budget entries of a journal and its includes (budget_items_from_entries of
+    the loaded ledger). With a `cache` the items are stored under the journal
+    fingerprint like query results, so the ledger is only loaded after the
+    journal or one of its includes changed. Raises like load_ledger.
+    """
+    key = cache.key(journal_path, "budget-items") if cache is not None else None
+    if key is not None:
+        hit = cache.get(key)
+        if hit is not None:
+            return _decode_items(hit["value"])
+    entries, _warns, _options = load_ledger(journal_path)
+    with stage("budgets-parse"):
+        items = budget_items_from_entries(entries)
+    if key is not None:
+        cache.put(key, {"value": _encode_items(items), "messages": []})
+    return items
+
+
+def journal_budget_items(journal_path: str) -> List[BudgetItem]:
+    """
+    Budget lines of a journal and every file it includes, read with
+    parse_budget_line (see load_budget_items); no ledger is parsed in process.
+    Raises FileNotFoundError for a missing journal.
+    """
+    if not os.path.exists(journal_path):
+        raise FileNotFoundError(f"Journal file not found: {journal_path}")
+    items: List[BudgetItem] = []
+    for path in journal_files(journal_path):
+        items += load_budget_items(path)
+    return items
+
+
+# (journal abspath, loaded) -> (journal fingerprint, budgets file key or None, index)
+_LEDGER_BUDGETS: Dict[Tuple[str, bool], Tuple[str, Optional[Tuple[str, int, int]], BudgetIndex]] = {}
+
+
+def load_ledger_budget_index(
+    journal_path: str, budgets_path: str, cache: Optional[QueryCache] = None, loaded: bool = True
+) -> BudgetIndex:
+    """
+    BudgetIndex of the budget entries of a journal, including included files.
+    With `loaded` (the in-process engine, which has the ledger in memory) they
+    are the Custom entries of the loaded ledger (see ledger_budget_items);
+    otherwise the files are read with the line parser (journal_budget_items),
+    so the subprocess and worker engines never parse the ledger in process.
+    A budgets file the journal does not include is added through
+    load_budget_index. Rebuilt only when the journal fingerprint
+    (cache.journal_fingerprint) or that file changes. Raises like load_ledger.
+    """
+    journal = os.path.abspath(journal_path)
+    budgets = os.path.abspath(budgets_path)
+    fingerprint = journal_fingerprint(journal)
+    file_key = None
+    if budgets not in journal_files(journal):
+        try:
+            st = os.stat(budgets)
+            file_key = (budgets, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            pass
+
+    with _BUDGETS_LOCK:
+        cached = _LEDGER_BUDGETS.get((journal, loaded))
+    if cached is not None and cached[0] == fingerprint and cached[1] == file_key:
+        count("budget_cache_hits")
+        return cached[2]
+    count("budget_cache_misses")
+
+    items = ledger_budget_items(journal, cache) if loaded else journal_budget_items(journal)
+    if file_key is not None:
+        items += load_budget_index(budgets).items()
+    index = BudgetIndex(items)
+    with _BUDGETS_LOCK:
+        _LEDGER_BUDGETS.pop((journal, loaded), None)
+        while len(_LEDGER_BUDGETS) >= _BUDGETS_MAX:
+            _LEDGER_BUDGETS.pop(next(iter(_LEDGER_BUDGETS)))
+        _LEDGER_BUDGETS[(journal, loaded)] = (fingerprint, file_key, index)
+    return index
+
+
+def budget_index(
+    budgets_path: str, journal: Optional[str] = None, cache: Optional[QueryCache] = None, loaded: bool = True
+) -> BudgetIndex:
+    """Budgets of `journal` when given and readable, else of the budgets file alone."""
+    if journal is not None:
+        try:
+            return load_ledger_budget_index(journal, budgets_path, cache, loaded)
+        except Exception:
+            pass  # no beancount, missing journal or a ledger beancount cannot load
+    return load_budget_index(budgets_path)
+
+
 # -------------------------------
 # Forecast core
 # -------------------------------
@@ -79,8 +379,10 @@ def _planned_amount_in_window(item: BudgetItem, start_incl: datetime.date, end_e
 
     If the window ends on or before the effective start date — returns 0.
     """
-    # budgets start no earlier than their own start date
+    # budgets start no earlier than their own start date and stop at their end
     effective_start = max(start_incl, item.start)
+    if item.end is not None:
+        end_excl = min(end_excl, item.end)
     if end_excl <= effective_start:
         return Decimal("0")
 
@@ -90,17 +392,414 @@ def _planned_amount_in_window(item: BudgetItem, start_incl: datetime.date, end_e
     return daily * days
 
 
+# -------------------------------
+# Compiled budget table
+# -------------------------------
+# Daily rates are integers in units of 1 / (RATE_DENOM * 10**scale): amount / period_days
+# with every FREQ_DAYS written as p/q is amount * q * (RATE_DENOM / p), RATE_DENOM = lcm(p).
+_FREQ_FRACTIONS = {freq: Fraction(days) for freq, days in FREQ_DAYS.items()}
+RATE_DENOM = lcm(*(f.numerator for f in _FREQ_FRACTIONS.values()))
+_FREQ_MULT = {freq: f.denominator * (RATE_DENOM // f.numerator) for freq, f in _FREQ_FRACTIONS.items()}
+
+_INT64_MAX = 2**63 - 1
+
+
+Key = Tuple[str, str]   # (account, currency)
+
+
+class BudgetTotals:
+    """
+    Planned amounts of one window, from exact integer sums per (account,
+    currency) key in units of 1 / denom. `by_currency` adds up the keys of each
+    currency; `by_account` (computed on first access) adds every key to its
+    account and all parent accounts, so Expenses:Food:Out also counts in
+    Expenses:Food and Expenses. Only keys with an accruing budget appear.
+    """
+
+    def __init__(self, keys: Sequence[Key], currencies: Sequence[str], sums: Sequence[int],
+                 active: Sequence[bool], denom: int) -> None:
+        self._keys, self._sums, self._active = keys, sums, active
+        self._denom = Decimal(denom)
+        by_cur: Dict[str, int] = {}
+        for (_account, cur), total, on in zip(keys, sums, active):
+            if on:
+                by_cur[cur] = by_cur.get(cur, 0) + total
+        self.by_currency: Dict[str, Decimal] = {
+            cur: Decimal(by_cur[cur]) / self._denom for cur in currencies if cur in by_cur
+        }
+
+    @cached_property
+    def by_account(self) -> Dict[str, Dict[str, Decimal]]:
+        rollup: Dict[str, Dict[str, int]] = {}
+        for (account, cur), total, on in zip(self._keys, self._sums, self._active):
+            if not on:
+                continue
+            name = account
+            while True:
+                per_cur = rollup.setdefault(name, {})
+                per_cur[cur] = per_cur.get(cur, 0) + total
+                if ":" not in name:
+                    break
+                name = name.rsplit(":", 1)[0]
+        return {
+            name: {cur: Decimal(total) / self._denom for cur, total in rollup[name].items()}
+            for name in sorted(rollup)
+        }
+
+
+class _KeyedTotals(ABC):
+    """
+    Shared by the compiled tables: `_key_sums` reduces the items once per
+    (account, currency) key for every window, and both the currency totals and
+    the account rollups come from those sums.
+    """
+
+    @abstractmethod
+    def _key_sums(
+        self, today: datetime.date, untils: Sequence[datetime.date]
+    ) -> Tuple[Sequence[Key], Sequence[str], List[List[int]], List[List[bool]], int]:
+        """(keys, currencies, sums per window and key, accruing per window and key, denom)."""
+
+    def breakdown(self, today: datetime.date, untils: Sequence[datetime.date]) -> List[BudgetTotals]:
+        """BudgetTotals of each [today, until)."""
+        if not untils:
+            return []
+        keys, currencies, sums, active, denom = self._key_sums(today, untils)
+        return [BudgetTotals(keys, currencies, row, act, denom) for row, act in zip(sums, active)]
+
+    def totals(self, today: datetime.date, untils: Sequence[datetime.date]) -> List[Dict[str, Decimal]]:
+        """Planned amount per currency in each [today, until)."""
+        return [window.by_currency for window in self.breakdown(today, untils)]
+
+
+@dataclass(frozen=True)
+class BudgetTable(_KeyedTotals):
+    """
+    Budget items compiled for windowed sums: per item the start and end date
+    ordinals, the daily rate as a scaled integer and an (account, currency) key
+    id, with the items sorted by key. Arrays are NumPy arrays when numpy is
+    installed, plain lists otherwise; both give the same exact integer sums.
+
+    Every budget accrues its daily rate on each day from max(today, start) up
+    to min(until, end); each currency total is one Decimal division. Totals
+    are therefore the exact sums rounded once to the Decimal context, while
+    adding up per-item Decimals (_planned_amount_in_window) rounds every item:
+    the two agree up to the context precision, not always in the last digit.
+    """
+    start: Any                 # start date ordinals
+    end: Any                   # end date ordinals (exclusive), _NO_END if open
+    rate: Any                  # daily rate, units of 1 / denom
+    key_id: Any                # index into keys, non-decreasing
+    keys: Tuple[Key, ...]
+    currencies: Tuple[str, ...]
+    denom: int                 # RATE_DENOM * 10**scale
+
+    def _key_sums(self, today, untils):
+        if np is not None and self._fits_int64(today, untils):
+            sums, active = self._sums_numpy(today, untils)
+        else:
+            sums, active = self._sums_python(today, untils)
+        return self.keys, self.currencies, sums, active, self.denom
+
+    def _fits_int64(self, today: datetime.date, untils: Sequence[datetime.date]) -> bool:
+        if not len(self.rate):
+            return True
+        max_days = max(0, max(untils).toordinal() - min(today.toordinal(), int(min(self.start))))
+        return int(np.abs(self.rate).max()) * max_days * len(self.rate) <= _INT64_MAX
+
+    def _sums_numpy(self, today: datetime.date, untils: Sequence[datetime.date]) -> Tuple[List[List[int]], List[List[bool]]]:
+        if not len(self.rate):
+            return [[] for _ in untils], [[] for _ in untils]
+        ends = np.array([u.toordinal() for u in untils], dtype=np.int64)[:, None]
+        days = np.clip(np.minimum(ends, self.end[None, :]) - np.maximum(self.start, today.toordinal())[None, :], 0, None)
+        accrued = days * self.rate[None, :]                               # (windows, items)
+        # items are sorted by key: one segmented sum per key
+        bounds = np.flatnonzero(np.r_[True, self.key_id[1:] != self.key_id[:-1]])
+        sums = np.add.reduceat(accrued, bounds, axis=1)                   # exact int64
+        active = np.logical_or.reduceat(accrued != 0, bounds, axis=1)
+        return sums.tolist(), active.tolist()
+
+    def _sums_python(self, today: datetime.date, untils: Sequence[datetime.date]) -> Tuple[List[List[int]], List[List[bool]]]:
+        t = today.toordinal()
+        starts = [max(int(st), t) for st in self.start]
+        stops = [int(e) for e in self.end]
+        rates = [int(r) for r in self.rate]
+        ids = [int(k) for k in self.key_id]
+        sums, active = [], []
+        for until in untils:
+            end = until.toordinal()
+            row, act = [0] * len(self.keys), [False] * len(self.keys)
+            for st, stop, rate, k in zip(starts, stops, rates, ids):
+                days = min(end, stop) - st
+                if days > 0 and rate:
+                    row[k] += days * rate
+                    act[k] = True
+            sums.append(row)
+            active.append(act)
+        return sums, active
+
+
+def _amount_unit(items: Iterable[BudgetItem]) -> int:
+    """10**scale with scale the most decimal places of any amount."""
+    return 10 ** max((max(0, -it.amount.as_tuple().exponent) for it in items), default=0)
+
+
+def _keys_and_currencies(items: Sequence[BudgetItem]) -> Tuple[Dict[Key, int], Tuple[str, ...]]:
+    keys: Dict[Key, int] = {}
+    for it in items:
+        keys.setdefault((it.account, it.currency), len(keys))
+    return keys, tuple(dict.fromkeys(it.currency for it in items))
+
+
+def compile_budgets(items: Iterable[BudgetItem]) -> BudgetTable:
+    """Compile budget items into a BudgetTable (exact scaled-integer daily rates)."""
+    items = list(items)
+    unit = _amount_unit(items)
+    keys, currencies = _keys_and_currencies(items)
+    items.sort(key=lambda it: keys[(it.account, it.currency)])
+    start, end, rate, key_id = [], [], [], []
+    for it in items:
+        start.append(it.start.toordinal())
+        end.append(it.end.toordinal() if it.end is not None else _NO_END)
+        rate.append(int(it.amount * unit) * _FREQ_MULT[it.freq])
+        key_id.append(keys[(it.account, it.currency)])
+    if np is not None:
+        # rates beyond int64 stay Python ints (object arrays); totals() then takes the list path
+        fits = all(abs(r) <= _INT64_MAX for r in rate)
+        start = np.array(start, dtype=np.int64)
+        end = np.array(end, dtype=np.int64)
+        rate = np.array(rate, dtype=np.int64 if fits else object)
+        key_id = np.array(key_id, dtype=np.int64)
+    return BudgetTable(start, end, rate, key_id, tuple(keys), currencies, RATE_DENOM * unit)
+
+
+# -------------------------------
+# Calendar-exact allocation
+# -------------------------------
+_FREQ_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+
+
+def _month_index(day: datetime.date) -> int:
+    return day.year * 12 + day.month - 1
+
+
+def _anchored(month_index: int, day: int) -> int:
+    """Ordinal of `day` in the given month, clamped to the month's last day."""
+    year, month = divmod(month_index, 12)
+    return datetime.date(year, month + 1, min(day, calendar.monthrange(year, month + 1)[1])).toordinal()
+
+
+class PeriodTable:
+    """
+    Cumulative period boundaries of one schedule: day `day` (clamped to the
+    month end) of every `step`-th month from `first_month` until past
+    `last_ordinal`. Budgets starting on any of these boundaries share the table.
+    """
+
+    def __init__(self, day: int, step: int, first_month: int, last_ordinal: int) -> None:
+        self.bounds: List[int] = []
+        month = first_month
+        while not self.bounds or self.bounds[-1] <= last_ordinal:
+            self.bounds.append(_anchored(month, day))
+            month += step
+
+    def lengths(self) -> set:
+        """Distinct period lengths in days."""
+        return {hi - lo for lo, hi in zip(self.bounds, self.bounds[1:])}
+
+    def elapsed(self, ordinal: int, denom: int) -> int:
+        """
+        Periods from the first boundary to `ordinal` times `denom` (a multiple
+        of every period length); the current period is pro-rated by its real length.
+        """
+        k = max(0, bisect_right(self.bounds, ordinal) - 1)   # before the first boundary: unused
+        lo, hi = self.bounds[k], self.bounds[k + 1]
+        return k * denom + (ordinal - lo) * (denom // (hi - lo))
+
+
+def _schedule_key(item: BudgetItem) -> Tuple[Any, ...]:
+    if item.freq == "weekly":
+        return ("weekly",)
+    step = _FREQ_MONTHS[item.freq]
+    return (item.start.day, step, _month_index(item.start) % step)
+
+
+@dataclass(frozen=True)
+class CalendarBudgets(_KeyedTotals):
+    """
+    Budget items for calendar-exact windowed sums: each period keeps its real
+    length and a window gets the overlapping share of every period.
+
+    Items are grouped by schedule and (account, currency); per group the starts
+    are sorted with prefix sums of amount and amount * elapsed(start), so one
+    window is a bisect plus one multiplication per group: sum(amount *
+    (elapsed(until) - elapsed(start))) over the items started before `until`.
+    A budget that ends adds a second row with the negated amount at its end
+    date. Amounts are scaled integers and elapsed periods are counted in units
+    of 1 / lcm(period lengths), so the sums are exact.
+    """
+    items: Tuple[BudgetItem, ...]
+
+    def _key_sums(self, today, untils):
+        t = today.toordinal()
+        last = max(u.toordinal() for u in untils)
+        keys, currencies = _keys_and_currencies(self.items)
+        unit = _amount_unit(self.items)
+
+        by_schedule: Dict[Tuple[Any, ...], List[BudgetItem]] = {}
+        for it in self.items:
+            # budgets starting at or after the last window end accrue nothing in any window
+            if it.amount and max(it.start.toordinal(), t) < last:
+                by_schedule.setdefault(_schedule_key(it), []).append(it)
+        tables = {
+            key: PeriodTable(key[0], key[1], min(_month_index(it.start) for it in members), last)
+            for key, members in by_schedule.items()
+            if key != ("weekly",)
+        }
+        denom = lcm(7, *(n for table in tables.values() for n in table.lengths()))
+
+        schedules = []  # (elapsed, [(key id, days, prefix amount, prefix amount * elapsed(day), prefix opened)])
+        for key, members in by_schedule.items():
+            if key == ("weekly",):
+                elapsed: Callable[[int], int] = lambda ordinal, per_day=denom // 7: ordinal * per_day
+            else:
+                elapsed = partial(tables[key].elapsed, denom=denom)
+            by_key: Dict[int, List[Tuple[int, int, int]]] = {}
+            for it in members:
+                start = max(it.start.toordinal(), t)
+                stop = it.end.toordinal() if it.end is not None else _NO_END
+                if stop <= start:
+                    continue
+                rows = by_key.setdefault(keys[(it.account, it.currency)], [])
+                amt = int(it.amount * unit)
+                rows.append((start, amt, 1))
+                if stop < last:
+                    rows.append((stop, -amt, 0))
+            groups = []
+            for k, rows in by_key.items():
+                rows.sort(key=itemgetter(0))
+                days, cum_amt, cum_acc, opened = [], [0], [0], [0]
+                for day, amt, opens in rows:
+                    days.append(day)
+                    cum_amt.append(cum_amt[-1] + amt)
+                    cum_acc.append(cum_acc[-1] + amt * elapsed(day))
+                    opened.append(opened[-1] + opens)
+                groups.append((k, days, cum_amt, cum_acc, opened))
+            if groups:
+                schedules.append((elapsed, groups))
+
+        sums, active = [], []
+        for until in untils:
+            end = until.toordinal()
+            row, act = [0] * len(keys), [False] * len(keys)
+            for elapsed, groups in schedules:
+                now = elapsed(end)
+                for k, days, cum_amt, cum_acc, opened in groups:
+                    n = bisect_left(days, end)
+                    if opened[n]:
+                        row[k] += cum_amt[n] * now - cum_acc[n]
+                        act[k] = True
+            sums.append(row)
+            active.append(act)
+        return tuple(keys), currencies, sums, active, denom * unit
+
+
+# -------------------------------
+# Lump allocation
+# -------------------------------
+def occurrences(item: BudgetItem, since: datetime.date, until: datetime.date) -> Iterator[datetime.date]:
+    """
+    Lazily yield the period start dates of `item` in [since, until) and before
+    its end: its start date and every period boundary after it (see
+    PeriodTable for month ends).
+    The first occurrence is computed directly, not by stepping from the start.
+    """
+    lo, hi = since.toordinal(), until.toordinal()
+    if item.end is not None:
+        hi = min(hi, item.end.toordinal())
+    start = item.start.toordinal()
+    if item.freq == "weekly":
+        k = max(0, -(-(lo - start) // 7))
+        day = start + 7 * k
+        while day < hi:
+            yield datetime.date.fromordinal(day)
+            day += 7
+        return
+    step, first = _FREQ_MONTHS[item.freq], _month_index(item.start)
+    k = max(0, (_month_index(since) - first) // step)
+    while True:
+        day = _anchored(first + k * step, item.start.day)
+        if day >= hi:
+            return
+        if day >= lo:
+            yield datetime.date.fromordinal(day)
+        k += 1
+
+
+def budget_occurrences(
+    items: Iterable[BudgetItem], since: datetime.date, until: datetime.date
+) -> Iterator[Tuple[datetime.date, BudgetItem]]:
+    """(date, item) for every occurrence of every item in [since, until), in date order."""
+    def stream(item: BudgetItem) -> Iterator[Tuple[datetime.date, BudgetItem]]:
+        for day in occurrences(item, since, until):
+            yield day, item
+
+    return heapq.merge(*(stream(it) for it in items), key=lambda occ: occ[0])
+
+
+@dataclass(frozen=True)
+class LumpBudgets(_KeyedTotals):
+    """
+    Budget items spent in one lump on each period start. The occurrences up to
+    the last window come from budget_occurrences in date order and are
+    accumulated once into per-(account, currency) prefix sums of scaled
+    amounts, so every window is a bisect per key.
+    """
+    items: Tuple[BudgetItem, ...]
+
+    def _key_sums(self, today, untils):
+        keys, currencies = _keys_and_currencies(self.items)
+        unit = _amount_unit(self.items)
+        due: Dict[int, Tuple[List[int], List[int]]] = {}
+        spent = [it for it in self.items if it.amount]
+        for day, it in budget_occurrences(spent, today, max(untils)):
+            days, cum = due.setdefault(keys[(it.account, it.currency)], ([], [0]))
+            days.append(day.toordinal())
+            cum.append(cum[-1] + int(it.amount * unit))
+        prefix = [(k, days, cum) for k, (days, cum) in due.items()]
+
+        sums, active = [], []
+        for until in untils:
+            end = until.toordinal()
+            row, act = [0] * len(keys), [False] * len(keys)
+            for k, days, cum in prefix:
+                n = bisect_left(days, end)
+                if n:
+                    row[k] = cum[n]
+                    act[k] = True
+            sums.append(row)
+            active.append(act)
+        return tuple(keys), currencies, sums, active, unit
+
+
+def budget_table(
+    items: Iterable[BudgetItem], mode: str = "average"
+) -> Union[BudgetTable, CalendarBudgets, LumpBudgets]:
+    """Compile budget items for the allocation `mode` (see BUDGET_MODES)."""
+    if mode == "average":
+        return compile_budgets(items)
+    if mode == "calendar":
+        return CalendarBudgets(tuple(items))
+    if mode == "lump":
+        return LumpBudgets(tuple(items))
+    raise ValueError(f"Unknown budget mode: {mode!r} (expected one of {', '.join(BUDGET_MODES)})")
+
+
 def _sum_by_currency(items: Iterable[BudgetItem], today: datetime.date, until: datetime.date) -> Dict[str, Decimal]:
     """
     Aggregate planned amounts per currency within [today, until).
     """
-    by_cur: Dict[str, Decimal] = {}
-    for it in items:
-        planned = _planned_amount_in_window(it, today, until)
-        if planned == 0:
-            continue
-        by_cur[it.currency] = by_cur.get(it.currency, Decimal("0")) + planned
-    return by_cur
+    return compile_budgets(items).totals(today, [until])[0]
 
 
 def _convert_breakdown(by_currency: Dict[str, Decimal], rates: Dict[str, Decimal]) -> Tuple[Decimal, List[Tuple[str, Decimal, Optional[Decimal], Optional[Decimal]]]]:
@@ -120,6 +819,135 @@ def _convert_breakdown(by_currency: Dict[str, Decimal], rates: Dict[str, Decimal
     return total, breakdown
 
 
+class BudgetBreakdown(list):
+    """
+    The per-currency breakdown list plus `accounts`: planned amounts per
+    account and parent account, {account: {currency: amount}} (see
+    BudgetTotals.by_account).
+    """
+
+    def __init__(self, rows: Iterable[Any] = (), totals: Optional[BudgetTotals] = None) -> None:
+        super().__init__(rows)
+        self._totals = totals
+
+    @property
+    def accounts(self) -> Dict[str, Dict[str, Decimal]]:
+        return self._totals.by_account if self._totals is not None else {}
+
+
+def _window_breakdown(window: BudgetTotals, rates: Dict[str, Decimal]) -> Tuple[Decimal, BudgetBreakdown]:
+    total, rows = _convert_breakdown(window.by_currency, rates)
+    return total, BudgetBreakdown(rows, window)
+
+
+def convert_accounts(
+    accounts: Dict[str, Dict[str, Decimal]], rates: Dict[str, Decimal]
+) -> List[Tuple[str, Dict[str, Decimal], Decimal]]:
+    """
+    [(account, {currency: amount}, total_in_op)] in account order; currencies
+    without a rate are left out of the total (as in _convert_breakdown).
+    """
+    return [(account, by_cur, _convert_breakdown(by_cur, rates)[0]) for account, by_cur in accounts.items()]
+
+
+# -------------------------------
+# Budget vs actual
+# -------------------------------
+def current_period(item: BudgetItem, day: datetime.date) -> Tuple[datetime.date, datetime.date]:
+    """
+    [start, end) of the period of `item` that contains `day` (on or after its
+    start): consecutive period starts as yielded by `occurrences`.
+    """
+    start = item.start.toordinal()
+    if item.freq == "weekly":
+        lo = start + (day.toordinal() - start) // 7 * 7
+        return datetime.date.fromordinal(lo), datetime.date.fromordinal(lo + 7)
+    step, first = _FREQ_MONTHS[item.freq], _month_index(item.start)
+    k = (_month_index(day) - first) // step
+    if _anchored(first + k * step, item.start.day) > day.toordinal():
+        k -= 1
+    lo, hi = (_anchored(first + j * step, item.start.day) for j in (k, k + 1))
+    return datetime.date.fromordinal(lo), datetime.date.fromordinal(hi)
+
+
+def _accrued_in_period(item: BudgetItem, period: Tuple[datetime.date, datetime.date],
+                       until: datetime.date, mode: str) -> Decimal:
+    """Budget accrued from the period start up to `until` (exclusive) in allocation `mode`."""
+    lo, hi = period
+    if mode == "lump":
+        return item.amount
+    if mode == "calendar":
+        stop = min(until, item.end) if item.end is not None else until
+        return item.amount * Decimal((stop - lo).days) / Decimal((hi - lo).days)
+    return _planned_amount_in_window(item, lo, until)
+
+
+@dataclass(frozen=True)
+class BudgetStatus:
+    """
+    One budgeted account in its current period: the budget `amount`, the part
+    `accrued` up to and including the report day, and the actual expenses
+    `spent` on the account and its sub-accounts, all in the budget currency.
+    `unconverted` holds spending in currencies without a rate.
+    """
+    account: str
+    freq: str
+    currency: str
+    period_start: datetime.date
+    period_end: datetime.date      # exclusive
+    amount: Decimal
+    accrued: Decimal
+    spent: Decimal
+    unconverted: Dict[str, Decimal]
+
+    @property
+    def remaining(self) -> Decimal:
+        return self.amount - self.spent
+
+
+def budget_periods(index: BudgetIndex, day: datetime.date) -> Dict[str, Tuple[BudgetItem, Tuple[datetime.date, datetime.date]]]:
+    """The budget running on `day` and its current period, per budgeted account."""
+    return {
+        it.account: (it, current_period(it, day))
+        for it in index.active(day, day + datetime.timedelta(days=1))
+    }
+
+
+def budget_report(
+    periods: Dict[str, Tuple[BudgetItem, Tuple[datetime.date, datetime.date]]],
+    spent: Dict[str, Dict[str, Decimal]],
+    day: datetime.date,
+    rates: Dict[str, Decimal],
+    mode: str = "average",
+) -> List[BudgetStatus]:
+    """
+    Join actual spending per budgeted account ({account: {currency: amount}},
+    e.g. from aggregate.aggregate_spending over the `periods`) with the
+    budgets, sorted by account. Spending in another currency is converted
+    through the operating-currency `rates`.
+    """
+    if mode not in BUDGET_MODES:
+        raise ValueError(f"Unknown budget mode: {mode!r} (expected one of {', '.join(BUDGET_MODES)})")
+    until = day + datetime.timedelta(days=1)
+    out: List[BudgetStatus] = []
+    for account in sorted(periods):
+        item, period = periods[account]
+        total, unconverted = Decimal("0"), {}
+        to_budget = rates.get(item.currency)
+        for cur, amt in spent.get(account, {}).items():
+            if cur == item.currency:
+                total += amt
+            elif to_budget and cur in rates:
+                total += amt * rates[cur] / to_budget
+            else:
+                unconverted[cur] = amt
+        out.append(BudgetStatus(
+            account, item.freq, item.currency, period[0], period[1], item.amount,
+            _accrued_in_period(item, period, until, mode), total, unconverted,
+        ))
+    return out
+
+
 # -------------------------------
 # Public API (kept name to avoid ripples)
 # -------------------------------
@@ -129,16 +957,45 @@ def compute_budget_planned_expenses(
     until: datetime.date,
     rates: Dict[str, Decimal],   # currency -> rate in operating currency
     op_cur: str,                 # kept for signature compatibility; not used here
+    mode: str = "average",       # see BUDGET_MODES
+    journal: Optional[str] = None,  # read budgets from this journal and its includes too
+    cache: Optional[QueryCache] = None,  # keeps the journal's budget entries between runs
+    loaded: bool = True,            # journal is loaded in process (api engine), see load_ledger_budget_index
 ) -> Tuple[Decimal, List[Tuple[str, Decimal, Optional[Decimal], Optional[Decimal]]]]:
     """
     Read custom 'budget' entries from budgets.bean and estimate future expenses for [today, until).
-    Method: evenly distribute each budget over its frequency period and sum the slice in the window.
+    With `journal`, budget entries of the ledger count too (see load_ledger_budget_index).
+    Method: evenly distribute each budget over its frequency period and sum the slice in the window;
+    periods have the average FREQ_DAYS length, or their real length with mode="calendar";
+    mode="lump" instead charges the whole amount on every period start in the window.
+    A later entry for the same account supersedes the earlier one (see BudgetIndex).
 
     Returns:
       total_in_op (Decimal),
-      breakdown list: [(currency, amount_in_cur, rate_or_None, converted_or_None)]
+      breakdown list: [(currency, amount_in_cur, rate_or_None, converted_or_None)],
+        a BudgetBreakdown whose `accounts` has the amounts per account with parent rollups
+    """
+    with stage("budgets"):
+        table = budget_index(budgets_path, journal, cache, loaded).table(today, until, mode)
+        return _window_breakdown(table.breakdown(today, [until])[0], rates)
+
+
+def compute_budget_planned_expenses_horizons(
+    budgets_path: str,
+    today: datetime.date,
+    untils: Iterable[datetime.date],
+    rates: Dict[str, Decimal],
+    op_cur: str,
+    mode: str = "average",
+    journal: Optional[str] = None,
+    cache: Optional[QueryCache] = None,
+    loaded: bool = True,
+) -> List[Tuple[Decimal, List[Tuple[str, Decimal, Optional[Decimal], Optional[Decimal]]]]]:
+    """
+    `compute_budget_planned_expenses` for several horizons from one compiled table.
+    Returns one (total_in_op, breakdown) pair per `until`, in the given order.
     """
-    items = load_budget_items(budgets_path)
-    by_currency = _sum_by_currency(items, today, until)
-    total_in_op, breakdown = _convert_breakdown(by_currency, rates)
-    return total_in_op, breakdown
+    untils = list(untils)
+    with stage("budgets"):
+        table = budget_index(budgets_path, journal, cache, loaded).table(today, max(untils, default=today), mode)
+        return [_window_breakdown(window, rates) for window in table.breakdown(today, untils)]
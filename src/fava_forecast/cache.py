@@ -0,0 +1,216 @@
+import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .instrument import count
+
+
+Row = Tuple[str, Decimal]  # (currency, amount)
+
+# Bump when the payload layout changes so stale entries are never decoded
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+_RX_INCLUDE = re.compile(r'^\s*include\s+"([^"]+)"')
+
+
+# ----------------------------------------------------------------
+# Locations
+# ----------------------------------------------------------------
+def default_cache_dir() -> Path:
+    """$XDG_CACHE_HOME/fava-forecast, falling back to ~/.cache/fava-forecast."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "fava-forecast"
+
+
+# ----------------------------------------------------------------
+# Journal fingerprint
+# ----------------------------------------------------------------
+# path -> (mtime_ns, size, include patterns); a file is rescanned only when it changes.
+# LRU, shared by query threads.
+_INCLUDES: "OrderedDict[str, Tuple[int, int, List[str]]]" = OrderedDict()
+_INCLUDES_MAX = 256
+_INCLUDES_LOCK = threading.Lock()
+
+
+def _include_patterns(path: str) -> List[str]:
+    st = os.stat(path)
+    with _INCLUDES_LOCK:
+        memo = _INCLUDES.get(path)
+        if memo is not None and memo[0] == st.st_mtime_ns and memo[1] == st.st_size:
+            _INCLUDES.move_to_end(path)
+            return memo[2]
+    with open(path, "r", encoding="utf-8") as f:
+        patterns = [m.group(1) for m in map(_RX_INCLUDE.match, f) if m]
+    with _INCLUDES_LOCK:
+        _INCLUDES[path] = (st.st_mtime_ns, st.st_size, patterns)
+        _INCLUDES.move_to_end(path)
+        while len(_INCLUDES) > _INCLUDES_MAX:
+            _INCLUDES.popitem(last=False)
+    return patterns
+
+
+def journal_files(journal_path: str) -> List[str]:
+    """
+    The journal and every file it includes (recursively, globs expanded).
+    Include lines are found by a plain text scan; the ledger is not parsed.
+    """
+    seen: List[str] = []
+    stack = [os.path.abspath(journal_path)]
+    while stack:
+        path = stack.pop()
+        if path in seen:
+            continue
+        seen.append(path)
+        try:
+            patterns = _include_patterns(path)
+        except OSError:
+            continue
+        base = os.path.dirname(path)
+        for pattern in reversed(patterns):
+            full = os.path.normpath(os.path.join(base, os.path.expanduser(pattern)))
+            stack.extend(sorted(glob.glob(full), reverse=True) or [full])
+    return seen
+
+
+def journal_fingerprint(journal_path: str, content_hash: bool = False) -> str:
+    """
+    Fingerprint of a journal and its includes: (path, mtime, size) of every file,
+    plus a SHA-256 of the contents when `content_hash` is set.
+    """
+    h = hashlib.sha256()
+    for path in journal_files(journal_path):
+        try:
+            st = os.stat(path)
+            h.update(f"{path}\0{st.st_mtime_ns}\0{st.st_size}\n".encode("utf-8"))
+        except OSError:
+            h.update(f"{path}\0missing\n".encode("utf-8"))
+            continue
+        if content_hash:
+            with open(path, "rb") as f:
+                h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+# ----------------------------------------------------------------
+# Payload encoding
+# ----------------------------------------------------------------
+def encode_rows(rows: Iterable[Row]) -> List[List[str]]:
+    return [[cur, str(amt)] for cur, amt in rows]
+
+
+def decode_rows(data: Iterable[List[str]]) -> List[Row]:
+    return [(cur, Decimal(amt)) for cur, amt in data]
+
+
+# ----------------------------------------------------------------
+# On-disk LRU cache
+# ----------------------------------------------------------------
+class QueryCache:
+    """
+    Query-result cache stored as one JSON file per key.
+
+    Keys combine the journal fingerprint with the query text (or any other
+    parts), so a changed journal or include simply misses. Recency is tracked
+    through file mtimes; once the directory grows past `max_bytes` the least
+    recently used entries are removed. The directory size is scanned once and
+    then tracked as entries are written; the directory is only listed again
+    when that estimate crosses `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        content_hash: bool = False,
+    ) -> None:
+        self.directory = Path(directory) if directory else default_cache_dir() / "queries"
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None   # bytes of entries, None until scanned
+        self._size_lock = threading.Lock()
+
+    def key(self, journal_path: str, *parts: str) -> str:
+        fp = journal_fingerprint(journal_path, self.content_hash)
+        h = hashlib.sha256(f"v{CACHE_VERSION}\0{fp}".encode("utf-8"))
+        for part in parts:
+            h.update(b"\0" + str(part).encode("utf-8"))
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            self.misses += 1
+            count("cache_misses")
+            return None
+        self.hits += 1
+        count("cache_hits")
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        path = self._path(key)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            written = os.path.getsize(tmp)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            return  # cache is best-effort
+        with self._size_lock:
+            if self._size is not None:
+                self._size += written - replaced
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop least recently used entries until the cache fits into max_bytes."""
+        try:
+            files = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        stats = [(e.stat().st_mtime_ns, e.stat().st_size, e.path) for e in files]
+        total = sum(size for _m, size, _p in stats)
+        for _mtime, size, path in sorted(stats):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        with self._size_lock:
+            self._size = total
+
+    def clear(self) -> None:
+        try:
+            for e in os.scandir(self.directory):
+                if e.name.endswith(".json"):
+                    os.remove(e.path)
+        except OSError:
+            pass
+        with self._size_lock:
+            self._size = None
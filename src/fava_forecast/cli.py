@@ -1,14 +1,28 @@
 # cli.py
 import argparse
 import datetime
+from .beancount_io import ENGINES
+from .budgets import BUDGET_MODES
+from .cache import QueryCache
 from .config import detect_operating_currency_from_journal
 from .rates import load_prices_to_op
-from .forecast import run_forecast
-from .formatters import print_breakdown, fmt_amount
+from .forecast import run_budget_report, run_forecast, run_forecast_timeline
+from .formatters import print_breakdown, print_budget_accounts, print_budget_report, print_rate_paths, print_timeline, print_timings, fmt_amount
+from .instrument import Recorder, recording
 
 # ----------------------------------------------------------------
 # CLI entry point
 # ----------------------------------------------------------------
+def _positive_int(value: str) -> int:
+    try:
+        n = int(value)
+    except ValueError:
+        n = 0
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value!r}")
+    return n
+
+
 def main():
     ap = argparse.ArgumentParser(description="Forecast runway to salary using Beancount + budgets")
     ap.add_argument("--journal", required=True, help="Path to main.bean")
@@ -20,8 +34,43 @@ def main():
     ap.add_argument("--accounts", default=None, help="Path to accounts.bean (required to use --future)")
     ap.add_argument("--currency", default="CRC", help="Override operating currency (default: 'CRC')")
     ap.add_argument("--verbose", action="store_true", help="Print per-currency breakdowns")
+    ap.add_argument("--engine", choices=ENGINES, default="auto",
+                    help="Query engine: in-process beanquery API or bean-query subprocess (default: auto)")
+    ap.add_argument("--budget-mode", choices=BUDGET_MODES, default="average",
+                    help="Spread budgets over average or real calendar periods, "
+                         "or charge each period in one lump on its start date (default: average)")
+    ap.add_argument("--no-cache", action="store_true", help="Do not read or write the on-disk query cache")
+    ap.add_argument("--cache-hash", action="store_true",
+                    help="Validate cached results by file contents, not only mtime/size")
+    ap.add_argument("--workers", type=_positive_int, default=1,
+                    help="Run independent queries on up to N threads (default: 1, sequential)")
+    ap.add_argument("--timeline", action="store_true",
+                    help="Print the projected balance for every day and the lowest point")
+    ap.add_argument("--budget-report", action="store_true",
+                    help="Print spent vs accrued vs budget for every budgeted account in its current period")
+    ap.add_argument("--timings", action="store_true",
+                    help="Print wall time per pipeline stage and query/parse counters")
     args = ap.parse_args()
 
+    rec = Recorder() if args.timings else None
+    with recording(rec):
+        _report(args)
+    if rec is not None:
+        print_timings(rec.as_dict())
+
+
+def _print_messages(messages) -> None:
+    for msg in messages:
+        lvl = msg.get("level", "info").upper()
+        code = msg.get("code", "")
+        text = msg.get("text", "")
+        if code:
+            print(f"[{lvl}] {code}: {text}")
+        else:
+            print(f"[{lvl}] {text}")
+
+
+def _report(args: argparse.Namespace) -> None:
     until = datetime.date.fromisoformat(args.until)
     today = datetime.date.fromisoformat(args.today) if args.today else datetime.date.today()
 
@@ -34,7 +83,9 @@ def main():
     print(f"Operating currency: {op_currency}")
     print(f"Today: {today}  Until(salary): {until}")
 
-    data = run_forecast(
+    cache = None if args.no_cache else QueryCache(content_hash=args.cache_hash)
+    forecast = run_forecast_timeline if args.timeline else run_forecast
+    data = forecast(
         journal=args.journal,
         budgets=args.budgets,
         prices=args.prices,
@@ -44,16 +95,13 @@ def main():
         verbose=args.verbose,
         future_journal=args.future,
         accounts=args.accounts,
+        engine=args.engine,
+        cache=cache,
+        workers=args.workers,
+        budget_mode=args.budget_mode,
     )
 
-    for msg in data.get("messages", []):
-        lvl = msg.get("level", "info").upper()
-        code = msg.get("code", "")
-        text = msg.get("text", "")
-        if code:
-            print(f"[{lvl}] {code}: {text}")
-        else:
-            print(f"[{lvl}] {text}")
+    _print_messages(data.get("messages", []))
 
     if data.get("past_future"):
         print("\nWARNING: the following planned entries are in the past, move them to your main ledger:")
@@ -63,11 +111,13 @@ def main():
 
     op_currency = data["op_currency"]
     if args.verbose:
+        print_rate_paths(data.get("rate_paths", {}))
         print_breakdown("ASSETS breakdown:", data["assets"][1], data["assets"][0], op_currency)
         print_breakdown("LIABILITIES breakdown:", data["liabs"][1], data["liabs"][0], op_currency)
         print_breakdown("PLANNED INCOME breakdown:", data["planned_income"][1], data["planned_income"][0], op_currency)
         print_breakdown("PLANNED EXPENSES breakdown:", data["planned_expenses"][1], data["planned_expenses"][0], op_currency)
         print_breakdown("BUDGETED EXPENSES breakdown (forecast):", data["planned_budget_exp"][1], data["planned_budget_exp"][0], op_currency)
+        print_budget_accounts(data.get("budget_accounts", []), op_currency)
 
     print(f"Assets:                         {fmt_amount(data['assets'][0]):>15} {op_currency}")
     print(f"Liabilities:                    {fmt_amount(-data['liabs'][0]):>15} {op_currency}")
@@ -79,6 +129,23 @@ def main():
     sign = "OK ✅" if data["ok"] else "DEFICIT ❌"
     print(f"Forecast end balance:           {fmt_amount(data['forecast_end']):>15} {op_currency}   [{sign}]")
 
+    if args.timeline:
+        print_timeline(data["timeline"], op_currency)
+
+    if args.budget_report:
+        report = run_budget_report(
+            journal=args.journal,
+            budgets=args.budgets,
+            prices=args.prices,
+            today=args.today,
+            currency=args.currency,
+            engine=args.engine,
+            cache=cache,
+            budget_mode=args.budget_mode,
+        )
+        _print_messages(report["messages"])
+        print_budget_report(report["rows"])
+
 
 if __name__ == "__main__":
     main()
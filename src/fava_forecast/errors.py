@@ -12,3 +12,8 @@ class BeanQueryError(RuntimeError):
 class PriceParseError(RuntimeError):
     """Raised when a price or rate line cannot be parsed."""
     pass
+
+
+class WorkerUnavailableError(RuntimeError):
+    """Raised when the resident bean-query worker cannot be reached."""
+    pass
@@ -2,13 +2,16 @@
 import datetime as dt
 from decimal import Decimal
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from flask import request
 from fava.ext import FavaExtensionBase
 
-from .forecast import run_forecast
+from .budgets import BUDGET_MODES
+from .cache import QueryCache
+from .forecast import convert_forecast, resolve_op_currency, run_budget_report, run_forecast, run_forecast_horizons
 from .formatters import fmt_amount
+from .instrument import Recorder, recording, stage
 from .rates import load_prices_to_op
 
 
@@ -26,6 +29,48 @@ def _parse_config(config: Optional[str]) -> Dict[str, str]:
     return out
 
 
+def _config_workers(value: str, messages: List[Dict[str, str]]) -> int:
+    """`workers=` from the extension config; anything but a positive integer falls back to 1."""
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers >= 1:
+        return workers
+    messages.append({
+        "level": "warning",
+        "code": "config-invalid-workers",
+        "text": f"Extension config workers={value!r} is not a positive integer; using 1.",
+    })
+    return 1
+
+
+def _config_budget_mode(value: str, messages: List[Dict[str, str]]) -> str:
+    """`budget_mode=` from the extension config; an unknown mode falls back to "average"."""
+    if value in BUDGET_MODES:
+        return value
+    messages.append({
+        "level": "warning",
+        "code": "config-invalid-budget-mode",
+        "text": f"Extension config budget_mode={value!r} is not one of {', '.join(BUDGET_MODES)}; using 'average'.",
+    })
+    return "average"
+
+
+def _horizon_summary(label: str, core: Dict[str, Any]) -> Dict[str, Any]:
+    """One column of the side-by-side horizon table."""
+    return {
+        "label": label,
+        "until": core["until"],
+        "net_now": core["net_now"],
+        "planned_income": core["planned_income"][0],
+        "planned_expenses": core["planned_expenses"][0],
+        "planned_budget_expenses": core["planned_budget_exp"][0],
+        "forecast_end": core["forecast_end"],
+        "ok": core["ok"],
+    }
+
+
 class BudgetForecast(FavaExtensionBase):
     """
     Fava extension that renders a summary forecast and optional breakdowns.
@@ -41,6 +86,8 @@ class BudgetForecast(FavaExtensionBase):
         self._cfg = _parse_config(config)
         self._cache_key = None
         self._cache_data = None
+        # optional on-disk query cache ("cache=on" in the extension config)
+        self._query_cache = QueryCache() if self._cfg.get("cache") in {"1", "true", "on", "yes"} else None
 
     # Exposed helper for formatting numbers in the template
     def fmt(self, x: Decimal) -> str:
@@ -48,6 +95,17 @@ class BudgetForecast(FavaExtensionBase):
 
     # Main data builder consumed by the template
     def data(self) -> Dict[str, Any]:
+        # "timings=on" in the config or ?timings=1 records stage timings for this request
+        on = {"1", "true", "True", "yes", "on"}
+        want = request.args.get("timings", self._cfg.get("timings")) in on
+        rec = Recorder() if want else None
+        with recording(rec), stage("fava-data"):
+            result = self._data()
+        if rec is not None:
+            result = dict(result, timings=rec.as_dict())
+        return result
+
+    def _data(self) -> Dict[str, Any]:
         # Resolve journal path and base dir
         journal_path = getattr(self.ledger, "beancount_file_path", None) or self.ledger.options.get("filename")
         base_dir = Path(str(journal_path)).resolve().parent
@@ -58,6 +116,11 @@ class BudgetForecast(FavaExtensionBase):
         until_param = q.get("until")
         currency_param = q.get("currency", self._cfg.get("currency", "CRC"))
         verbose = q.get("verbose") in {"1", "true", "True", "yes", "on"}
+        compare = q.get("compare", self._cfg.get("compare")) in {"1", "true", "True", "yes", "on"}
+        budget_report = q.get("budget_report", self._cfg.get("budget_report")) in {"1", "true", "True", "yes", "on"}
+        config_messages: List[Dict[str, str]] = []
+        budget_mode = _config_budget_mode(self._cfg.get("budget_mode", "average"), config_messages)
+        workers = _config_workers(self._cfg.get("workers", "1"), config_messages)
 
         today = today_param or dt.date.today().isoformat()
         default_until = (dt.date.fromisoformat(today) + dt.timedelta(days=14)).isoformat()
@@ -85,6 +148,7 @@ class BudgetForecast(FavaExtensionBase):
             available_currencies = sorted(rates_raw.keys())
         except Exception:
             # if prices missing / broken — fallback to current currency only
+            rates_raw = None
             available_currencies = [currency_param]
 
         # Param-based cache
@@ -98,21 +162,74 @@ class BudgetForecast(FavaExtensionBase):
             future,
             accounts,
             verbose,
+            compare,
+            budget_mode,
+            budget_report,
         )
         if getattr(self, "_cache_key", None) == cache_key and getattr(self, "_cache_data", None) is not None:
             return self._cache_data  # type: ignore[return-value]
 
-        core = run_forecast(
+        params = dict(
             journal=str(journal_path),
             budgets=str(budgets),
             prices=str(prices),
-            until=until,
             today=today,
             currency=currency_param,
             verbose=verbose,
             future_journal=str(future),
             accounts=str(accounts),
+            engine=self._cfg.get("engine", "auto"),
+            cache=self._query_cache,
+            workers=workers,
+            budget_mode=budget_mode,
         )
+        # Only the currency (or the budget report) changed: reuse the previous
+        # forecast, re-multiplying its rows with another row of the (cached)
+        # rate matrix instead of re-querying.
+        core_key = (
+            str(journal_path),
+            today,
+            until,
+            budgets,
+            prices,
+            future,
+            accounts,
+            verbose,
+            compare,
+            budget_mode,
+        )
+        op_currency = resolve_op_currency(str(journal_path), currency_param)
+        prev = getattr(self, "_core", None)
+        if prev is not None and prev[0] == core_key and prev[1][0]["op_currency"] == op_currency:
+            sweep = prev[1]
+        elif prev is not None and prev[0] == core_key and rates_raw is not None:
+            rates = rates_raw if op_currency == currency_param else load_prices_to_op(prices, op_currency, today_date)
+            with stage("convert"):
+                sweep = [convert_forecast(r, rates, op_currency) for r in prev[1]]
+        else:
+            if compare:
+                # selected range and every quick range from one evaluation
+                sweep = run_forecast_horizons(untils=[until] + list(quick_until.values()), **params)
+            else:
+                sweep = [run_forecast(until=until, **params)]
+            self._core = (core_key, sweep)
+
+        report_rows: List[Any] = []
+        if budget_report:
+            report = run_budget_report(
+                journal=str(journal_path),
+                budgets=str(budgets),
+                prices=str(prices),
+                today=today,
+                currency=currency_param,
+                engine=params["engine"],
+                cache=self._query_cache,
+                budget_mode=budget_mode,
+            )
+            report_rows = report["rows"]
+
+        core = sweep[0]
+        horizons = [_horizon_summary(label, r) for label, r in zip(quick_until, sweep[1:])]
 
         cur = core["op_currency"]
         assets_total, assets_br = core["assets"]
@@ -129,9 +246,15 @@ class BudgetForecast(FavaExtensionBase):
             "until": core["until"],
             "quick_until": quick_until,
             "verbose": verbose,
+            "compare": compare,
+            "budget_report": budget_report,
+            "budget_status": report_rows,
+            "horizons": horizons,
             "paths": {"budgets": budgets, "prices": prices, "future": future, "accounts": accounts},
             "past_future": past_future,
-            "messages": core.get("messages", []),
+            "messages": config_messages + core.get("messages", []),
+            "rate_paths": {c: chain for c, chain in core.get("rate_paths", {}).items() if len(chain) > 2},
+            "budget_accounts": core.get("budget_accounts", []),
             "summary": {
                 "assets": assets_total,
                 "liabs": liabs_total,
@@ -1,18 +1,51 @@
 # forecast.py
+import asyncio
 import datetime
+import hashlib
+import os
 import tempfile
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
 from pathlib import Path
 from decimal import Decimal
-from typing import Any, Dict, List, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 
+from .aggregate import (
+    Buckets,
+    aggregate_buckets,
+    aggregate_horizons,
+    aggregate_spending,
+    bin_dated_rows,
+    bin_spending_rows,
+    bucket_rows,
+    merge_buckets,
+)
 from .beancount_io import (
-    beanquery_grouped_amounts,
-    beanquery_run_lines,
-    beanquery_table_body,
+    beanquery_csv_account_amounts,
+    beanquery_csv_amounts,
+    beanquery_dated_rows,
+    beanquery_grouped_rows,
+    beanquery_lines,
+    beanquery_run_csv,
+    beanquery_run_csv_async,
+    beanquery_run_lines_async,
+    load_ledger,
+    resolve_engine,
+)
+from .budgets import (
+    BudgetStatus,
+    budget_index,
+    budget_periods,
+    budget_report,
+    compute_budget_planned_expenses,
+    compute_budget_planned_expenses_horizons,
+    convert_accounts,
 )
-from .budgets import compute_budget_planned_expenses
+from .cache import QueryCache, decode_rows, encode_rows
 from .config import detect_operating_currency_from_journal
 from .convert import amounts_to_converted_breakdown
+from .instrument import Hook, Recorder, active, in_context, recording, stage
 from .rates import load_prices_to_op
 
 
@@ -56,12 +89,26 @@ def q_future_expenses(today: datetime.date, until: datetime.date) -> str:
     )
 
 
+def q_spending(since: datetime.date, until: datetime.date) -> str:
+    return (
+        "SELECT date, account, currency, sum(position) "
+        "WHERE account ~ '^Expenses' "
+        f"AND date >= {since.isoformat()} AND date < {until.isoformat()} "
+        "AND 'planned' NOT IN tags GROUP BY date, account, currency"
+    )
+
+
 # ----------------------------------------------------------------
 # Helpers
 # ----------------------------------------------------------------
-def run_grouped_rows(journal_path: str, query: str, messages: list[dict[str, str]] | None = None) -> List[Row]:
+def run_grouped_rows(
+    journal_path: str,
+    query: str,
+    messages: list[dict[str, str]] | None = None,
+    engine: str = "auto",
+) -> List[Row]:
     try:
-        lines, warns = beanquery_run_lines(journal_path, query)
+        rows, warns = beanquery_grouped_rows(journal_path, query, engine)
         if messages is not None:
             for w in warns:
                 messages.append(
@@ -71,8 +118,7 @@ def run_grouped_rows(journal_path: str, query: str, messages: list[dict[str, str
                         "text": w,
                     }
                 )
-        body = beanquery_table_body(lines)
-        return beanquery_grouped_amounts(body)
+        return rows
     except Exception as exc:
         if messages is not None:
             messages.append(
@@ -114,16 +160,37 @@ def _extract_account_decls(accounts_path: str) -> str:
     return "\n".join(decls)
 
 
-def _build_enriched_future(future_path: str, accounts_path: str) -> str:
+def _build_enriched_future(future_path: str, accounts_path: str, directory: Path | None = None) -> str:
     """
-    Build a temp file that contains account/commodity declarations
+    Build a file that contains account/commodity declarations
     followed by the original future journal.
-    Returns path to the temp file.
+    Returns path to the built file.
+
+    With a `directory` (the query cache's, when one is configured) the file
+    is stable per (future, accounts) path and rewritten only when the content
+    changes, so it keeps its mtime and cached results for it stay valid;
+    otherwise it is a one-off temp file.
     """
     decls = _extract_account_decls(accounts_path)
     future_txt = Path(future_path).read_text(encoding="utf-8")
     combined = decls + "\n" + future_txt if decls else future_txt
 
+    if directory is not None:
+        name = hashlib.sha1(
+            f"{os.path.abspath(future_path)}\0{os.path.abspath(accounts_path)}".encode("utf-8")
+        ).hexdigest()[:16]
+        out = directory / "enriched" / f"future-{name}.bean"
+        try:
+            if not out.exists() or out.read_text(encoding="utf-8") != combined:
+                out.parent.mkdir(parents=True, exist_ok=True)
+                fd, tmp_name = tempfile.mkstemp(dir=out.parent, suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(combined)
+                os.replace(tmp_name, out)
+            return str(out)
+        except OSError:
+            pass  # cache dir not writable -> one-off temp file
+
     tmp = tempfile.NamedTemporaryFile("w+", suffix=".bean", delete=False)
     tmp.write(combined)
     tmp.flush()
@@ -131,52 +198,269 @@ def _build_enriched_future(future_path: str, accounts_path: str) -> str:
     return tmp.name
 
 
-def run_grouped_rows_all(
-    journals: List[str],
+_MISS = object()
+
+
+def _cache_lookup(
+    cache: QueryCache | None,
+    journal_path: str,
+    parts: Tuple[str, ...],
+    messages: List[Dict[str, str]],
+    decode: Callable[[Any], Any],
+) -> Tuple[str | None, Any]:
+    """(key, decoded value or _MISS); cached messages are replayed into `messages`."""
+    if cache is None:
+        return None, _MISS
+    key = cache.key(journal_path, *parts)
+    hit = cache.get(key)
+    if hit is None:
+        return key, _MISS
+    messages.extend(hit["messages"])
+    return key, decode(hit["value"])
+
+
+def _cache_store(
+    cache: QueryCache | None,
+    key: str | None,
+    value: Any,
+    local: List[Dict[str, str]],
+    encode: Callable[[Any], Any],
+) -> None:
+    """Store a computed value with its messages, unless the run reported a beanquery error."""
+    if cache is None or key is None:
+        return
+    if not any(m.get("code") == "beanquery-error" for m in local):
+        cache.put(key, {"value": encode(value), "messages": local})
+
+
+def _through_cache(
+    cache: QueryCache | None,
+    journal_path: str,
+    parts: Tuple[str, ...],
+    messages: List[Dict[str, str]],
+    compute: Callable[[List[Dict[str, str]]], Any],
+    encode: Callable[[Any], Any],
+    decode: Callable[[Any], Any],
+) -> Any:
+    """
+    Serve `compute(messages)` from the query cache when possible.
+    Messages produced by the computation are cached with its result;
+    runs that reported a beanquery error are not stored.
+    """
+    if cache is None:
+        return compute(messages)
+
+    key, value = _cache_lookup(cache, journal_path, parts, messages, decode)
+    if value is not _MISS:
+        return value
+
+    local: List[Dict[str, str]] = []
+    value = compute(local)
+    messages.extend(local)
+    _cache_store(cache, key, value, local, encode)
+    return value
+
+
+def cached_grouped_rows(
+    journal_path: str,
     query: str,
     messages: List[Dict[str, str]],
+    engine: str = "auto",
+    cache: QueryCache | None = None,
 ) -> List[Row]:
+    """`run_grouped_rows` behind the optional on-disk query cache."""
+    return _through_cache(
+        cache,
+        journal_path,
+        ("rows", query),
+        messages,
+        lambda msgs: run_grouped_rows(journal_path, query, msgs, engine),
+        encode_rows,
+        decode_rows,
+    )
+
+
+def _run_tasks(
+    tasks: List[Callable[[List[Dict[str, str]]], Any]],
+    messages: List[Dict[str, str]],
+    pool: Executor | None = None,
+) -> List[Any]:
+    """
+    Run independent tasks, each taking a messages list, inline or on `pool`.
+    Results and messages are merged in task order, so the outcome does not
+    depend on scheduling.
+    """
+    if pool is None:
+        return [task(messages) for task in tasks]
+    logs: List[List[Dict[str, str]]] = [[] for _ in tasks]
+    futures = [pool.submit(in_context(task), log) for task, log in zip(tasks, logs)]
+    results = [f.result() for f in futures]
+    for log in logs:
+        messages.extend(log)
+    return results
+
+
+def _sum_rows(parts: List[List[Row]]) -> List[Row]:
     acc: dict[str, Decimal] = {}
-    for j in journals:
-        rows = run_grouped_rows(j, query, messages)
+    for rows in parts:
         for cur, amt in rows:
             acc[cur] = acc.get(cur, Decimal("0")) + amt
     return list(acc.items())
 
 
+def run_grouped_rows_all(
+    journals: List[str],
+    query: str,
+    messages: List[Dict[str, str]],
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    pool: Executor | None = None,
+) -> List[Row]:
+    tasks = [partial(cached_grouped_rows, j, query, engine=engine, cache=cache) for j in journals]
+    return _sum_rows(_run_tasks(tasks, messages, pool))
+
+
+def run_bucket_rows(
+    journal_path: str,
+    today: datetime.date,
+    until: datetime.date,
+    messages: List[Dict[str, str]] | None = None,
+) -> Buckets:
+    """
+    Load one journal in-process and fill all forecast buckets in a single pass.
+    Failures are reported to `messages` and yield empty buckets.
+    """
+    return run_horizon_buckets(journal_path, today, [until], messages)[0]
+
+
+def run_horizon_buckets(
+    journal_path: str,
+    today: datetime.date,
+    untils: List[datetime.date],
+    messages: List[Dict[str, str]] | None = None,
+) -> List[Buckets]:
+    """`run_bucket_rows` for several sorted `until` dates, still one pass."""
+    try:
+        entries, warns, _options = load_ledger(journal_path)
+    except Exception as exc:
+        if messages is not None:
+            messages.append(
+                {
+                    "level": "warning",
+                    "code": "beanquery-error",
+                    "text": f"Loading {journal_path} failed: {exc}",
+                }
+            )
+        entries, warns = [], []
+    if messages is not None:
+        for w in warns:
+            messages.append(
+                {
+                    "level": "warning",
+                    "code": "beanquery-warning",
+                    "text": w,
+                }
+            )
+    with stage("aggregate"):
+        return aggregate_horizons(entries, today, untils)
+
+
+def collect_bucket_rows(
+    journals: List[str],
+    today: datetime.date,
+    until: datetime.date,
+    messages: List[Dict[str, str]],
+    engine: str = "api",
+    cache: QueryCache | None = None,
+    pool: Executor | None = None,
+) -> Dict[str, List[Row]]:
+    """
+    Grouped (currency, amount) rows for every forecast bucket.
+
+    Assets and liabilities come from the main journal (journals[0]);
+    income and expenses are summed over all journals.
+
+    The "api" engine walks each loaded ledger once; "subprocess" runs
+    the four grouped queries through bean-query. With a `pool`, journals
+    (or queries) are processed concurrently.
+    """
+    if engine == "api":
+        tasks = [
+            partial(
+                _through_cache,
+                cache,
+                j,
+                ("buckets", today.isoformat(), until.isoformat()),
+                compute=partial(run_bucket_rows, j, today, until),
+                encode=lambda b: {name: encode_rows(amounts.items()) for name, amounts in b.items()},
+                decode=lambda d: {name: dict(decode_rows(rows)) for name, rows in d.items()},
+            )
+            for j in journals
+        ]
+        parts = _run_tasks(tasks, messages, pool)
+        future = merge_buckets(parts, ("income", "expenses"))
+        return {
+            "assets": bucket_rows(parts[0], "assets"),
+            "liabs": bucket_rows(parts[0], "liabs"),
+            "income": bucket_rows(future, "income"),
+            "expenses": bucket_rows(future, "expenses"),
+        }
+
+    # one flat task list so every query can run at once
+    main = journals[0]
+    n = len(journals)
+    queries = (
+        [(main, q_assets(until)), (main, q_liabs(until))]
+        + [(j, q_future_income(today, until)) for j in journals]
+        + [(j, q_future_expenses(today, until)) for j in journals]
+    )
+    tasks = [partial(cached_grouped_rows, j, q, engine=engine, cache=cache) for j, q in queries]
+    results = _run_tasks(tasks, messages, pool)
+    return {
+        "assets": results[0],
+        "liabs": results[1],
+        "income": _sum_rows(results[2:2 + n]),
+        "expenses": _sum_rows(results[2 + n:]),
+    }
+
+
 # ----------------------------------------------------------------
 # Core forecast logic
 # ----------------------------------------------------------------
-def run_forecast(
+@dataclass
+class _ForecastPlan:
+    """Inputs resolved before any query runs; shared by the sync and async pipelines."""
+    engine: str
+    today: datetime.date
+    until: datetime.date
+    op_currency: str
+    rates: Dict[str, Decimal]
+    journals: List[str]
+    messages: List[Dict[str, str]]
+    past_path: str | None = None   # journal checked for planned entries before `today`
+    q_past: str = ""
+
+
+def _plan_forecast(
     journal: str,
-    budgets: str,
     prices: str,
     until: str,
-    today: str | None = None,
-    currency: str = "CRC",
-    verbose: bool = False,
-    future_journal: str | None = None,
-    accounts: str | None = None,
-) -> Dict[str, Any]:
-    """Core forecasting logic used by both CLI and Fava extension."""
+    today: str | None,
+    currency: str,
+    future_journal: str | None,
+    accounts: str | None,
+    engine: str,
+    cache: QueryCache | None = None,
+) -> _ForecastPlan:
+    engine = resolve_engine(engine)
     until_date = datetime.date.fromisoformat(until)
     today_date = datetime.date.fromisoformat(today) if today else datetime.date.today()
 
     messages: List[Dict[str, str]] = []
 
-    op_currency = currency
-    if op_currency == "CRC":
-        op_currency = detect_operating_currency_from_journal(journal, default_cur="CRC")
-
+    op_currency = resolve_op_currency(journal, currency)
     rates = load_prices_to_op(prices, op_currency, today_date)
 
-    # assets / liabilities from main journal
-    rows_assets = run_grouped_rows(journal, q_assets(until_date), messages)
-    assets_total, assets_br = amounts_to_converted_breakdown(rows_assets, rates)
-
-    rows_liabs = run_grouped_rows(journal, q_liabs(until_date), messages)
-    liabs_total, liabs_br = amounts_to_converted_breakdown(rows_liabs, rates)
-
     # decide what to use for future
     journals = [journal]
     enriched_future_path: str | None = None
@@ -184,7 +468,8 @@ def run_forecast(
     if future_journal:
         if accounts:
             # build enriched future journal so beanquery knows accounts
-            enriched_future_path = _build_enriched_future(future_journal, accounts)
+            directory = cache.directory if cache is not None else None
+            enriched_future_path = _build_enriched_future(future_journal, accounts, directory)
             journals.append(enriched_future_path)
         else:
             messages.append(
@@ -195,37 +480,266 @@ def run_forecast(
                 }
             )
 
+    plan = _ForecastPlan(engine, today_date, until_date, op_currency, rates, journals, messages)
+
+    # past future rows (only if we actually enriched and used future)
+    if future_journal and accounts:
+        plan.past_path = enriched_future_path or future_journal
+        plan.q_past = (
+            "SELECT date, narration, account, position "
+            f"WHERE date < {today_date.isoformat()} "
+        )
+    return plan
+
+
+def _ledger_budgets(plan: _ForecastPlan, cache: QueryCache | None) -> Tuple[str, QueryCache | None, bool]:
+    """
+    (journal, cache, loaded) arguments for the budget computation: the journal's
+    budget entries count with every engine, taken from the ledger loaded in
+    process only with the api engine; the others read the journal's budget
+    lines (see budgets.load_ledger_budget_index).
+    """
+    return plan.journals[0], cache, plan.engine == "api"
+
+
+def _record_past_entries(plan: _ForecastPlan, outcome: Any) -> List[str]:
+    """
+    Turn the past-entries query outcome — (lines, warnings) or the raised
+    exception — into the result rows and user-facing messages.
+    """
+    messages = plan.messages
+    if isinstance(outcome, Exception):
+        messages.append(
+            {
+                "level": "warning",
+                "code": "future-past-query-failed",
+                "text": f"Failed to load past planned entries from future journal: {outcome}",
+            }
+        )
+        return []
+
+    past_future_rows, past_warns = outcome
+
+    # also surface warnings from this query
+    for w in past_warns:
+        messages.append(
+            {
+                "level": "warning",
+                "code": "beanquery-warning",
+                "text": w,
+            }
+        )
+    if past_future_rows:
+        messages.append(
+            {
+                "level": "info",
+                "code": "future-past-entries",
+                "text": "There are planned entries dated before the forecast start. Please move them to the main ledger.",
+            }
+        )
+    return past_future_rows
+
+
+def _finish_forecast(
+    plan: _ForecastPlan,
+    rows: Dict[str, List[Row]],
+    past_future_rows: List[str],
+    budget: Tuple[Decimal, List[Any]],
+    verbose: bool,
+) -> Dict[str, Any]:
+    rates = plan.rates
+
+    # assets / liabilities from main journal
+    assets_total, assets_br = amounts_to_converted_breakdown(rows["assets"], rates)
+    liabs_total, liabs_br = amounts_to_converted_breakdown(rows["liabs"], rates)
+
     # future income / expenses
-    rows_pin = run_grouped_rows_all(journals, q_future_income(today_date, until_date), messages)
     # income is credit -> invert
-    rows_pin = [(cur, -amt) for (cur, amt) in rows_pin]
+    rows_pin = [(cur, -amt) for (cur, amt) in rows["income"]]
     planned_income, pin_br = amounts_to_converted_breakdown(rows_pin, rates)
+    planned_exp, pexp_br = amounts_to_converted_breakdown(rows["expenses"], rates)
+    result = {
+        "op_currency": plan.op_currency,
+        "today": plan.today,
+        "until": plan.until,
+        "assets": (assets_total, assets_br),
+        "liabs": (liabs_total, liabs_br),
+        "planned_income": (planned_income, pin_br),
+        "planned_expenses": (planned_exp, pexp_br),
+        "planned_budget_exp": budget,
+        # per account with parent rollups: [(account, {currency: amount}, total_in_op)]
+        "budget_accounts": convert_accounts(getattr(budget[1], "accounts", {}), rates) if verbose else [],
+        "verbose": verbose,
+        "past_future": past_future_rows,
+        "messages": plan.messages,
+        "rate_paths": getattr(rates, "paths", {}),
+    }
+    return _with_totals(result)
+
 
-    rows_pexp = run_grouped_rows_all(journals, q_future_expenses(today_date, until_date), messages)
-    planned_exp, pexp_br = amounts_to_converted_breakdown(rows_pexp, rates)
+def _with_totals(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill net_now / forecast_end / ok from the section totals."""
+    net_now = result["assets"][0] + result["liabs"][0]
+    total_future_exp = result["planned_expenses"][0] + result["planned_budget_exp"][0]
+    forecast_end = (net_now + result["planned_income"][0] - total_future_exp).quantize(Decimal("0.01"))
+    result.update(net_now=net_now, forecast_end=forecast_end, ok=forecast_end >= 0)
+    return result
 
-    # budgets
-    planned_budget_exp, budg_br = compute_budget_planned_expenses(
-        budgets, today_date, until_date, rates, op_currency
+
+# ----------------------------------------------------------------
+# Operating currency
+# ----------------------------------------------------------------
+_SECTIONS = ("assets", "liabs", "planned_income", "planned_expenses", "planned_budget_exp")
+
+
+def resolve_op_currency(journal: str, currency: str) -> str:
+    """`currency`, except that the default "CRC" defers to the journal's operating_currency."""
+    if currency == "CRC":
+        return detect_operating_currency_from_journal(journal, default_cur="CRC")
+    return currency
+
+
+def convert_forecast(result: Dict[str, Any], rates: Dict[str, Decimal], op_currency: str) -> Dict[str, Any]:
+    """
+    The same forecast in another operating currency: every per-currency row
+    of every section is re-multiplied with `rates` (e.g. a RateMatrix table
+    for `op_currency`). Nothing is queried or re-read.
+    """
+    out = dict(result, op_currency=op_currency, rate_paths=getattr(rates, "paths", {}))
+    for key in _SECTIONS:
+        rows = [(cur, amt) for cur, amt, _rate, _conv in result[key][1]]
+        out[key] = amounts_to_converted_breakdown(rows, rates)
+    out["budget_accounts"] = convert_accounts(
+        {account: by_cur for account, by_cur, _total in result.get("budget_accounts", [])}, rates
     )
+    return _with_totals(out)
 
-    # totals
-    net_now = assets_total + liabs_total
-    total_future_exp = planned_exp + planned_budget_exp
-    forecast_end = (net_now + planned_income - total_future_exp).quantize(Decimal("0.01"))
 
-    # past future rows (only if we actually enriched and used future)
-    past_future_rows: List[str] = []
-    if future_journal and accounts:
-        q_past = (
-            "SELECT date, narration, account, position "
-            f"WHERE date < {today_date.isoformat()} "
+def run_forecast(
+    journal: str,
+    budgets: str,
+    prices: str,
+    until: str,
+    today: str | None = None,
+    currency: str = "CRC",
+    verbose: bool = False,
+    future_journal: str | None = None,
+    accounts: str | None = None,
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    workers: int = 1,
+    timings: bool = False,
+    hook: Hook | None = None,
+    budget_mode: str = "average",
+) -> Dict[str, Any]:
+    """
+    Core forecasting logic used by both CLI and Fava extension.
+
+    `engine` selects how the ledger is read (see beancount_io.ENGINES):
+    in-process with a single aggregation pass per journal, or one
+    `bean-query` per query. With a `cache`, query results are reused
+    for as long as the journal and its includes are unchanged.
+    `workers` > 1 runs independent queries on a bounded thread pool.
+
+    With `timings`, the result gains a "timings" entry with wall time per
+    stage and pipeline counters (see instrument.py); `hook` receives every
+    stage and counter update as it happens. When a recorder is already
+    active (e.g. set up by the caller), stages are recorded there instead
+    and "timings" is a snapshot of that recorder.
+
+    `budget_mode` selects how budgets accrue (see budgets.BUDGET_MODES).
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    rec = active()
+    if rec is None and (timings or hook is not None):
+        rec = Recorder(hook)
+    with recording(rec), stage("forecast"):
+        result = _run_forecast(
+            journal, budgets, prices, until, today, currency, verbose,
+            future_journal, accounts, engine, cache, workers, budget_mode,
         )
-        try:
-            past_future_rows, past_warns = beanquery_run_lines(enriched_future_path or future_journal, q_past)
+    if timings:
+        result["timings"] = rec.as_dict()
+    return result
+
 
-            # also surface warnings from this query
-            for w in past_warns:
+def _run_forecast(
+    journal: str,
+    budgets: str,
+    prices: str,
+    until: str,
+    today: str | None,
+    currency: str,
+    verbose: bool,
+    future_journal: str | None,
+    accounts: str | None,
+    engine: str,
+    cache: QueryCache | None,
+    workers: int,
+    budget_mode: str,
+) -> Dict[str, Any]:
+    with stage("setup"):
+        plan = _plan_forecast(journal, prices, until, today, currency, future_journal, accounts, engine, cache)
+
+    past_query = None
+    if plan.past_path is not None:
+        past_path, q_past = plan.past_path, plan.q_past
+        past_query = partial(
+            _through_cache,
+            cache,
+            past_path,
+            ("lines", q_past),
+            [],
+            lambda _msgs: beanquery_lines(past_path, q_past, plan.engine),
+            list,
+            tuple,
+        )
+
+    past_future_rows: List[str] = []
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        past_job = pool.submit(in_context(past_query)) if pool is not None and past_query is not None else None
+        with stage("queries"):
+            rows = collect_bucket_rows(plan.journals, plan.today, plan.until, plan.messages, plan.engine, cache, pool)
+            if past_query is not None:
+                try:
+                    outcome = past_job.result() if past_job is not None else past_query()
+                except Exception as exc:
+                    outcome = exc
+                past_future_rows = _record_past_entries(plan, outcome)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    budget = compute_budget_planned_expenses(
+        budgets, plan.today, plan.until, plan.rates, plan.op_currency, budget_mode, *_ledger_budgets(plan, cache)
+    )
+    with stage("totals"):
+        return _finish_forecast(plan, rows, past_future_rows, budget, verbose)
+
+
+# ----------------------------------------------------------------
+# Horizon sweep
+# ----------------------------------------------------------------
+def _by_date(query: str) -> str:
+    """Turn a grouped (currency, amount) query into its per-date variant."""
+    return query.replace("SELECT currency,", "SELECT date, currency,", 1).replace(
+        "GROUP BY currency", "GROUP BY date, currency", 1
+    )
+
+
+def run_dated_rows(
+    journal_path: str,
+    query: str,
+    messages: List[Dict[str, str]] | None = None,
+    engine: str = "auto",
+) -> List[Tuple[datetime.date, str, Decimal]]:
+    """`run_grouped_rows` for (date, currency, amount) queries grouped by date."""
+    try:
+        rows, warns = beanquery_dated_rows(journal_path, query, engine)
+        if messages is not None:
+            for w in warns:
                 messages.append(
                     {
                         "level": "warning",
@@ -233,37 +747,579 @@ def run_forecast(
                         "text": w,
                     }
                 )
-        except Exception as exc:
+        return rows
+    except Exception as exc:
+        if messages is not None:
             messages.append(
                 {
                     "level": "warning",
-                    "code": "future-past-query-failed",
-                    "text": f"Failed to load past planned entries from future journal: {exc}",
+                    "code": "beanquery-error",
+                    "text": f"Beanquery failed for {journal_path} and query '{query}': {exc}",
                 }
             )
+        return []
+
+
+def collect_horizon_rows(
+    journals: List[str],
+    today: datetime.date,
+    untils: List[datetime.date],
+    messages: List[Dict[str, str]],
+    engine: str = "api",
+    cache: QueryCache | None = None,
+    pool: Executor | None = None,
+) -> List[Dict[str, List[Row]]]:
+    """
+    `collect_bucket_rows` for every date in `untils` (sorted ascending) at once.
+
+    The "api" engine bins each posting by cutoff in a single pass per journal;
+    "subprocess" runs the four queries once up to the last cutoff, grouped by
+    date, and bins the dated rows. Either way the per-horizon totals are
+    cumulative sums over the cutoff slices.
+    """
+    if engine == "api":
+        stamp = tuple(u.isoformat() for u in untils)
+        tasks = [
+            partial(
+                _through_cache,
+                cache,
+                j,
+                ("horizons", today.isoformat()) + stamp,
+                compute=partial(run_horizon_buckets, j, today, untils),
+                encode=lambda hs: [
+                    {name: encode_rows(amounts.items()) for name, amounts in b.items()} for b in hs
+                ],
+                decode=lambda d: [
+                    {name: dict(decode_rows(rows)) for name, rows in b.items()} for b in d
+                ],
+            )
+            for j in journals
+        ]
+        parts = _run_tasks(tasks, messages, pool)
+        out = []
+        for k in range(len(untils)):
+            future = merge_buckets([p[k] for p in parts], ("income", "expenses"))
+            out.append(
+                {
+                    "assets": bucket_rows(parts[0][k], "assets"),
+                    "liabs": bucket_rows(parts[0][k], "liabs"),
+                    "income": bucket_rows(future, "income"),
+                    "expenses": bucket_rows(future, "expenses"),
+                }
+            )
+        return out
+
+    main = journals[0]
+    n = len(journals)
+    last = untils[-1]
+    queries = (
+        [(main, q_assets(last)), (main, q_liabs(last))]
+        + [(j, q_future_income(today, last)) for j in journals]
+        + [(j, q_future_expenses(today, last)) for j in journals]
+    )
+    tasks = [
+        partial(
+            _through_cache,
+            cache,
+            j,
+            ("dated", _by_date(q)),
+            compute=lambda msgs, j=j, q=q: run_dated_rows(j, _by_date(q), msgs, engine),
+            encode=lambda rows: [[d.isoformat(), cur, str(amt)] for d, cur, amt in rows],
+            decode=lambda data: [(datetime.date.fromisoformat(d), cur, Decimal(amt)) for d, cur, amt in data],
+        )
+        for j, q in queries
+    ]
+    binned = [bin_dated_rows(rows, untils) for rows in _run_tasks(tasks, messages, pool)]
+    return [
+        {
+            "assets": binned[0][k],
+            "liabs": binned[1][k],
+            "income": _sum_rows([b[k] for b in binned[2:2 + n]]),
+            "expenses": _sum_rows([b[k] for b in binned[2 + n:]]),
+        }
+        for k in range(len(untils))
+    ]
+
+
+def run_forecast_horizons(
+    journal: str,
+    budgets: str,
+    prices: str,
+    untils: List[str],
+    today: str | None = None,
+    currency: str = "CRC",
+    verbose: bool = False,
+    future_journal: str | None = None,
+    accounts: str | None = None,
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    workers: int = 1,
+    budget_mode: str = "average",
+) -> List[Dict[str, Any]]:
+    """
+    Forecast several `until` dates in one evaluation.
+
+    Returns one `run_forecast` result per entry of `untils`, in the given
+    order. The ledger is read once (one pass per journal, or one date-grouped
+    query per bucket), budgets.bean is parsed once, and prices are loaded once;
+    each horizon is then a cumulative sum up to its cutoff.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be >= 1, got {workers}")
+    if not untils:
+        return []
+    with stage("forecast"):
+        return _run_forecast_horizons(
+            journal, budgets, prices, untils, today, currency, verbose,
+            future_journal, accounts, engine, cache, workers, budget_mode,
+        )
+
+
+def _run_forecast_horizons(
+    journal: str,
+    budgets: str,
+    prices: str,
+    untils: List[str],
+    today: str | None,
+    currency: str,
+    verbose: bool,
+    future_journal: str | None,
+    accounts: str | None,
+    engine: str,
+    cache: QueryCache | None,
+    workers: int,
+    budget_mode: str,
+) -> List[Dict[str, Any]]:
+    last = max(untils, key=datetime.date.fromisoformat)
+    with stage("setup"):
+        plan = _plan_forecast(journal, prices, last, today, currency, future_journal, accounts, engine, cache)
+    dates = sorted({datetime.date.fromisoformat(u) for u in untils})
+
+    past_future_rows: List[str] = []
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with stage("queries"):
+            rows = collect_horizon_rows(plan.journals, plan.today, dates, plan.messages, plan.engine, cache, pool)
+            if plan.past_path is not None:
+                try:
+                    outcome = _through_cache(
+                        cache,
+                        plan.past_path,
+                        ("lines", plan.q_past),
+                        [],
+                        lambda _msgs: beanquery_lines(plan.past_path, plan.q_past, plan.engine),
+                        list,
+                        tuple,
+                    )
+                except Exception as exc:
+                    outcome = exc
+                past_future_rows = _record_past_entries(plan, outcome)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    budget = compute_budget_planned_expenses_horizons(
+        budgets, plan.today, dates, plan.rates, plan.op_currency, budget_mode, *_ledger_budgets(plan, cache)
+    )
+    with stage("totals"):
+        by_until = {
+            d: _finish_forecast(replace(plan, until=d), rows[k], past_future_rows, budget[k], verbose)
+            for k, d in enumerate(dates)
+        }
+    return [by_until[datetime.date.fromisoformat(u)] for u in untils]
+
+
+# ----------------------------------------------------------------
+# Daily timeline
+# ----------------------------------------------------------------
+def forecast_timeline(series: List[Tuple[datetime.date, Decimal]]) -> Dict[str, Any]:
+    """
+    Summarize a daily (date, balance) series:
+      days            - the series itself
+      min_balance     - lowest balance (None for an empty series)
+      min_date        - first day the lowest balance is reached
+      first_negative  - first day the balance is below zero, if any
+    """
+    if not series:
+        return {"days": [], "min_balance": None, "min_date": None, "first_negative": None}
+    min_date, min_balance = min(series, key=lambda day: day[1])
+    first_negative = next((d for d, bal in series if bal < 0), None)
+    return {
+        "days": series,
+        "min_balance": min_balance,
+        "min_date": min_date,
+        "first_negative": first_negative,
+    }
+
+
+def run_forecast_timeline(
+    journal: str,
+    budgets: str,
+    prices: str,
+    until: str,
+    today: str | None = None,
+    currency: str = "CRC",
+    verbose: bool = False,
+    future_journal: str | None = None,
+    accounts: str | None = None,
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    workers: int = 1,
+    budget_mode: str = "average",
+) -> Dict[str, Any]:
+    """
+    `run_forecast` plus a projected balance for every day in [today, until).
+
+    The balance of day d is the forecast end balance with `until` = d + 1,
+    i.e. after every planned posting and budget accrual dated d. All days
+    come from one `run_forecast_horizons` sweep (cumulative sums over
+    date-binned postings), so the ledger is still read once. The result
+    gains a "timeline" entry (see `forecast_timeline`) and is otherwise
+    identical to `run_forecast` for the same arguments.
+    """
+    today_date = datetime.date.fromisoformat(today) if today else datetime.date.today()
+    until_date = datetime.date.fromisoformat(until)
+    days = [today_date + datetime.timedelta(days=i) for i in range((until_date - today_date).days)]
+    params = dict(
+        journal=journal,
+        budgets=budgets,
+        prices=prices,
+        today=today_date.isoformat(),
+        currency=currency,
+        verbose=verbose,
+        future_journal=future_journal,
+        accounts=accounts,
+        engine=engine,
+        cache=cache,
+        workers=workers,
+        budget_mode=budget_mode,
+    )
+    if not days:
+        result = run_forecast(until=until, **params)
+        result["timeline"] = forecast_timeline([])
+        return result
+
+    cutoffs = [(d + datetime.timedelta(days=1)).isoformat() for d in days]
+    sweep = run_forecast_horizons(untils=cutoffs, **params)
+    result = sweep[-1]
+    result["timeline"] = forecast_timeline([(d, r["forecast_end"]) for d, r in zip(days, sweep)])
+    return result
+
+
+# ----------------------------------------------------------------
+# Budget vs actual
+# ----------------------------------------------------------------
+def run_spending(
+    journal_path: str,
+    since: Dict[str, datetime.date],
+    until: datetime.date,
+    messages: List[Dict[str, str]] | None = None,
+    engine: str = "api",
+) -> Dict[str, Dict[str, Decimal]]:
+    """
+    Actual spending per budgeted account (see aggregate.aggregate_spending):
+    one pass over the loaded ledger, or one bean-query grouped by date,
+    account and currency from the earliest `since`. Failures are reported
+    to `messages` and yield no spending.
+    """
+    if not since:
+        return {}
+    try:
+        if engine == "api":
+            entries, warns, _options = load_ledger(journal_path)
+            with stage("aggregate"):
+                spent = aggregate_spending(entries, since, until)
         else:
-            if past_future_rows:
+            query = q_spending(min(since.values()), until)
+            lines, warns = beanquery_run_csv(journal_path, query)
+            spent = bin_spending_rows(beanquery_csv_account_amounts(lines), since, until)
+    except Exception as exc:
+        if messages is not None:
+            messages.append(
+                {
+                    "level": "warning",
+                    "code": "beanquery-error",
+                    "text": f"Reading actual spending from {journal_path} failed: {exc}",
+                }
+            )
+        return {}
+    if messages is not None:
+        for w in warns:
+            messages.append(
+                {
+                    "level": "warning",
+                    "code": "beanquery-warning",
+                    "text": w,
+                }
+            )
+    return spent
+
+
+def run_budget_report(
+    journal: str,
+    budgets: str,
+    prices: str,
+    today: str | None = None,
+    currency: str = "CRC",
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    budget_mode: str = "average",
+) -> Dict[str, Any]:
+    """
+    Budget vs actual for every account with a budget running on `today`.
+
+    Each budget's current period is taken from budgets.bean and the budget
+    entries of the journal (the loaded ledger with the api engine), the actual expense postings of the main
+    journal since each period start are summed per budgeted account in one
+    pass (see `run_spending`), and both are joined by budgets.budget_report.
+    Returns {"op_currency", "today", "rows": [BudgetStatus], "messages"}.
+    """
+    engine = resolve_engine(engine)
+    today_date = datetime.date.fromisoformat(today) if today else datetime.date.today()
+    op_currency = resolve_op_currency(journal, currency)
+    rates = load_prices_to_op(prices, op_currency, today_date)
+    messages: List[Dict[str, str]] = []
+
+    with stage("budget-report"):
+        periods = budget_periods(budget_index(budgets, journal, cache, engine == "api"), today_date)
+        since = {account: period[0] for account, (_item, period) in periods.items()}
+        until = today_date + datetime.timedelta(days=1)
+        spent = _through_cache(
+            cache,
+            journal,
+            ("spending", until.isoformat()) + tuple(f"{a}={d.isoformat()}" for a, d in sorted(since.items())),
+            messages,
+            lambda msgs: run_spending(journal, since, until, msgs, engine),
+            lambda sp: {account: encode_rows(amounts.items()) for account, amounts in sp.items()},
+            lambda data: {account: dict(decode_rows(rows)) for account, rows in data.items()},
+        )
+        rows: List[BudgetStatus] = budget_report(periods, spent, today_date, rates, budget_mode)
+    return {"op_currency": op_currency, "today": today_date, "rows": rows, "messages": messages}
+
+
+# ----------------------------------------------------------------
+# Asyncio pipeline
+# ----------------------------------------------------------------
+async def _through_cache_async(
+    cache: QueryCache | None,
+    journal_path: str,
+    parts: Tuple[str, ...],
+    messages: List[Dict[str, str]],
+    compute: Callable[[List[Dict[str, str]]], Awaitable[Any]],
+    encode: Callable[[Any], Any],
+    decode: Callable[[Any], Any],
+) -> Any:
+    """Async counterpart of `_through_cache`."""
+    key, value = _cache_lookup(cache, journal_path, parts, messages, decode)
+    if value is not _MISS:
+        return value
+
+    local: List[Dict[str, str]] = []
+    value = await compute(local)
+    messages.extend(local)
+    _cache_store(cache, key, value, local, encode)
+    return value
+
+
+async def run_grouped_rows_async(
+    journal_path: str,
+    query: str,
+    messages: List[Dict[str, str]] | None = None,
+    timeout: float | None = None,
+) -> List[Row]:
+    """Non-blocking `run_grouped_rows` for the subprocess engine."""
+    try:
+        lines, warns = await beanquery_run_csv_async(journal_path, query, timeout)
+        if messages is not None:
+            for w in warns:
                 messages.append(
                     {
-                        "level": "info",
-                        "code": "future-past-entries",
-                        "text": "There are planned entries dated before the forecast start. Please move them to the main ledger.",
+                        "level": "warning",
+                        "code": "beanquery-warning",
+                        "text": w,
                     }
                 )
+        return beanquery_csv_amounts(lines)
+    except Exception as exc:
+        if messages is not None:
+            messages.append(
+                {
+                    "level": "warning",
+                    "code": "beanquery-error",
+                    "text": f"Beanquery failed for {journal_path} and query '{query}': {exc}",
+                }
+            )
+        return []
 
+
+async def _bucket_rows_async(
+    journal_path: str,
+    today: datetime.date,
+    until: datetime.date,
+    messages: List[Dict[str, str]],
+    timeout: float | None,
+) -> Buckets:
+    """In-process single pass off the event loop; a timeout abandons the result."""
+    try:
+        return await asyncio.wait_for(
+            asyncio.to_thread(run_bucket_rows, journal_path, today, until, messages), timeout
+        )
+    except asyncio.TimeoutError:
+        messages.append(
+            {
+                "level": "warning",
+                "code": "beanquery-error",
+                "text": f"Loading {journal_path} timed out after {timeout}s",
+            }
+        )
+        return aggregate_buckets([], today, until)
+
+
+async def collect_bucket_rows_async(
+    journals: List[str],
+    today: datetime.date,
+    until: datetime.date,
+    messages: List[Dict[str, str]],
+    engine: str = "api",
+    cache: QueryCache | None = None,
+    timeout: float | None = None,
+) -> Dict[str, List[Row]]:
+    """Async `collect_bucket_rows`: every journal/query runs concurrently."""
+    if engine == "api":
+        jobs = [
+            partial(
+                _through_cache_async,
+                cache,
+                j,
+                ("buckets", today.isoformat(), until.isoformat()),
+                compute=lambda msgs, j=j: _bucket_rows_async(j, today, until, msgs, timeout),
+                encode=lambda b: {name: encode_rows(amounts.items()) for name, amounts in b.items()},
+                decode=lambda d: {name: dict(decode_rows(rows)) for name, rows in d.items()},
+            )
+            for j in journals
+        ]
+        parts = await _gather_tasks(jobs, messages)
+        future = merge_buckets(parts, ("income", "expenses"))
+        return {
+            "assets": bucket_rows(parts[0], "assets"),
+            "liabs": bucket_rows(parts[0], "liabs"),
+            "income": bucket_rows(future, "income"),
+            "expenses": bucket_rows(future, "expenses"),
+        }
+
+    main = journals[0]
+    n = len(journals)
+    queries = (
+        [(main, q_assets(until)), (main, q_liabs(until))]
+        + [(j, q_future_income(today, until)) for j in journals]
+        + [(j, q_future_expenses(today, until)) for j in journals]
+    )
+    jobs = [
+        partial(
+            _through_cache_async,
+            cache,
+            j,
+            ("rows", q),
+            compute=lambda msgs, j=j, q=q: run_grouped_rows_async(j, q, msgs, timeout),
+            encode=encode_rows,
+            decode=decode_rows,
+        )
+        for j, q in queries
+    ]
+    results = await _gather_tasks(jobs, messages)
     return {
-        "op_currency": op_currency,
-        "today": today_date,
-        "until": until_date,
-        "assets": (assets_total, assets_br),
-        "liabs": (liabs_total, liabs_br),
-        "planned_income": (planned_income, pin_br),
-        "planned_expenses": (planned_exp, pexp_br),
-        "planned_budget_exp": (planned_budget_exp, budg_br),
-        "net_now": net_now,
-        "forecast_end": forecast_end,
-        "ok": forecast_end >= 0,
-        "verbose": verbose,
-        "past_future": past_future_rows,
-        "messages": messages,
+        "assets": results[0],
+        "liabs": results[1],
+        "income": _sum_rows(results[2:2 + n]),
+        "expenses": _sum_rows(results[2 + n:]),
     }
+
+
+async def _gather_all(*aws: Awaitable[Any]) -> List[Any]:
+    """
+    `asyncio.gather` that always waits for every awaitable, so a cancelled
+    run returns only after all of its bean-query processes are killed.
+    The first failure is re-raised.
+    """
+    results = await asyncio.gather(*aws, return_exceptions=True)
+    for res in results:
+        if isinstance(res, BaseException):
+            raise res
+    return list(results)
+
+
+async def _gather_tasks(
+    jobs: List[Callable[[List[Dict[str, str]]], Awaitable[Any]]],
+    messages: List[Dict[str, str]],
+) -> List[Any]:
+    """Async `_run_tasks`: run concurrently, merge results and messages in job order."""
+    logs: List[List[Dict[str, str]]] = [[] for _ in jobs]
+    results = await _gather_all(*(job(log) for job, log in zip(jobs, logs)))
+    for log in logs:
+        messages.extend(log)
+    return list(results)
+
+
+async def run_forecast_async(
+    journal: str,
+    budgets: str,
+    prices: str,
+    until: str,
+    today: str | None = None,
+    currency: str = "CRC",
+    verbose: bool = False,
+    future_journal: str | None = None,
+    accounts: str | None = None,
+    engine: str = "auto",
+    cache: QueryCache | None = None,
+    timeout: float | None = None,
+    budget_mode: str = "average",
+) -> Dict[str, Any]:
+    """
+    Non-blocking `run_forecast` returning the same result dict.
+
+    All independent queries run concurrently: `bean-query` processes are
+    started with asyncio.create_subprocess_exec (subprocess engine), and
+    in-process passes run off the event loop (api engine). `timeout` limits
+    each query; a timed-out query is reported like a failed one. Cancelling
+    the awaiting task kills the running bean-query processes. Planning
+    (prices and files) and the budget computation run off the event loop too.
+    """
+    plan = await asyncio.to_thread(
+        _plan_forecast, journal, prices, until, today, currency, future_journal, accounts, engine, cache
+    )
+
+    async def past_entries() -> Any:
+        past_path, q_past = plan.past_path, plan.q_past
+
+        async def compute(_msgs: List[Dict[str, str]]) -> Tuple[List[str], List[str]]:
+            if plan.engine == "api":
+                return await asyncio.wait_for(
+                    asyncio.to_thread(beanquery_lines, past_path, q_past, "api"), timeout
+                )
+            return await beanquery_run_lines_async(past_path, q_past, timeout)
+
+        try:
+            return await _through_cache_async(cache, past_path, ("lines", q_past), [], compute, list, tuple)
+        except asyncio.TimeoutError:
+            return RuntimeError(f"query timed out after {timeout}s")
+        except Exception as exc:
+            return exc
+
+    if plan.past_path is not None:
+        rows, outcome = await _gather_all(
+            collect_bucket_rows_async(plan.journals, plan.today, plan.until, plan.messages, plan.engine, cache, timeout),
+            past_entries(),
+        )
+        past_future_rows = _record_past_entries(plan, outcome)
+    else:
+        rows = await collect_bucket_rows_async(
+            plan.journals, plan.today, plan.until, plan.messages, plan.engine, cache, timeout
+        )
+        past_future_rows = []
+
+    budget = await asyncio.to_thread(
+        compute_budget_planned_expenses,
+        budgets, plan.today, plan.until, plan.rates, plan.op_currency, budget_mode, *_ledger_budgets(plan, cache),
+    )
+    return _finish_forecast(plan, rows, past_future_rows, budget, verbose)
@@ -1,6 +1,6 @@
 # formatters.py
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Iterable, List, Tuple, Optional
+from typing import Any, Dict, Iterable, List, Tuple, Optional
 
 BreakdownRow = Tuple[str, Decimal, Optional[Decimal], Optional[Decimal]]
 
@@ -66,3 +66,94 @@ def print_breakdown(
     print(f"{'TOTAL':<{eq_col-1}}-> {total_fmt:>15} {op_cur}")
     print(border)
     print()
+
+
+def print_rate_paths(paths: Dict[str, List[str]]) -> None:
+    """Print the conversion chain of every rate that goes through another currency."""
+    chained = {cur: path for cur, path in paths.items() if len(path) > 2}
+    if not chained:
+        return
+    print("Conversion paths:")
+    for cur in sorted(chained):
+        print(f"  {cur:<8} {' -> '.join(chained[cur])}")
+    print()
+
+
+def print_budget_accounts(
+    rows: Iterable[Tuple[str, Dict[str, Decimal], Decimal]], op_cur: str, *, amount_width: int = 15
+) -> None:
+    """
+    Pretty-print planned budget amounts per account (see budgets.convert_accounts),
+    each account indented under its parent, with native amounts when they are
+    not in the operating currency.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    print("BUDGETED EXPENSES by account:")
+    for account, by_cur, total in rows:
+        depth = account.count(":")
+        label = f"{'  ' * depth}{account.rsplit(':', 1)[-1]}"
+        native = ", ".join(f"{fmt_amount(amt)} {cur}" for cur, amt in by_cur.items() if cur != op_cur)
+        line = f"  {label:<32} {fmt_amount(total.quantize(Decimal('0.01'))):>{amount_width}} {op_cur}"
+        print(f"{line}   ({native})" if native else line)
+    print()
+
+
+def print_budget_report(rows: Iterable[Any], *, amount_width: int = 13) -> None:
+    """
+    Pretty-print budget vs actual (see budgets.BudgetStatus), one line per
+    budgeted account, marking accounts that spent more than has accrued.
+    """
+    rows = list(rows)
+    print()
+    print("Budget vs actual (current period):")
+    if not rows:
+        print("  (no budgets running)")
+        return
+    width = max(len(r.account) for r in rows)
+    print(
+        f"  {'Account':<{width}}  {'Period':<23}  {'Spent':>{amount_width}}  "
+        f"{'Accrued':>{amount_width}}  {'Budget':>{amount_width}}  {'Left':>{amount_width}}"
+    )
+    for r in rows:
+        period = f"{r.period_start} – {r.period_end}"
+        mark = "  ❌" if r.spent > r.accrued else ""
+        extra = "".join(f"  (+{fmt_amount(amt)} {cur})" for cur, amt in r.unconverted.items())
+        print(
+            f"  {r.account:<{width}}  {period:<23}  {fmt_amount(r.spent):>{amount_width}}  "
+            f"{fmt_amount(r.accrued):>{amount_width}}  {fmt_amount(r.amount):>{amount_width}}  "
+            f"{fmt_amount(r.remaining):>{amount_width}} {r.currency}{mark}{extra}"
+        )
+
+
+def print_timeline(timeline: Dict[str, Any], op_cur: str, *, amount_width: int = 15) -> None:
+    """
+    Pretty-print a daily projected-balance timeline (see forecast.forecast_timeline),
+    marking days below zero, followed by its lowest point and first deficit.
+    """
+    print()
+    print("Projected balance by day:")
+    for day, bal in timeline["days"]:
+        mark = "  ❌" if bal < 0 else ""
+        print(f"  {day}  {fmt_amount(bal):>{amount_width}} {op_cur}{mark}")
+    if timeline["min_date"] is None:
+        print("  (empty range)")
+        return
+    print("—" * 60)
+    print(f"Lowest balance:                 {fmt_amount(timeline['min_balance']):>{amount_width}} {op_cur}   on {timeline['min_date']}")
+    first = timeline["first_negative"]
+    print(f"First deficit day:              {str(first) if first else 'none':>{amount_width}}")
+
+
+def print_timings(timings: Dict[str, Any]) -> None:
+    """Pretty-print an instrument.Recorder snapshot: stages by time, then counters."""
+    print()
+    print("Timings:")
+    stages = sorted(timings["stages"].items(), key=lambda kv: -kv[1]["seconds"])
+    for name, st in stages:
+        print(f"  {name:<20} {st['seconds'] * 1000:>10.1f} ms  x{st['calls']}")
+    if timings["counters"]:
+        print("Counters:")
+        for name, n in sorted(timings["counters"].items()):
+            print(f"  {name:<20} {n:>10}")
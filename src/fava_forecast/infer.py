@@ -0,0 +1,288 @@
+# infer.py
+"""
+Suggested budgets from spending history.
+
+Expense postings of the last whole months are extracted once into parallel
+columns (key, month, amount) and grouped into a (account, currency) x month
+matrix of totals; every statistic is then computed for all accounts at once.
+Amounts stay exact scaled integers throughout; only the final budget is a
+Decimal division, rounded to cents.
+The result is written as `custom "budget"` lines that parse_budget_line reads.
+
+Run with:
+  python -m fava_forecast.infer --journal main.bean --months 12 --stat median --seasonal
+"""
+import argparse
+import datetime
+import sys
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from fractions import Fraction
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from .beancount_io import load_ledger
+from .budgets import _INT64_MAX, BudgetItem, _month_index, format_budget_line, parse_budget_line
+from .instrument import count, stage
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without numpy
+    np = None
+
+
+# How the monthly level is taken from the trailing months
+STATS = ("mean", "median")
+
+Key = Tuple[str, str]   # (account, currency)
+
+
+# ----------------------------------------------------------------
+# Columnar extraction
+# ----------------------------------------------------------------
+def _month_start(index: int) -> datetime.date:
+    year, month = divmod(index, 12)
+    return datetime.date(year, month + 1, 1)
+
+
+@dataclass(frozen=True)
+class SpendingColumns:
+    """
+    Expense postings in months [first_month, first_month + months) as parallel
+    columns: key id (into `keys`), month offset and amount per posting. Amounts
+    are exact integers in units of 1 / `unit` (10**scale, scale the most
+    decimal places of any posting), so sums never round.
+    """
+    keys: Tuple[Key, ...]
+    key: Sequence[int]
+    month: Sequence[int]
+    amount: Sequence[int]
+    unit: int
+    first_month: int        # month index (year * 12 + month - 1) of offset 0
+    months: int
+
+
+def spending_columns(entries: Iterable, first_month: int, months: int) -> SpendingColumns:
+    """
+    One pass over the postings of non-#planned transactions on Expenses
+    accounts dated in the given months.
+    """
+    lo = _month_start(first_month)
+    hi = _month_start(first_month + months)
+    keys: dict = {}
+    key: List[int] = []
+    month: List[int] = []
+    numbers: List[Decimal] = []
+    for entry in entries:
+        postings = getattr(entry, "postings", None)
+        if not postings:
+            continue
+        date = entry.date
+        if date < lo or date >= hi or "planned" in (entry.tags or ()):
+            continue
+        offset = _month_index(date) - first_month
+        for p in postings:
+            if not p.account.startswith("Expenses"):
+                continue
+            units = p.units
+            if units is None or units.number is None:
+                continue
+            k = keys.setdefault((p.account, units.currency), len(keys))
+            key.append(k)
+            month.append(offset)
+            numbers.append(units.number)
+    count("rows_parsed", len(key))
+    unit = 10 ** max((max(0, -n.as_tuple().exponent) for n in numbers), default=0)
+    amount = [int(n * unit) for n in numbers]
+    return SpendingColumns(tuple(keys), key, month, amount, unit, first_month, months)
+
+
+# ----------------------------------------------------------------
+# Group-by and statistics
+# ----------------------------------------------------------------
+def _fits_int64(cols: SpendingColumns) -> bool:
+    """No sum of any subset of the amounts can overflow int64."""
+    return sum(abs(a) for a in cols.amount) <= _INT64_MAX
+
+
+def monthly_matrix(cols: SpendingColumns) -> Tuple[Any, Any]:
+    """
+    (totals, active): keys x months exact integer totals, and whether a key had
+    started spending by that month (months before an account's first posting
+    do not count as zero months). NumPy int64 arrays when numpy is installed
+    and the sums fit, else lists of Python ints.
+    """
+    n, m = len(cols.keys), cols.months
+    if np is not None and _fits_int64(cols):
+        flat = np.asarray(cols.key, dtype=np.int64) * m + np.asarray(cols.month, dtype=np.int64)
+        totals = np.zeros(n * m, dtype=np.int64)
+        np.add.at(totals, flat, np.asarray(cols.amount, dtype=np.int64))
+        seen = np.bincount(flat, minlength=n * m).reshape(n, m) > 0
+        active = np.logical_or.accumulate(seen, axis=1)
+        return totals.reshape(n, m), active
+    totals = [[0] * m for _ in range(n)]
+    first = [m] * n
+    for k, month, amt in zip(cols.key, cols.month, cols.amount):
+        totals[k][month] += amt
+        first[k] = min(first[k], month)
+    active = [[j >= first[k] for j in range(m)] for k in range(n)]
+    return totals, active
+
+
+def _levels(totals: Any, active: Any, months: int, stat: str) -> List[Optional[Fraction]]:
+    """`stat` of each key's active months among the last `months`, exactly; None if none is active."""
+    if isinstance(totals, list):
+        levels: List[Optional[Fraction]] = []
+        for row, act in zip(totals, active):
+            vals = sorted(v for v, a in zip(row[-months:], act[-months:]) if a)
+            if not vals:
+                levels.append(None)
+            elif stat == "median":
+                levels.append(Fraction(vals[(len(vals) - 1) // 2] + vals[len(vals) // 2], 2))
+            else:
+                levels.append(Fraction(sum(vals), len(vals)))
+        return levels
+    window, act = totals[:, -months:], active[:, -months:]
+    n_active = act.sum(axis=1).tolist()
+    if stat == "median":
+        ranked = np.sort(np.where(act, window, _INT64_MAX), axis=1).tolist()  # active months first
+        return [
+            Fraction(row[(c - 1) // 2] + row[c // 2], 2) if c else None
+            for row, c in zip(ranked, n_active)
+        ]
+    sums = np.where(act, window, 0).sum(axis=1).tolist()
+    return [Fraction(s, c) if c else None for s, c in zip(sums, n_active)]
+
+
+def _seasonal_indices(totals: Any, active: Any, years: int, first_moy: int) -> List[List[Fraction]]:
+    """
+    Per key and calendar month (0 = January), the mean of that month over the
+    last `years` years divided by the mean of all those months; 1 where a
+    month has no active history or the overall mean is not positive.
+    """
+    span = years * 12
+    if isinstance(totals, list):
+        sums, counts = [], []
+        for row, act in zip(totals, active):
+            by_col, n_col = [0] * 12, [0] * 12
+            for j, (v, a) in enumerate(zip(row[-span:], act[-span:])):
+                if a:
+                    by_col[j % 12] += v
+                    n_col[j % 12] += 1
+            sums.append(by_col)
+            counts.append(n_col)
+    else:
+        act = active[:, -span:].reshape(len(active), years, 12)
+        sums = np.where(act, totals[:, -span:].reshape(len(totals), years, 12), 0).sum(axis=1).tolist()
+        counts = act.sum(axis=1).tolist()
+    out: List[List[Fraction]] = []
+    for by_col, n_col in zip(sums, counts):
+        total, n = sum(by_col), sum(n_col)
+        index = [Fraction(1)] * 12
+        if total > 0:
+            # column j of the window is calendar month (first_moy + j) % 12
+            for j in range(12):
+                if n_col[j]:
+                    index[(first_moy + j) % 12] = Fraction(by_col[j] * n, n_col[j] * total)
+        out.append(index)
+    return out
+
+
+def _amount(value: Fraction, unit: int) -> Decimal:
+    """`value` units of 1 / `unit`, divided in Decimal and rounded to cents."""
+    return (Decimal(value.numerator) / Decimal(value.denominator * unit)).quantize(
+        Decimal("0.01"), rounding=ROUND_HALF_UP
+    )
+
+
+def infer_budgets(
+    entries: Iterable,
+    today: datetime.date,
+    months: int = 12,
+    stat: str = "median",
+    seasonal: bool = False,
+    years: int = 3,
+) -> List[BudgetItem]:
+    """
+    Monthly budgets per expense account and currency from the `months` whole
+    months before today's month: their mean or median, counting months
+    without spending as zero once the account has started spending.
+
+    With `seasonal`, the level is scaled per calendar month by the account's
+    seasonal index over the last `years` years, and twelve budgets starting
+    on the 1st of each of the next twelve months are returned per account,
+    each superseding the one before (a month with the same amount as the one
+    before adds no line; a month estimated at zero or below gets a zero
+    budget). Accounts whose level is not positive are left out.
+    """
+    if stat not in STATS:
+        raise ValueError(f"Unknown statistic: {stat!r} (expected one of {', '.join(STATS)})")
+    if months < 1 or years < 1:
+        raise ValueError(f"months and years must be >= 1, got {months} and {years}")
+    span = max(months, years * 12) if seasonal else months
+    current = _month_index(today)
+    with stage("infer"):
+        cols = spending_columns(entries, current - span, span)
+        totals, active = monthly_matrix(cols)
+        levels = _levels(totals, active, months, stat)
+        first_moy = (current - years * 12) % 12
+        indices = _seasonal_indices(totals, active, years, first_moy) if seasonal else None
+
+    out: List[BudgetItem] = []
+    for k in sorted(range(len(cols.keys)), key=lambda k: cols.keys[k]):
+        account, cur = cols.keys[k]
+        level = levels[k]
+        if level is None or _amount(level, cols.unit) <= 0:
+            continue
+        if indices is None:
+            out.append(BudgetItem(_month_start(current), account, "monthly", _amount(level, cols.unit), cur))
+            continue
+        running = Decimal("0")
+        for month in range(current, current + 12):
+            amt = max(_amount(level * indices[k][month % 12], cols.unit), Decimal("0"))
+            if amt != running:
+                out.append(BudgetItem(_month_start(month), account, "monthly", amt, cur))
+                running = amt
+    return out
+
+
+def budget_lines(items: Iterable[BudgetItem]) -> List[str]:
+    """budgets.bean lines for `items`; those parse_budget_line cannot read (e.g. currency BTC.X) become comments."""
+    lines = []
+    for it in items:
+        line = format_budget_line(it)
+        lines.append(line if parse_budget_line(line) == it else f"; not representable: {line}")
+    return lines
+
+
+# ----------------------------------------------------------------
+# CLI entry point
+# ----------------------------------------------------------------
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Suggest budgets.bean entries from spending history")
+    ap.add_argument("--journal", required=True, help="Path to main.bean")
+    ap.add_argument("--today", default=None, help="Override today YYYY-MM-DD; history ends before its month")
+    ap.add_argument("--months", type=int, default=12, help="Trailing whole months to use (default: 12)")
+    ap.add_argument("--stat", choices=STATS, default="median", help="Monthly level statistic (default: median)")
+    ap.add_argument("--seasonal", action="store_true",
+                    help="Scale each of the next 12 months by its month-of-year pattern")
+    ap.add_argument("--years", type=int, default=3, help="Years of history for --seasonal (default: 3)")
+    ap.add_argument("--out", default=None, help="Write to this file instead of stdout")
+    args = ap.parse_args(argv)
+
+    today = datetime.date.fromisoformat(args.today) if args.today else datetime.date.today()
+    entries, _warns, _options = load_ledger(args.journal)
+    items = infer_budgets(entries, today, args.months, args.stat, args.seasonal, args.years)
+
+    header = f"; suggested from {args.stat} of {args.months} months before {_month_start(_month_index(today))}"
+    if args.seasonal:
+        header += f", seasonal over {args.years} years"
+    text = "\n".join([header] + budget_lines(items)) + "\n"
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# instrument.py
+"""
+Stage timings and counters for the forecast pipeline.
+
+Instrumentation is off unless a `Recorder` is activated for the current
+context (see `recording`). While off, `stage()` returns a shared no-op
+context manager and `count()` returns after one context-variable lookup,
+so instrumented code paths cost next to nothing.
+
+Stages are wall-clock seconds, summed when a stage runs more than once
+(e.g. one "bean-query" stage per bean-query call). Counters used across the
+package:
+
+  subprocesses    bean-query processes started
+  bytes_parsed    bytes of bean-query output, ledger, prices and budgets files read
+  rows_parsed     result rows, price lines and budget lines parsed
+  cache_hits      query-cache hits
+  cache_misses    query-cache misses
+  rate_cache_hits     rate tables served from the process-wide rate cache
+  rate_cache_misses   rate tables computed (prices file parsed at most once per change)
+  budget_cache_hits   budgets files served from the process-wide budgets cache
+  budget_cache_misses budgets files parsed (once per change)
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, Optional
+
+
+# Called as hook(event, name, value): ("stage", name, seconds) or ("count", name, n)
+Hook = Callable[[str, str, float], None]
+
+_NOOP = nullcontext()
+
+
+# ----------------------------------------------------------------
+# Recorder
+# ----------------------------------------------------------------
+class Recorder:
+    """Thread-safe accumulator of stage timings and counters."""
+
+    def __init__(self, hook: Optional[Hook] = None) -> None:
+        self.hook = hook
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+        if self.hook is not None:
+            self.hook("stage", name, seconds)
+
+    def add_count(self, name: str, n: int) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+        if self.hook is not None:
+            self.hook("count", name, n)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Structured snapshot: {"stages": {name: {"seconds", "calls"}}, "counters": {...}}."""
+        with self._lock:
+            return {
+                "stages": {
+                    name: {"seconds": secs, "calls": self.calls[name]}
+                    for name, secs in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+
+_CURRENT: contextvars.ContextVar[Optional[Recorder]] = contextvars.ContextVar(
+    "fava_forecast_recorder", default=None
+)
+
+
+# ----------------------------------------------------------------
+# Instrumentation points
+# ----------------------------------------------------------------
+def active() -> Optional[Recorder]:
+    return _CURRENT.get()
+
+
+def stage(name: str) -> ContextManager[None]:
+    """Time the enclosed block as `name` when a recorder is active."""
+    rec = _CURRENT.get()
+    if rec is None:
+        return _NOOP
+    return _timed(rec, name)
+
+
+@contextmanager
+def _timed(rec: Recorder, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        rec.add_stage(name, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name` when a recorder is active."""
+    rec = _CURRENT.get()
+    if rec is not None:
+        rec.add_count(name, n)
+
+
+@contextmanager
+def recording(recorder: Optional[Recorder]) -> Iterator[Optional[Recorder]]:
+    """Activate `recorder` for the enclosed block (None keeps instrumentation off)."""
+    if recorder is None:
+        yield None
+        return
+    token = _CURRENT.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _CURRENT.reset(token)
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Bind `fn` to the current context so a recorder stays active when it
+    runs on another thread (ThreadPoolExecutor does not copy contexts).
+    """
+    if _CURRENT.get() is None:
+        return fn
+    ctx = contextvars.copy_context()
+    # a Context can be entered by one thread at a time -> run each call in a copy
+    return lambda *a, **k: ctx.copy().run(fn, *a, **k)
@@ -1,11 +1,17 @@
 # rates.py
 import datetime
+import mmap
 import os
 import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
 from decimal import Decimal
-from typing import Dict, List, Tuple, Optional
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple, Optional, Union
 
 from .errors import PriceParseError
+from .instrument import count, stage
 
 
 # ----------------------------------------------------------------
@@ -13,6 +19,21 @@ from .errors import PriceParseError
 # ----------------------------------------------------------------
 RatePairs = List[Tuple[datetime.date, Decimal]]  # e.g. [("2025-01-01", Decimal("0.85"))]
 RatesDict = Dict[str, RatePairs]
+PriceValue = Union[Decimal, str]  # str: digits not yet converted to Decimal
+
+# leading \s* so raw (unstripped) lines match the same as stripped ones
+_PRICE_RX = re.compile(
+    r"\s*(\d{4}-\d{2}-\d{2})\s+price\s+([A-Z0-9]{2,6})\s+([\d_]+(?:\.\d+)?)\s+([A-Z]{3,5})"
+)
+_DIGITS = tuple("0123456789")
+
+# Whole-file variants for the bulk loader: one match per line, never across lines.
+_PRICE_ROWS_RX = re.compile(
+    r"^[^\S\n]*(\d{4}-\d{2}-\d{2})[^\S\n]+price[^\S\n]+([A-Z0-9]{2,6})[^\S\n]+([\d_]+(?:\.\d+)?)[^\S\n]+([A-Z]{3,5})",
+    re.M,
+)
+_PRICE_LIKE_RX = re.compile(r"^[^\S\n]*\d[^\n]*price", re.M)  # lines _parse_price_line must accept
+_MMAP_MIN_BYTES = 1 << 20  # map files this large instead of reading them
 
 
 # ----------------------------------------------------------------
@@ -25,13 +46,10 @@ def _parse_price_line(line: str) -> Optional[Tuple[datetime.date, str, Decimal,
         2025-01-01 price USD 530.10 CRC
     Returns: (date, base, value, quote) or None if not matched.
     """
-    rx = re.compile(
-        r"^(\d{4}-\d{2}-\d{2})\s+price\s+([A-Z0-9]{2,6})\s+([\d_]+(?:\.\d+)?)\s+([A-Z]{3,5})"
-    )
-    m = rx.match(line.strip())
+    m = _PRICE_RX.match(line.strip())
     if not m:
         # if the line looks like a price entry but has an invalid number → raise an error
-        if line.strip().startswith(tuple("0123456789")) and "price" in line:
+        if line.strip().startswith(_DIGITS) and "price" in line:
             raise PriceParseError(f"Invalid price line: {line}")
         return None
 
@@ -46,89 +64,380 @@ def _parse_price_line(line: str) -> Optional[Tuple[datetime.date, str, Decimal,
 
 def _select_last_rate(pairs: RatePairs, today: datetime.date) -> Optional[Decimal]:
     """
-    Select the latest rate whose date <= today.
+    Select the latest rate whose date <= today (one linear pass; for
+    repeated lookups build a PriceIndex instead).
     """
-    valid = [v for (d, v) in pairs if d <= today]
-    if not valid:
-        return None
-    # dates are already comparable — pick the last
-    pairs_sorted = sorted(pairs, key=lambda x: x[0])
-    for d, val in reversed(pairs_sorted):
-        if d <= today:
-            return val
-    return None
+    best: Optional[Tuple[datetime.date, Decimal]] = None
+    for d, val in pairs:
+        if d <= today and (best is None or d >= best[0]):
+            best = (d, val)
+    return best[1] if best is not None else None
+
+
+# ----------------------------------------------------------------
+# Price index
+# ----------------------------------------------------------------
+class PriceIndex:
+    """
+    Price history per (base, quote) pair as parallel date/value arrays,
+    sorted once on first lookup. `latest()` answers "last rate on or
+    before D" with a binary search, so one index can value many days.
+
+    Values may be added as digit strings; they become Decimal only when
+    `latest()` selects them.
+    """
+
+    def __init__(self) -> None:
+        self._raw: Dict[Tuple[str, str], List[Tuple[datetime.date, PriceValue]]] = {}
+        self._series: Dict[Tuple[str, str], Tuple[List[datetime.date], List[PriceValue]]] = {}
+        self._quotes: Dict[str, List[str]] = {}  # base -> quotes, first-seen order
+
+    def add(self, date: datetime.date, base: str, value: PriceValue, quote: str) -> None:
+        key = (base, quote)
+        pairs = self._raw.get(key)
+        if pairs is None:
+            pairs = self._raw[key] = []
+            self._quotes.setdefault(base, []).append(quote)
+        pairs.append((date, value))
+        self._series.pop(key, None)
+
+    def extend(self, base: str, quote: str, pairs: List[Tuple[datetime.date, PriceValue]]) -> None:
+        """Add many (date, value) prices of one pair at once."""
+        key = (base, quote)
+        if key not in self._raw:
+            self._raw[key] = []
+            self._quotes.setdefault(base, []).append(quote)
+        self._raw[key].extend(pairs)
+        self._series.pop(key, None)
+
+    def _get(self, base: str, quote: str) -> Optional[Tuple[List[datetime.date], List[PriceValue]]]:
+        key = (base, quote)
+        series = self._series.get(key)
+        if series is None:
+            pairs = self._raw.get(key)
+            if not pairs:
+                return None
+            # sorted copy: an index may be shared across threads (see load_prices_to_op),
+            # and list.sort() empties the list for concurrent readers while it runs
+            pairs = sorted(pairs, key=itemgetter(0))  # stable: same-day prices keep file order
+            series = self._series[key] = ([d for d, _ in pairs], [v for _, v in pairs])
+        return series
+
+    def bases(self) -> List[str]:
+        return list(self._quotes)
+
+    def quotes(self, base: str) -> List[str]:
+        return self._quotes.get(base, [])
+
+    def latest(self, base: str, quote: str, on: datetime.date) -> Optional[Tuple[datetime.date, Decimal]]:
+        """Last (date, value) of base in quote with date <= on, or None."""
+        series = self._get(base, quote)
+        if series is None:
+            return None
+        dates, values = series
+        i = bisect_right(dates, on)
+        if not i:
+            return None
+        value = values[i - 1]
+        if type(value) is str:
+            value = values[i - 1] = Decimal(value)
+        return dates[i - 1], value
+
+    def rate(self, base: str, quote: str, on: datetime.date) -> Optional[Decimal]:
+        """
+        Value of one `base` in `quote` on `on`, from `base quote` prices or
+        inverted `quote base` prices, whichever is more recent.
+        """
+        direct = self.latest(base, quote, on)
+        inverse = self.latest(quote, base, on)
+        if inverse is not None and inverse[1] != 0 and (direct is None or inverse[0] > direct[0]):
+            return Decimal("1") / inverse[1]
+        return direct[1] if direct is not None else None
+
+
+def _read_text(path: str) -> str:
+    """Whole file as text with universal newlines; large files go through mmap."""
+    size = os.path.getsize(path)
+    count("bytes_parsed", size)
+    with open(path, "rb") as f:
+        if size >= _MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                text = str(mm, "utf-8")
+        else:
+            text = f.read().decode("utf-8")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def _raise_first_bad_line(text: str) -> None:
+    # slow path: re-parse line by line so the error is exactly _parse_price_line's
+    lines = text.split("\n")
+    for line in lines[:-1]:
+        _parse_price_line(line + "\n")
+    _parse_price_line(lines[-1])
+
+
+def load_price_index(prices_path: str) -> PriceIndex:
+    """
+    Parse prices.bean into a PriceIndex with whole-file regex scans.
+    Raises PriceParseError for the same lines as _parse_price_line; amounts
+    stay strings until a lookup selects them.
+    """
+    text = _read_text(prices_path)
+    rows = _PRICE_ROWS_RX.findall(text)
+    # every matched row holds "price": if that is all of them, no other line can look like a price
+    if text.count("price") != len(rows) and len(rows) != len(_PRICE_LIKE_RX.findall(text)):
+        _raise_first_bad_line(text)
+
+    dates: Dict[str, datetime.date] = {}
+    groups: Dict[Tuple[str, str], List[Tuple[datetime.date, PriceValue]]] = {}
+    try:
+        for date_str, base, amount, quote in rows:
+            date = dates.get(date_str)
+            if date is None:
+                date = dates[date_str] = datetime.date.fromisoformat(date_str)
+            if "_" in amount:
+                amount = amount.replace("_", "")
+                if not amount:  # only underscores: Decimal("") would fail
+                    raise ValueError(amount)
+            pairs = groups.get((base, quote))
+            if pairs is None:
+                pairs = groups[(base, quote)] = []
+            pairs.append((date, amount))
+    except ValueError:
+        _raise_first_bad_line(text)
+
+    index = PriceIndex()
+    for (base, quote), pairs in groups.items():
+        index.extend(base, quote, pairs)
+    count("rows_parsed", text.count("\n") + (not text.endswith("\n")))
+    return index
+
+
+# ----------------------------------------------------------------
+# Conversion graph
+# ----------------------------------------------------------------
+MAX_HOPS = 4  # longest conversion chain, e.g. X -> EUR -> USD -> CRC is 3 hops
+
+
+class RateTable(dict):
+    """
+    {currency: rate_in_op_currency} plus `paths`: the conversion chain used
+    for every rate, e.g. {"ETH": ["ETH", "USD", "CRC"], "CRC": ["CRC"]}.
+    """
+
+    def __init__(self, *args: Any, paths: Optional[Dict[str, List[str]]] = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.paths: Dict[str, List[str]] = paths or {}
+
+
+class ConversionGraph:
+    """
+    Currencies linked by every priced pair in a PriceIndex, valued on `day`.
+    Each link converts both ways (PriceIndex.rate); links without a price on
+    or before `day` are skipped. Paths to an operating currency are found
+    with one breadth-first traversal and memoized per (op_currency, max_hops).
+    """
+
+    def __init__(self, index: PriceIndex, day: datetime.date) -> None:
+        self.index = index
+        self.day = day
+        self._links: Dict[str, List[str]] = {}  # currency -> neighbours, first-seen order
+        for base in index.bases():
+            for quote in index.quotes(base):
+                for a, b in ((base, quote), (quote, base)):
+                    nbrs = self._links.setdefault(a, [])
+                    if b not in nbrs:
+                        nbrs.append(b)
+        self._edges: Dict[Tuple[str, str], Optional[Decimal]] = {}
+        self._tables: Dict[Tuple[str, int], RateTable] = {}
+
+    def currencies(self) -> List[str]:
+        """Every currency that appears in a price, first-seen order."""
+        return list(self._links)
+
+    def edge(self, base: str, quote: str) -> Optional[Decimal]:
+        """Rate of one `base` in `quote` on the graph's day (None: no usable price)."""
+        key = (base, quote)
+        if key not in self._edges:
+            self._edges[key] = self.index.rate(base, quote, self.day)
+        return self._edges[key]
+
+    def rates_to(self, op_currency: str, max_hops: int = MAX_HOPS) -> RateTable:
+        """
+        Rates of every currency reachable within `max_hops` links, via a
+        shortest chain. Among equally short chains a currency takes the
+        first neighbour (in prices-file order) already converted.
+        """
+        key = (op_currency, max_hops)
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        rates: Dict[str, Decimal] = {op_currency: Decimal("1")}
+        paths: Dict[str, List[str]] = {op_currency: [op_currency]}
+        frontier = [op_currency]
+        for _ in range(max_hops):
+            candidates = [
+                cur for f in frontier for cur in self._links.get(f, ()) if cur not in rates
+            ]
+            level = set(frontier)
+            frontier = []
+            for cur in dict.fromkeys(candidates):
+                for nbr in self._links[cur]:
+                    if nbr not in level:
+                        continue
+                    rate = self.edge(cur, nbr)
+                    if rate is None:
+                        continue
+                    rates[cur] = rate * rates[nbr]
+                    paths[cur] = [cur] + paths[nbr]
+                    frontier.append(cur)
+                    break
+            if not frontier:
+                break
+
+        table = self._tables[key] = RateTable(rates, paths=paths)
+        return table
+
+
+def rates_on(
+    index: PriceIndex,
+    op_currency: str,
+    day: datetime.date,
+    max_hops: int = MAX_HOPS,
+) -> RateTable:
+    """
+    Rates {currency: rate_in_op_currency} valid on `day`, through chains of
+    at most `max_hops` priced pairs (1 = direct and inverse pairs only).
+    """
+    return ConversionGraph(index, day).rates_to(op_currency, max_hops)
+
+
+class RateMatrix:
+    """
+    Rates between every pair of connected currencies on one day, from one
+    ConversionGraph. The RateTable of a target currency is built the first
+    time it is asked for and kept, so changing the operating currency back
+    and forth is a lookup.
+    """
+
+    def __init__(self, graph: ConversionGraph, max_hops: int = MAX_HOPS) -> None:
+        self.day = graph.day
+        self.max_hops = max_hops
+        self._graph = graph
+        self._lock = threading.Lock()   # matrices are shared through _RATES
+
+    @property
+    def currencies(self) -> List[str]:
+        return self._graph.currencies()
+
+    def table(self, op_currency: str) -> RateTable:
+        """{currency: rate_in_op_currency}; just {op_currency: 1} for an unpriced currency."""
+        with self._lock:
+            return self._graph.rates_to(op_currency, self.max_hops)
+
+    def rate(self, base: str, quote: str) -> Optional[Decimal]:
+        """Value of one `base` in `quote`, or None when they are not connected."""
+        return self.table(quote).get(base)
+
+
+def rate_matrix(index: PriceIndex, day: datetime.date, max_hops: int = MAX_HOPS) -> RateMatrix:
+    return RateMatrix(ConversionGraph(index, day), max_hops)
+
+
+# ----------------------------------------------------------------
+# Process-wide caches
+# ----------------------------------------------------------------
+# Parsed price files: abspath -> (fingerprint, PriceIndex)
+_INDEXES: Dict[str, Tuple[Tuple[int, int], PriceIndex]] = {}
+_INDEXES_MAX = 4
+# Rate matrices, least recently used first:
+#   (abspath, mtime_ns, size, day, max_hops) -> RateMatrix
+_RATES: "OrderedDict[Tuple[Any, ...], RateMatrix]" = OrderedDict()
+_RATES_MAX = 256
+_RATES_LOCK = threading.Lock()
+
+
+def _prices_fingerprint(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _price_index(path: str, fingerprint: Tuple[int, int]) -> PriceIndex:
+    """The parsed index of `path`, reparsed only when its fingerprint changes."""
+    with _RATES_LOCK:
+        cached = _INDEXES.get(path)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    index = load_price_index(path)
+    with _RATES_LOCK:
+        _INDEXES.pop(path, None)
+        while len(_INDEXES) >= _INDEXES_MAX:
+            _INDEXES.pop(next(iter(_INDEXES)))
+        _INDEXES[path] = (fingerprint, index)
+    return index
+
+
+def clear_rate_cache() -> None:
+    """Forget every parsed prices file and rate matrix."""
+    with _RATES_LOCK:
+        _INDEXES.clear()
+        _RATES.clear()
 
 
 # ----------------------------------------------------------------
 # Main API
 # ----------------------------------------------------------------
+def load_rate_matrix(prices_path: str, day: datetime.date, max_hops: int = MAX_HOPS) -> RateMatrix:
+    """
+    RateMatrix of prices.bean on `day`, cached for the whole process: keyed
+    by the file's path, mtime and size plus the arguments (LRU, _RATES_MAX
+    matrices). The parsed file is shared between dates too. Treat the result
+    as read-only. Raises OSError if the file is missing.
+    """
+    path = os.path.abspath(prices_path)
+    fingerprint = _prices_fingerprint(path)
+    key = (path, *fingerprint, day, max_hops)
+    with _RATES_LOCK:
+        matrix = _RATES.get(key)
+        if matrix is not None:
+            _RATES.move_to_end(key)
+    if matrix is not None:
+        count("rate_cache_hits")
+        return matrix
+    count("rate_cache_misses")
+
+    with stage("prices"):
+        matrix = rate_matrix(_price_index(path, fingerprint), day, max_hops)
+    with _RATES_LOCK:
+        _RATES[key] = matrix
+        while len(_RATES) > _RATES_MAX:
+            _RATES.popitem(last=False)
+    return matrix
+
+
 def load_prices_to_op(
     prices_path: str,
     op_currency: str,
     today: datetime.date,
+    max_hops: int = MAX_HOPS,
 ) -> Dict[str, Decimal]:
     """
     Read prices.bean and return mapping: {currency: rate_in_op_currency}.
 
     Supports:
-      * Direct pairs  X -> op_currency
-      * Indirect pairs X -> USD -> op_currency (one-hop chain)
+      * Direct pairs  X -> op_currency (and inverse op_currency -> X)
+      * Chains X -> EUR -> USD -> op_currency of up to `max_hops` pairs
 
+    The result is a RateTable: its `paths` record the chain behind each rate.
+    It is a copy of a row of the cached load_rate_matrix(), so other
+    operating currencies on the same day cost a lookup and callers may
+    modify it freely.
     If prices file missing → returns empty dict.
     """
     if not os.path.exists(prices_path):
         return {}
-
-    direct: RatesDict = {}
-    parsed_lines = []
-
-    with open(prices_path, "r", encoding="utf-8") as f:
-        for line in f:
-            parsed = _parse_price_line(line)
-            if not parsed:
-                continue
-            date, base, value, quote = parsed
-            parsed_lines.append((date, base, value, quote))
-
-            # ----------------------------------------------------------------
-            # Direct: XXX -> op_currency
-            # ----------------------------------------------------------------
-            if quote == op_currency:
-                direct.setdefault(base, []).append((date, value))
-
-            # ----------------------------------------------------------------
-            # Inverse: op_currency -> YYY  → store YYY -> op_currency as 1/value
-            # ----------------------------------------------------------------
-            elif base == op_currency and value != 0:
-                inv = Decimal("1") / value
-                direct.setdefault(quote, []).append((date, inv))
-
-    known_quotes = set(direct.keys())
-
-    # ----------------------------------------------------------------
-    # One-hop crosses: base -> quote -> op_currency
-    # ----------------------------------------------------------------
-    for date, base, value, quote in parsed_lines:
-        if base == op_currency:
-            continue
-        if base in direct:
-            continue  # already have direct rate
-        # do we have quote -> op?
-        if quote not in known_quotes:
-            continue
-        quote_pairs = direct.get(quote)
-        quote_rate = _select_last_rate(quote_pairs, today)
-        if quote_rate is None:
-            continue
-        # store derived base -> op at "today"
-        derived = value * quote_rate
-        direct.setdefault(base, []).append((today, derived))
-
-    # compute all conversions
-    result: Dict[str, Decimal] = {op_currency: Decimal("1")}
-    for cur, pairs in direct.items():
-        rate = _select_last_rate(pairs, today)
-        if rate is not None:
-            result[cur] = rate
-
-    return result
+    table = load_rate_matrix(prices_path, today, max_hops).table(op_currency)
+    return RateTable(table, paths={cur: list(path) for cur, path in table.paths.items()})
@@ -0,0 +1,133 @@
+"""
+Resident bean-query worker.
+
+Keeps parsed journals in memory and answers queries over a local Unix socket,
+so the subprocess engine does not pay a process start and a full re-parse for
+every query. A journal is re-parsed only when it or one of its includes changes.
+
+Protocol: one JSON object per line, one request per connection.
+
+  -> {"op": "query", "journal": "/abs/main.bean", "query": "SELECT ...", "format": "text" | "csv"}
+  <- {"ok": true, "lines": [...], "warnings": [...]}
+  <- {"ok": false, "error": "..."}
+
+  -> {"op": "ping"}
+  <- {"ok": true}
+
+Run with:
+  FAVA_FORECAST_WORKER=/run/user/1000/fava-forecast.sock python -m fava_forecast.worker
+"""
+import argparse
+import errno
+import json
+import os
+import socket
+import socketserver
+from typing import Any, Dict
+
+from .beancount_io import WORKER_ENV, beanquery_run_csv_api, beanquery_run_lines_api
+
+
+# ----------------------------------------------------------------
+# Request handling
+# ----------------------------------------------------------------
+def handle_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Answer one decoded request; errors propagate to the caller."""
+    op = request.get("op")
+    if op == "ping":
+        return {"ok": True}
+    if op == "query":
+        journal = request["journal"]
+        query = request["query"]
+        fmt = request.get("format", "text")
+        if fmt == "text":
+            lines, warns = beanquery_run_lines_api(journal, query)
+        elif fmt == "csv":
+            lines, warns = beanquery_run_csv_api(journal, query)
+        else:
+            raise ValueError(f"Unknown output format: {fmt!r}")
+        return {"ok": True, "lines": lines, "warnings": warns}
+    raise ValueError(f"Unknown op: {op!r}")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            reply = handle_request(json.loads(line))
+        except Exception as exc:
+            reply = {"ok": False, "error": str(exc)}
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+def _remove_stale_socket(socket_path: str) -> None:
+    """Unlink a socket left by a dead worker; a live worker's socket raises EADDRINUSE."""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    finally:
+        probe.close()
+    raise OSError(errno.EADDRINUSE, f"A worker is already listening on {socket_path}")
+
+
+class WorkerServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded Unix-socket server; parsed ledgers are shared via beancount_io.load_ledger."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str) -> None:
+        _remove_stale_socket(socket_path)
+        # the socket file is created 0600 by bind(); no window for other users
+        umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _Handler)
+        finally:
+            os.umask(umask)
+        self.socket_path = socket_path
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+
+def serve(socket_path: str) -> None:
+    """Serve queries on `socket_path` until interrupted."""
+    with WorkerServer(socket_path) as server:
+        print(f"fava-forecast worker listening on {socket_path}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# ----------------------------------------------------------------
+# CLI entry point
+# ----------------------------------------------------------------
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Resident bean-query worker for fava-forecast")
+    ap.add_argument(
+        "--socket",
+        default=os.environ.get(WORKER_ENV),
+        help=f"Unix socket path (default: ${WORKER_ENV})",
+    )
+    args = ap.parse_args()
+    if not args.socket:
+        ap.error(f"--socket is required when ${WORKER_ENV} is not set")
+    try:
+        serve(args.socket)
+    except OSError as exc:
+        ap.exit(1, f"fava-forecast worker: {exc.strerror or exc}\n")
+
+
+if __name__ == "__main__":
+    main()
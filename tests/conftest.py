@@ -1,3 +1,35 @@
 import os, sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cache_dir(tmp_path_factory, monkeypatch):
+    """Keep the on-disk query cache out of the user's ~/.cache during tests."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("xdg-cache")))
+
+
+@pytest.fixture(autouse=True)
+def _no_resident_worker(monkeypatch):
+    """Never talk to a bean-query worker the developer may have running."""
+    monkeypatch.delenv("FAVA_FORECAST_WORKER", raising=False)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_rate_cache():
+    """Every test parses its prices files from scratch."""
+    from fava_forecast.rates import clear_rate_cache
+    clear_rate_cache()
+    yield
+    clear_rate_cache()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_budget_cache():
+    """Every test parses its budgets files from scratch."""
+    from fava_forecast.budgets import clear_budget_cache
+    clear_budget_cache()
+    yield
+    clear_budget_cache()
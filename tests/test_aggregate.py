@@ -0,0 +1,140 @@
+import datetime as dt
+from decimal import Decimal
+
+import fava_forecast.aggregate as ag
+import fava_forecast.beancount_io as io
+import fava_forecast.forecast as fc
+
+
+_LEDGER = """
+2025-01-01 open Assets:Bank
+2025-01-01 open Liabilities:Card
+2025-01-01 open Income:Salary
+2025-01-01 open Expenses:Food
+2025-01-01 open Equity:Opening
+2025-01-01 * "Opening"
+  Assets:Bank     1000 CRC
+  Assets:Bank       10 USD
+  Equity:Opening
+2025-01-05 * "Card"
+  Expenses:Food     20 USD
+  Liabilities:Card
+2025-01-12 * "Groceries"
+  Expenses:Food    100 CRC
+  Assets:Bank
+2025-01-15 * "Salary" #planned
+  Assets:Bank      500 CRC
+  Income:Salary
+2025-01-25 * "After until"
+  Expenses:Food    999 CRC
+  Assets:Bank
+"""
+
+
+def _entries(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text(_LEDGER, encoding="utf-8")
+    entries, _warns, _opts = io.load_ledger(str(j))
+    return str(j), entries
+
+
+def test_aggregate_buckets_single_pass(tmp_path):
+    _, entries = _entries(tmp_path)
+    b = ag.aggregate_buckets(entries, dt.date(2025, 1, 10), dt.date(2025, 1, 20))
+
+    # planned salary excluded from assets; entry after `until` ignored
+    assert b["assets"] == {"CRC": Decimal("900"), "USD": Decimal("10")}
+    assert b["liabs"] == {"USD": Decimal("-20")}
+    # income/expenses only inside [today, until), planned included
+    assert b["income"] == {"CRC": Decimal("-500")}
+    assert b["expenses"] == {"CRC": Decimal("100")}
+
+
+def test_aggregate_matches_grouped_queries(tmp_path):
+    path, entries = _entries(tmp_path)
+    today, until = dt.date(2025, 1, 3), dt.date(2025, 1, 30)
+    b = ag.aggregate_buckets(entries, today, until)
+
+    queries = {
+        "assets": fc.q_assets(until),
+        "liabs": fc.q_liabs(until),
+        "income": fc.q_future_income(today, until),
+        "expenses": fc.q_future_expenses(today, until),
+    }
+    for name, q in queries.items():
+        rows, _ = io.beanquery_run_rows(path, q)
+        assert dict(rows) == b[name], name
+
+
+def test_merge_buckets_sums_per_currency():
+    a = {"income": {"CRC": Decimal("1")}, "expenses": {}}
+    b = {"income": {"CRC": Decimal("2"), "USD": Decimal("3")}, "expenses": {"CRC": Decimal("4")}}
+    out = ag.merge_buckets([a, b], ("income", "expenses"))
+    assert out == {
+        "income": {"CRC": Decimal("3"), "USD": Decimal("3")},
+        "expenses": {"CRC": Decimal("4")},
+    }
+    assert ag.bucket_rows(out, "income") == [("CRC", Decimal("3")), ("USD", Decimal("3"))]
+
+
+def test_aggregate_horizons_match_single_cutoffs(tmp_path):
+    _, entries = _entries(tmp_path)
+    today = dt.date(2025, 1, 3)
+    untils = [dt.date(2025, 1, 5), dt.date(2025, 1, 13), dt.date(2025, 1, 20), dt.date(2025, 2, 1)]
+
+    sweep = ag.aggregate_horizons(entries, today, untils)
+
+    assert len(sweep) == len(untils)
+    for until, b in zip(untils, sweep):
+        assert b == ag.aggregate_buckets(entries, today, until), until
+
+
+def test_bin_dated_rows_is_cumulative():
+    rows = [
+        (dt.date(2025, 1, 1), "CRC", Decimal("100")),
+        (dt.date(2025, 1, 10), "CRC", Decimal("-10")),
+        (dt.date(2025, 1, 10), "USD", Decimal("2")),
+        (dt.date(2025, 1, 20), "CRC", Decimal("5")),  # on the last cutoff -> excluded
+    ]
+    out = ag.bin_dated_rows(rows, [dt.date(2025, 1, 10), dt.date(2025, 1, 20)])
+    assert out == [
+        [("CRC", Decimal("100"))],
+        [("CRC", Decimal("90")), ("USD", Decimal("2"))],
+    ]
+    assert ag.bin_dated_rows(rows, []) == []
+
+
+def test_aggregate_spending_counts_each_posting_for_its_deepest_budget(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text(
+        _LEDGER
+        + """
+2025-01-01 open Expenses:Food:Out
+2025-01-01 open Expenses:Rent
+2025-01-13 * "Dinner"
+  Expenses:Food:Out  30 CRC
+  Assets:Bank
+2025-01-14 * "Rent"
+  Expenses:Rent     400 CRC
+  Assets:Bank
+2025-01-16 * "Planned dinner" #planned
+  Expenses:Food:Out  70 CRC
+  Assets:Bank
+""",
+        encoding="utf-8",
+    )
+    entries, _warns, _opts = io.load_ledger(str(j))
+    since = {"Expenses:Food": dt.date(2025, 1, 1), "Expenses:Rent": dt.date(2025, 1, 14)}
+    until = dt.date(2025, 1, 20)
+
+    spent = ag.aggregate_spending(entries, since, until)
+    # Food:Out rolls into Food, planned and out-of-window postings are skipped
+    assert spent == {
+        "Expenses:Food": {"USD": Decimal("20"), "CRC": Decimal("130")},
+        "Expenses:Rent": {"CRC": Decimal("400")},
+    }
+    assert ag.aggregate_spending(entries, {}, until) == {}
+
+    # the same from the date-grouped query used by the subprocess engine
+    lines, _warns = io.beanquery_run_csv(str(j), fc.q_spending(dt.date(2025, 1, 1), until))
+    assert ag.bin_spending_rows(io.beanquery_csv_account_amounts(lines), since, until) == spent
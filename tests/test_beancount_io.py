@@ -87,6 +87,80 @@ def test_grouped_amounts_parses_valid_and_skips_invalid():
     ]
 
 
+def test_grouped_amounts_accepts_any_commodity_name():
+    body = [
+        "VBTLX2     10 VBTLX2",
+        "BTC.X   0.25 BTC.X",
+        "A'B      1.5 A'B",
+        "/NFT     3 /NFT",
+    ]
+    assert io.beanquery_grouped_amounts(body) == [
+        ("VBTLX2", Decimal("10")),
+        ("BTC.X", Decimal("0.25")),
+        ("A'B", Decimal("1.5")),
+        ("/NFT", Decimal("3")),
+    ]
+
+
+# -----------------------------
+# beanquery_csv_amounts
+# -----------------------------
+def test_csv_amounts_per_currency_columns():
+    lines = [
+        "currency,sum(position) (USD),sum(position) (BTC.X),sum(position) (VBTLX2)",
+        "USD,-12345.5,,",
+        "BTC.X,,0.25,",
+        "VBTLX2,,,10",
+        "",
+    ]
+    assert io.beanquery_csv_amounts(lines) == [
+        ("USD", Decimal("-12345.5")),
+        ("BTC.X", Decimal("0.25")),
+        ("VBTLX2", Decimal("10")),
+    ]
+
+
+def test_csv_amounts_single_number_column_and_empty_result():
+    assert io.beanquery_csv_amounts(["currency,sum(number)", "CRC,1000", "USD,2.5"]) == [
+        ("CRC", Decimal("1000")),
+        ("USD", Decimal("2.5")),
+    ]
+    # no rows -> bean-query prints only the first header cell
+    assert io.beanquery_csv_amounts(["currency"]) == []
+    assert io.beanquery_csv_amounts([]) == []
+
+
+def test_csv_dated_amounts_reads_date_column():
+    import datetime as dt
+
+    lines = [
+        "date,currency,sum(position) (CRC),sum(position) (USD)",
+        "2025-01-01,CRC,100,",
+        "2025-01-01,USD,,1",
+        "2025-01-12,CRC,-10,",
+    ]
+    assert io.beanquery_csv_dated_amounts(lines) == [
+        (dt.date(2025, 1, 1), "CRC", Decimal("100")),
+        (dt.date(2025, 1, 1), "USD", Decimal("1")),
+        (dt.date(2025, 1, 12), "CRC", Decimal("-10")),
+    ]
+    assert io.beanquery_csv_dated_amounts(["date"]) == []
+
+
+def test_csv_account_amounts_reads_date_and_account_columns():
+    import datetime as dt
+
+    lines = [
+        "date,account,currency,sum(position) (CRC),sum(position) (USD)",
+        "2025-01-01,Expenses:Food,CRC,100,",
+        "2025-01-02,Expenses:Food:Out,USD,,1.5",
+    ]
+    assert io.beanquery_csv_account_amounts(lines) == [
+        (dt.date(2025, 1, 1), "Expenses:Food", "CRC", Decimal("100")),
+        (dt.date(2025, 1, 2), "Expenses:Food:Out", "USD", Decimal("1.5")),
+    ]
+
+
 # -----------------------------
 # beanquery_grouped_amounts_from_journal
 # -----------------------------
@@ -115,3 +189,88 @@ def test_grouped_amounts_from_journal_pipeline(monkeypatch, tmp_path):
 
     rows = io.beanquery_grouped_amounts_from_journal(str(j), "SELECT currency, sum(position) GROUP BY currency")
     assert rows == [("USD", Decimal("10.00")), ("CRC", Decimal("1000.00"))]
+
+
+# -----------------------------
+# In-process engine
+# -----------------------------
+_LEDGER = """
+2025-01-01 open Assets:Bank
+2025-01-01 open Assets:Broker
+2025-01-01 open Equity:Opening
+2025-01-01 * "Opening"
+  Assets:Bank     1000.00 USD
+  Assets:Bank      500 CRC
+  Equity:Opening
+2025-01-02 * "Buy"
+  Assets:Broker   10 VBTLX2 {5 USD}
+  Assets:Bank    -50.00 USD
+2025-02-01 * "Salary" #planned
+  Assets:Bank      300 CRC
+  Equity:Opening
+"""
+
+_Q_ASSETS = (
+    "SELECT currency, sum(position) WHERE account ~ '^Assets' "
+    "AND 'planned' NOT IN tags GROUP BY currency"
+)
+
+
+def test_run_rows_api_returns_typed_rows(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text(_LEDGER, encoding="utf-8")
+
+    rows, warns = io.beanquery_run_rows(str(j), _Q_ASSETS)
+    assert dict(rows) == {
+        "USD": Decimal("950.00"),
+        "CRC": Decimal("500"),
+        "VBTLX2": Decimal("10"),
+    }
+    assert warns == []
+
+
+def test_load_ledger_reloads_when_file_changes(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text(_LEDGER, encoding="utf-8")
+
+    entries1, _, _ = io.load_ledger(str(j))
+    assert io.load_ledger(str(j))[0] is entries1  # cached
+
+    j.write_text(_LEDGER + "\n2025-03-01 open Assets:Cash\n", encoding="utf-8")
+    entries2, _, _ = io.load_ledger(str(j))
+    assert entries2 is not entries1
+    assert len(entries2) == len(entries1) + 1
+
+
+def test_run_lines_api_renders_text(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text(_LEDGER, encoding="utf-8")
+
+    lines, _ = io.beanquery_run_lines_api(str(j), "SELECT date, narration WHERE date < 2025-01-02")
+    assert any("Opening" in ln for ln in lines)
+    assert not any("Buy" in ln for ln in lines)
+
+
+def test_grouped_rows_subprocess_engine_uses_bean_query(monkeypatch, tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(
+        io.subprocess,
+        "run",
+        lambda cmd, text=True, capture_output=True: SimpleNamespace(
+            returncode=0,
+            stdout="currency,sum(position) (USD)\nUSD,10.00\n",
+            stderr="warn\n",
+        ),
+    )
+    rows, warns = io.beanquery_grouped_rows(str(j), "Q", engine="subprocess")
+    assert rows == [("USD", Decimal("10.00"))]
+    assert warns == ["warn"]
+
+
+def test_resolve_engine():
+    assert io.resolve_engine("subprocess") == "subprocess"
+    assert io.resolve_engine("auto") in ("api", "subprocess")
+    with pytest.raises(ValueError):
+        io.resolve_engine("nope")
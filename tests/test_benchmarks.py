@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+import synth  # noqa: E402
+import bench  # noqa: E402
+
+
+SPEC = synth.LedgerSpec(postings=40, future_postings=10, prices=12, budgets=5, expense_accounts=4)
+
+
+def _read_all(paths):
+    return {k: Path(p).read_text(encoding="utf-8") for k, p in paths.items()}
+
+
+def test_generator_is_deterministic(tmp_path):
+    a = _read_all(synth.generate(str(tmp_path / "a"), SPEC))
+    b = _read_all(synth.generate(str(tmp_path / "b"), SPEC))
+    assert a == b
+    assert a["budgets"].count('custom "budget"') == 5
+    assert a["prices"].count(" price ") == 12
+    assert a["future"].count("#planned") == 5
+
+    other = _read_all(synth.generate(str(tmp_path / "c"), synth.LedgerSpec(**{**SPEC.__dict__, "seed": 1})))
+    assert other["main"] != a["main"]
+
+
+def test_bench_writes_json_results(tmp_path, capsys):
+    out = tmp_path / "res.json"
+    bench.main([
+        "--size", "tiny", "--postings", "40", "--prices", "12", "--budgets", "5",
+        "--repeat", "1", "--only", "api,warm", "--only", "load_",
+        "--data-dir", str(tmp_path / "data"), "--out", str(out),
+    ])
+    report = json.loads(out.read_text())
+    assert report["meta"]["spec"]["postings"] == 40
+    assert set(report["results"]) == {"run_forecast[api,warm]", "load_prices_to_op", "load_budget_items"}
+    res = report["results"]["run_forecast[api,warm]"]
+    assert res["min"] <= res["median"] and len(res["runs"]) == 1
+    assert res["counters"]["rows_parsed"] > 0
+
+    bench.main(["--size", "tiny", "--postings", "40", "--prices", "12", "--budgets", "5",
+                "--repeat", "1", "--only", "load_prices", "--data-dir", str(tmp_path / "data"),
+                "--compare", str(out)])
+    assert "ratio" in capsys.readouterr().out
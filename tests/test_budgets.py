@@ -1,7 +1,10 @@
 import datetime as dt
 from decimal import Decimal
+from fractions import Fraction
 from pathlib import Path
 
+import pytest
+
 import fava_forecast.budgets as b
 
 
@@ -30,6 +33,15 @@ def test_parse_budget_line_ok_monthly_decimal():
     assert item.currency == "USD"
 
 
+def test_format_budget_line_round_trips():
+    items = [
+        b.BudgetItem(dt.date(2025, 1, 1), "Expenses:Food", "weekly", Decimal("700"), "CRC"),
+        b.BudgetItem(dt.date(2025, 2, 10), "Expenses:Gym", "monthly", Decimal("1E+3"), "USD", end=dt.date(2025, 7, 1)),
+    ]
+    assert b.format_budget_line(items[1]) == '2025-02-10 custom "budget" "Expenses:Gym" "monthly" 1000 USD 2025-07-01'
+    assert [b.parse_budget_line(b.format_budget_line(it)) for it in items] == items
+
+
 def test_parse_budget_line_nonmatch_returns_none():
     assert b.parse_budget_line("garbage line") is None
 
@@ -187,3 +199,544 @@ def test_compute_budget_planned_expenses_end_to_end(tmp_path):
     assert got["CRC"][1] == crc_amt and got["CRC"][2] == Decimal("1")
     assert got["USD"][1] == usd_amt and got["USD"][2] == Decimal("520")
     assert got["EUR"][1] == eur_amt and got["EUR"][2] == Decimal("600")
+
+
+# -----------------------------
+# compile_budgets / BudgetTable
+# -----------------------------
+def _many_items(n=300):
+    freqs = ["weekly", "monthly", "quarterly", "yearly"]
+    curs = ["CRC", "USD", "EUR"]
+    return [
+        b.BudgetItem(
+            start=dt.date(2024, 12, 1) + dt.timedelta(days=(i * 7) % 90),
+            account=f"Expenses:E{i % 17}",
+            freq=freqs[i % 4],
+            amount=Decimal(f"{(i * 37) % 5000}.{i % 100:02d}"),
+            currency=curs[i % 3],
+        )
+        for i in range(n)
+    ]
+
+
+def test_budget_table_matches_per_item_decimal_sums():
+    items = _many_items()
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=d) for d in (0, 1, 13, 45, 400)]
+    got = b.compile_budgets(items).totals(today, untils)
+
+    for until, by_cur in zip(untils, got):
+        ref = {}
+        for it in items:
+            amt = b._planned_amount_in_window(it, today, until)
+            if amt:
+                ref[it.currency] = ref.get(it.currency, Decimal("0")) + amt
+        assert by_cur.keys() == ref.keys()
+        for cur in ref:
+            # exact integer sum, one rounding: agrees with the per-item Decimal loop to its precision
+            assert abs(by_cur[cur] - ref[cur]) <= abs(ref[cur]) * Decimal("1e-24")
+    assert got[0] == {}
+
+
+@pytest.mark.parametrize("mode", b.BUDGET_MODES)
+def test_every_mode_matches_per_item_baseline_over_whole_periods(mode):
+    # 28 years = 1461 weeks = 336 months: every frequency completes whole periods,
+    # so all three modes plan exactly what the even spread does
+    today, until = dt.date(2024, 1, 1), dt.date(2052, 1, 1)
+    freqs = ("weekly", "monthly", "quarterly", "yearly")
+    items = [
+        b.BudgetItem(today, f"Expenses:A{i}", freqs[i % 4], Decimal(f"{(i * 7919) % 100000}.{i % 97:02d}"), "CRC")
+        for i in range(300)
+    ]
+    got = b.budget_table(items, mode).totals(today, [until])[0]["CRC"]
+
+    baseline = sum(b._planned_amount_in_window(it, today, until) for it in items)
+    assert abs(got - baseline) <= baseline * Decimal("1e-25")
+    # the compiled total is the exact sum, rounded (at most) once
+    exact = sum(Fraction(it.amount) * Fraction(until.toordinal() - today.toordinal()) / Fraction(b.FREQ_DAYS[it.freq])
+                for it in items)
+    assert got == Decimal(exact.numerator) / Decimal(exact.denominator)
+
+
+def test_keyed_totals_is_abstract():
+    with pytest.raises(TypeError):
+        b._KeyedTotals()
+
+
+def test_budget_table_numpy_and_python_paths_are_identical(monkeypatch):
+    items = _many_items()
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=d) for d in range(0, 365, 7)]
+    table = b.compile_budgets(items)
+    vectorized = table.totals(today, untils)
+
+    monkeypatch.setattr(b, "np", None)
+    plain = b.compile_budgets(items)
+    assert isinstance(plain.rate, list)
+    assert plain.totals(today, untils) == vectorized
+    # windows evaluated together equal windows evaluated one by one
+    assert [plain.totals(today, [u])[0] for u in untils[:5]] == vectorized[:5]
+
+
+def test_budget_table_falls_back_to_python_ints_on_int64_overflow():
+    item = b.BudgetItem(dt.date(2025, 1, 1), "Expenses:Big", "weekly", Decimal("9" * 16 + ".99"), "CRC")
+    table = b.compile_budgets([item])
+    until = dt.date(2025, 1, 8)
+    assert table.totals(dt.date(2025, 1, 1), [until]) == [{"CRC": Decimal("9" * 16 + ".99")}]
+
+
+# -----------------------------
+# calendar mode
+# -----------------------------
+def _calendar_reference(item, today, until):
+    """Day-by-day sum of amount / real period length (slow, obviously right)."""
+    def boundary(k):
+        if item.freq == "weekly":
+            return item.start + dt.timedelta(days=7 * k)
+        step = {"monthly": 1, "quarterly": 3, "yearly": 12}[item.freq]
+        y, m = divmod(item.start.year * 12 + item.start.month - 1 + k * step, 12)
+        last = (dt.date(y + (m + 1) // 12, (m + 1) % 12 + 1, 1) - dt.timedelta(days=1)).day
+        return dt.date(y, m + 1, min(item.start.day, last))
+
+    total, k = Fraction(0), 0
+    day = max(today, item.start)
+    while day < until:
+        while boundary(k + 1) <= day:
+            k += 1
+        total += Fraction(item.amount) / (boundary(k + 1) - boundary(k)).days
+        day += dt.timedelta(days=1)
+    return total
+
+
+def test_calendar_mode_uses_real_month_lengths():
+    feb = b.BudgetItem(dt.date(2025, 1, 1), "Expenses:Rent", "monthly", Decimal("2800"), "CRC")
+    table = b.budget_table([feb], "calendar")
+    got = table.totals(dt.date(2025, 2, 1), [dt.date(2025, 2, 15), dt.date(2025, 3, 1), dt.date(2025, 4, 1)])
+    assert got == [{"CRC": Decimal("1400")}, {"CRC": Decimal("2800")}, {"CRC": Decimal("5600")}]
+    # with 30.4375-day months a whole February gets less than one month's budget
+    assert b.budget_table([feb]).totals(dt.date(2025, 2, 1), [dt.date(2025, 3, 1)])[0]["CRC"] < Decimal("2800")
+
+
+def test_calendar_mode_clamps_month_end_anchors():
+    # periods: Jan 31 - Feb 28 (28 days), Feb 28 - Mar 31 (31 days)
+    item = b.BudgetItem(dt.date(2025, 1, 31), "Expenses:X", "monthly", Decimal("3100"), "USD")
+    got = b.budget_table([item], "calendar").totals(dt.date(2025, 2, 28), [dt.date(2025, 3, 1)])
+    assert got == [{"USD": Decimal("100")}]
+
+
+def test_calendar_mode_matches_day_by_day_reference():
+    items = _many_items(60) + [
+        b.BudgetItem(dt.date(2024, 2, 29), "Expenses:Leap", "yearly", Decimal("366"), "EUR"),
+        b.BudgetItem(dt.date(2025, 3, 31), "Expenses:Q", "quarterly", Decimal("91.5"), "CRC"),
+    ]
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=d) for d in (0, 1, 29, 45, 400)]
+    got = b.budget_table(items, "calendar").totals(today, untils)
+
+    for until, by_cur in zip(untils, got):
+        ref = {}
+        for it in items:
+            if it.amount and until > max(today, it.start):
+                ref[it.currency] = ref.get(it.currency, Fraction(0)) + _calendar_reference(it, today, until)
+        assert by_cur == {cur: Decimal(v.numerator) / Decimal(v.denominator) for cur, v in ref.items()}
+
+
+@pytest.mark.parametrize("mode", b.BUDGET_MODES)
+def test_budget_starting_after_the_window_plans_nothing(mode):
+    item = b.BudgetItem(dt.date(2025, 1, 1), "Expenses:Rent", "monthly", Decimal("2800"), "CRC")
+    table = b.budget_table([item], mode)
+    assert table.totals(dt.date(2024, 6, 1), [dt.date(2024, 7, 1)]) == [{}]
+    assert table.totals(dt.date(2024, 6, 1), [dt.date(2025, 1, 1), dt.date(2025, 2, 1)])[0] == {}
+
+
+@pytest.mark.parametrize("mode", b.BUDGET_MODES)
+def test_until_before_today_plans_nothing(tmp_path, mode):
+    p = tmp_path / "budgets.bean"
+    p.write_text('2025-01-01 custom "budget" "Expenses:Rent" "monthly" 2800 CRC\n', encoding="utf-8")
+    total, breakdown = b.compute_budget_planned_expenses(
+        str(p), dt.date(2025, 6, 1), dt.date(2025, 3, 1), {"CRC": Decimal("1")}, "CRC", mode
+    )
+    assert total == Decimal("0") and list(breakdown) == []
+
+
+def test_unknown_budget_mode_raises():
+    with pytest.raises(ValueError, match="Unknown budget mode"):
+        b.budget_table([], "lunar")
+
+
+def test_compute_budget_planned_expenses_calendar_mode(tmp_path):
+    p = tmp_path / "budgets.bean"
+    p.write_text('2025-01-01 custom "budget" "Rent" "monthly" 2800 CRC\n', encoding="utf-8")
+    rates = {"CRC": Decimal("1")}
+    today, until = dt.date(2025, 2, 1), dt.date(2025, 3, 1)
+
+    total, _ = b.compute_budget_planned_expenses(str(p), today, until, rates, "CRC", "calendar")
+    assert total == Decimal("2800")
+    sweep = b.compute_budget_planned_expenses_horizons(str(p), today, [until, dt.date(2025, 2, 8)], rates, "CRC", "calendar")
+    assert [t for t, _ in sweep] == [Decimal("2800"), Decimal("700")]
+
+
+# -----------------------------
+# lump mode
+# -----------------------------
+def test_occurrences_on_period_starts():
+    d = dt.date
+    monthly = b.BudgetItem(d(2025, 1, 31), "Expenses:Rent", "monthly", Decimal("100"), "CRC")
+    assert list(b.occurrences(monthly, d(2025, 2, 1), d(2025, 6, 1))) == [
+        d(2025, 2, 28), d(2025, 3, 31), d(2025, 4, 30), d(2025, 5, 31),
+    ]
+    # nothing before the budget's own start
+    assert list(b.occurrences(monthly, d(2024, 1, 1), d(2025, 3, 1))) == [d(2025, 1, 31), d(2025, 2, 28)]
+
+    weekly = b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "weekly", Decimal("7"), "CRC")
+    assert list(b.occurrences(weekly, d(2025, 1, 8), d(2025, 1, 16))) == [d(2025, 1, 8), d(2025, 1, 15)]
+    assert list(b.occurrences(weekly, d(2025, 1, 9), d(2025, 1, 15))) == []
+
+    yearly = b.BudgetItem(d(1975, 6, 1), "Expenses:Insurance", "yearly", Decimal("1"), "CRC")
+    gen = b.occurrences(yearly, d(2025, 1, 1), d(2075, 1, 1))
+    assert next(gen) == d(2025, 6, 1)   # lazy: nothing beyond the first one is computed yet
+    assert sum(1 for _ in gen) == 49
+
+
+def test_budget_occurrences_merge_in_date_order():
+    d = dt.date
+    items = [
+        b.BudgetItem(d(2025, 1, 10), "Expenses:Rent", "monthly", Decimal("500"), "USD"),
+        b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "weekly", Decimal("70"), "CRC"),
+    ]
+    got = [(day, it.account) for day, it in b.budget_occurrences(items, d(2025, 1, 5), d(2025, 2, 12))]
+    assert [day for day, _ in got] == sorted(day for day, _ in got)
+    assert [day for day, acc in got if acc == "Expenses:Rent"] == [d(2025, 1, 10), d(2025, 2, 10)]
+    assert len(got) == 2 + 5
+
+
+def test_lump_mode_totals_match_occurrence_sums():
+    items = _many_items(80)
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=days) for days in (0, 1, 17, 90, 800)]
+    got = b.budget_table(items, "lump").totals(today, untils)
+
+    for until, by_cur in zip(untils, got):
+        ref = {}
+        for it in items:
+            n = len(list(b.occurrences(it, today, until)))
+            if n and it.amount:
+                ref[it.currency] = ref.get(it.currency, Decimal("0")) + it.amount * n
+        assert by_cur == ref
+    assert got[0] == {}
+
+
+def test_compute_budget_planned_expenses_lump_mode(tmp_path):
+    p = tmp_path / "budgets.bean"
+    p.write_text('2025-01-01 custom "budget" "Rent" "monthly" 2800 CRC\n', encoding="utf-8")
+    rates = {"CRC": Decimal("1")}
+    today = dt.date(2025, 1, 15)
+
+    untils = [dt.date(2025, 2, 1), dt.date(2025, 2, 2), dt.date(2025, 4, 1)]
+    sweep = b.compute_budget_planned_expenses_horizons(str(p), today, untils, rates, "CRC", "lump")
+    assert [t for t, _ in sweep] == [Decimal("0"), Decimal("2800"), Decimal("5600")]
+
+
+# -----------------------------
+# end dates and superseding
+# -----------------------------
+def test_parse_budget_line_with_end_date():
+    item = b.parse_budget_line('2025-01-01 custom "budget" "Expenses:Gym" "monthly" 40 USD 2025-07-01')
+    assert item.end == dt.date(2025, 7, 1)
+    assert b.parse_budget_line('2025-01-01 custom "budget" "Expenses:Gym" "monthly" 40 USD').end is None
+
+
+def test_budget_index_later_entry_supersedes_earlier():
+    d = dt.date
+    items = [
+        b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "monthly", Decimal("300"), "CRC"),
+        b.BudgetItem(d(2025, 1, 1), "Expenses:Rent", "monthly", Decimal("900"), "CRC", end=d(2025, 3, 1)),
+        b.BudgetItem(d(2025, 4, 1), "Expenses:Food", "monthly", Decimal("400"), "CRC"),
+        b.BudgetItem(d(2025, 6, 1), "Expenses:Food", "monthly", Decimal("1"), "CRC"),
+        b.BudgetItem(d(2025, 6, 1), "Expenses:Food", "monthly", Decimal("500"), "CRC"),  # same day: later line wins
+    ]
+    index = b.BudgetIndex(items)
+    assert [(it.account, it.amount, it.end) for it in index.items()] == [
+        ("Expenses:Food", Decimal("300"), d(2025, 4, 1)),
+        ("Expenses:Rent", Decimal("900"), d(2025, 3, 1)),
+        ("Expenses:Food", Decimal("400"), d(2025, 6, 1)),
+        ("Expenses:Food", Decimal("500"), None),
+    ]
+    # only the budgets overlapping the window, in file order
+    assert [it.amount for it in index.active(d(2025, 3, 1), d(2025, 4, 2))] == [Decimal("300"), Decimal("400")]
+    assert [it.amount for it in index.active(d(2025, 2, 1), d(2025, 3, 1))] == [Decimal("300"), Decimal("900")]
+    assert [it.amount for it in index.active(d(2026, 1, 1), d(2027, 1, 1))] == [Decimal("500")]
+
+
+def test_budget_index_touches_only_overlapping_history():
+    start = dt.date(2000, 1, 1)
+    history = [
+        b.BudgetItem(start + dt.timedelta(days=30 * i), f"Expenses:E{i % 3}", "monthly", Decimal(i + 1), "CRC")
+        for i in range(1000)
+    ]
+    index = b.BudgetIndex(history)
+    # the latest budget of each account
+    assert [it.amount for it in index.active(dt.date(2090, 1, 1), dt.date(2090, 2, 1))] == [
+        Decimal("998"), Decimal("999"), Decimal("1000"),
+    ]
+    # the budget running on Jan 15 plus the one starting before the window ends
+    assert [it.amount for it in index.active(dt.date(2000, 1, 15), dt.date(2000, 2, 1))] == [
+        Decimal("1"), Decimal("2"),
+    ]
+
+
+def test_all_modes_stop_at_end_date():
+    d = dt.date
+    gym = b.BudgetItem(d(2025, 1, 1), "Expenses:Gym", "monthly", Decimal("3100"), "USD", end=d(2025, 3, 11))
+    food = b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "weekly", Decimal("70"), "CRC", end=d(2025, 1, 1))
+    today, untils = d(2025, 3, 1), [d(2025, 3, 6), d(2025, 4, 1)]
+
+    average = b.budget_table([gym, food], "average").totals(today, untils)
+    # 10 days of March until the gym budget ends on the 11th
+    assert average == [{"USD": Decimal(3100 * 5) / b.FREQ_DAYS["monthly"]}, {"USD": Decimal(3100 * 10) / b.FREQ_DAYS["monthly"]}]
+    assert b.budget_table([gym, food], "calendar").totals(today, untils) == [{"USD": Decimal("500")}, {"USD": Decimal("1000")}]
+    assert b.budget_table([gym, food], "lump").totals(today, untils) == [{"USD": Decimal("3100")}] * 2
+    assert b.budget_table([gym, food], "lump").totals(d(2025, 3, 2), untils) == [{}, {}]
+
+
+def test_compute_budget_planned_expenses_counts_superseded_budget_once(tmp_path):
+    p = tmp_path / "budgets.bean"
+    p.write_text(
+        "\n".join(
+            [
+                '2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC',
+                '2025-01-11 custom "budget" "Expenses:Food" "weekly" 140 CRC',
+                '2025-01-01 custom "budget" "Expenses:Gym" "weekly" 7 CRC 2025-01-13',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    rates = {"CRC": Decimal("1")}
+    # Food: 10/day for the 10th, 20/day from the 11th; Gym: 1/day until the 13th
+    total, _ = b.compute_budget_planned_expenses(str(p), dt.date(2025, 1, 10), dt.date(2025, 1, 15), rates, "CRC")
+    assert total == Decimal("10") + Decimal("80") + Decimal("3")
+
+
+# -----------------------------
+# per-account breakdown
+# -----------------------------
+@pytest.mark.parametrize("mode", b.BUDGET_MODES)
+def test_breakdown_rolls_accounts_up_to_currency_totals(mode):
+    items = _many_items() + [
+        b.BudgetItem(dt.date(2025, 1, 1), "Expenses:E1:Out", "weekly", Decimal("7"), "CRC"),
+        b.BudgetItem(dt.date(2025, 1, 20), "Expenses:E1:Out", "monthly", Decimal("10"), "USD"),
+    ]
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=d) for d in (0, 13, 45, 400)]
+    table = b.budget_table(items, mode)
+    windows = table.breakdown(today, untils)
+
+    assert [w.by_currency for w in windows] == table.totals(today, untils)
+    own = b.budget_table([it for it in items if it.account == "Expenses:E1"], mode).breakdown(today, untils)
+    for window, e1 in zip(windows[1:], own[1:]):
+        accounts = window.by_account
+        # the root adds up every key, a parent its own budgets plus its children
+        assert accounts["Expenses"] == window.by_currency
+        out = accounts["Expenses:E1:Out"]
+        assert set(out) == {"CRC", "USD"}
+        for cur, amt in accounts["Expenses:E1"].items():
+            # separate tables round once each (calendar periods may differ in denominator)
+            assert abs(amt - e1.by_currency.get(cur, 0) - out.get(cur, 0)) <= abs(amt) * Decimal("1e-24")
+        assert list(accounts) == sorted(accounts)
+    assert windows[0].by_account == {}
+
+
+def test_breakdown_numpy_and_python_paths_are_identical(monkeypatch):
+    items = _many_items()
+    today = dt.date(2025, 1, 15)
+    untils = [today + dt.timedelta(days=d) for d in range(0, 120, 7)]
+    vectorized = [w.by_account for w in b.compile_budgets(items).breakdown(today, untils)]
+    monkeypatch.setattr(b, "np", None)
+    assert [w.by_account for w in b.compile_budgets(items).breakdown(today, untils)] == vectorized
+
+
+def test_compute_budget_planned_expenses_breakdown_has_accounts(tmp_path):
+    p = tmp_path / "budgets.bean"
+    p.write_text(
+        "\n".join(
+            [
+                '2025-01-01 custom "budget" "Expenses:Food:Groceries" "weekly" 70 CRC',
+                '2025-01-01 custom "budget" "Expenses:Food:Out" "weekly" 7 USD',
+                '2025-01-01 custom "budget" "Expenses:Gym" "weekly" 14 CRC',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    rates = {"CRC": Decimal("1"), "USD": Decimal("500")}
+    total, breakdown = b.compute_budget_planned_expenses(str(p), dt.date(2025, 1, 10), dt.date(2025, 1, 15), rates, "CRC")
+    assert breakdown.accounts == {
+        "Expenses": {"CRC": Decimal("60"), "USD": Decimal("5")},
+        "Expenses:Food": {"CRC": Decimal("50"), "USD": Decimal("5")},
+        "Expenses:Food:Groceries": {"CRC": Decimal("50")},
+        "Expenses:Food:Out": {"USD": Decimal("5")},
+        "Expenses:Gym": {"CRC": Decimal("10")},
+    }
+    converted = b.convert_accounts(breakdown.accounts, rates)
+    assert converted[0] == ("Expenses", {"CRC": Decimal("60"), "USD": Decimal("5")}, total)
+    assert [t for _a, _c, t in converted] == [Decimal("2560"), Decimal("2550"), Decimal("50"), Decimal("2500"), Decimal("10")]
+
+
+# -----------------------------
+# budget vs actual
+# -----------------------------
+def test_current_period_contains_day():
+    d = dt.date
+    weekly = b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "weekly", Decimal("70"), "CRC")
+    assert b.current_period(weekly, d(2025, 1, 1)) == (d(2025, 1, 1), d(2025, 1, 8))
+    assert b.current_period(weekly, d(2025, 1, 15)) == (d(2025, 1, 15), d(2025, 1, 22))
+    month_end = b.BudgetItem(d(2025, 1, 31), "Expenses:Rent", "monthly", Decimal("1"), "CRC")
+    assert b.current_period(month_end, d(2025, 3, 15)) == (d(2025, 2, 28), d(2025, 3, 31))
+    assert b.current_period(month_end, d(2025, 3, 31)) == (d(2025, 3, 31), d(2025, 4, 30))
+    quarterly = b.BudgetItem(d(2025, 2, 10), "Expenses:Car", "quarterly", Decimal("1"), "CRC")
+    assert b.current_period(quarterly, d(2025, 5, 9)) == (d(2025, 2, 10), d(2025, 5, 10))
+    # period starts are the lump-mode due dates
+    due = [day for day, _it in b.budget_occurrences([month_end], d(2025, 1, 1), d(2025, 6, 1))]
+    assert [b.current_period(month_end, day)[0] for day in due] == due
+
+
+@pytest.mark.parametrize("mode, accrued", [
+    ("average", Decimal(3100 * 10) / b.FREQ_DAYS["monthly"]),
+    ("calendar", Decimal("1000")),
+    ("lump", Decimal("3100")),
+])
+def test_budget_report_joins_spending_with_budgets(mode, accrued):
+    d = dt.date
+    index = b.BudgetIndex([
+        b.BudgetItem(d(2025, 1, 1), "Expenses:Food", "monthly", Decimal("3100"), "CRC"),
+        b.BudgetItem(d(2025, 1, 1), "Expenses:Gym", "weekly", Decimal("10"), "USD", end=d(2025, 2, 1)),
+    ])
+    periods = b.budget_periods(index, d(2025, 3, 10))
+    assert list(periods) == ["Expenses:Food"]
+    spent = {"Expenses:Food": {"CRC": Decimal("800"), "USD": Decimal("1"), "XAU": Decimal("2")}}
+    rates = {"CRC": Decimal("1"), "USD": Decimal("500")}
+
+    [row] = b.budget_report(periods, spent, d(2025, 3, 10), rates, mode)
+    assert (row.period_start, row.period_end) == (d(2025, 3, 1), d(2025, 4, 1))
+    assert row.spent == Decimal("1300") and row.unconverted == {"XAU": Decimal("2")}
+    assert row.accrued == accrued
+    assert row.remaining == Decimal("1800")
+
+
+# -----------------------------
+# load_budget_index (process-wide cache)
+# -----------------------------
+def test_load_budget_index_parses_each_version_once(tmp_path, monkeypatch):
+    import os
+    from fava_forecast.instrument import Recorder, recording
+
+    p = tmp_path / "budgets.bean"
+    p.write_text('2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n', encoding="utf-8")
+    parsed = []
+    real = b.load_budget_items
+    monkeypatch.setattr(b, "load_budget_items", lambda path: parsed.append(path) or real(path))
+
+    rec = Recorder()
+    with recording(rec):
+        first = b.load_budget_index(str(p))
+        assert b.load_budget_index(str(tmp_path / "." / "budgets.bean")) is first
+    assert len(parsed) == 1
+    assert rec.as_dict()["counters"] == {
+        "budget_cache_misses": 1, "budget_cache_hits": 1, "bytes_parsed": p.stat().st_size, "rows_parsed": 1,
+    }
+
+    # same window and mode -> the same compiled table
+    today, until = dt.date(2025, 1, 1), dt.date(2025, 1, 8)
+    assert first.table(today, until) is first.table(today, until)
+    assert first.table(today, until, "lump") is not first.table(today, until)
+
+    p.write_text('2025-01-01 custom "budget" "Expenses:Food" "weekly" 140 CRC\n', encoding="utf-8")
+    os.utime(p, ns=(p.stat().st_atime_ns, p.stat().st_mtime_ns + 1_000_000))
+    changed = b.load_budget_index(str(p))
+    assert changed is not first and len(parsed) == 2
+    assert changed.table(today, until).totals(today, [until]) == [{"CRC": Decimal("140")}]
+    assert len(b._BUDGETS) == 1   # the stale version is dropped
+
+
+def test_load_budget_index_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(b, "_BUDGETS_MAX", 2)
+    paths = []
+    for name in ("a", "b", "c"):
+        p = tmp_path / f"{name}.bean"
+        p.write_text(f'2025-01-01 custom "budget" "Expenses:{name}" "weekly" 7 CRC\n', encoding="utf-8")
+        paths.append(str(p))
+
+    a = b.load_budget_index(paths[0])
+    b.load_budget_index(paths[1])
+    assert b.load_budget_index(paths[0]) is a     # refresh "a"
+    b.load_budget_index(paths[2])                 # evicts "b"
+    assert [key[0] for key in b._BUDGETS] == [paths[0], paths[2]]
+    assert b.load_budget_index(str(tmp_path / "absent.bean")).items() == []
+
+
+# -----------------------------
+# budgets from the loaded ledger
+# -----------------------------
+def _ledger_with_budgets(tmp_path):
+    journal = tmp_path / "main.bean"
+    included = tmp_path / "envelopes.bean"
+    journal.write_text(
+        "\n".join(
+            [
+                'option "operating_currency" "CRC"',
+                'include "envelopes.bean"',
+                '2025-01-01 open Assets:Bank',
+                '2025-01-01 custom "budget"   "Expenses:Food"  "weekly"  70 CRC  ; spacing and a comment',
+                '  note: "metadata is fine"',
+                '2025-01-01 custom "budget" "Expenses:Gym" "weekly" 7 CRC 2025-01-05',
+                '2025-01-01 custom "budget" "Expenses:Bad" 70 CRC',
+                '2025-01-01 custom "fava-option" "language" "en"',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    included.write_text('2025-01-01 custom "budget" "Expenses:Rent" "monthly" 1000 USD\n', encoding="utf-8")
+    return journal, included
+
+
+def test_budget_items_from_loaded_entries(tmp_path):
+    from fava_forecast.beancount_io import load_ledger
+
+    journal, _included = _ledger_with_budgets(tmp_path)
+    entries, _warns, _options = load_ledger(str(journal))
+    items = {it.account: it for it in b.budget_items_from_entries(entries)}
+    assert set(items) == {"Expenses:Food", "Expenses:Gym", "Expenses:Rent"}
+    assert items["Expenses:Food"] == b.BudgetItem(dt.date(2025, 1, 1), "Expenses:Food", "weekly", Decimal("70"), "CRC")
+    assert items["Expenses:Gym"].end == dt.date(2025, 1, 5)
+    assert items["Expenses:Rent"].currency == "USD"
+
+
+def test_load_ledger_budget_index_reads_no_budgets_file_when_included(tmp_path, monkeypatch):
+    journal, included = _ledger_with_budgets(tmp_path)
+
+    def no_file_read(path):
+        raise AssertionError("budgets were already loaded with the ledger")
+
+    monkeypatch.setattr(b, "load_budget_items", no_file_read)
+    index = b.load_ledger_budget_index(str(journal), str(included))
+    assert len(index.items()) == 3
+    assert b.load_ledger_budget_index(str(journal), str(included)) is index
+
+
+def test_load_ledger_budget_index_adds_standalone_budgets_file(tmp_path):
+    journal, _included = _ledger_with_budgets(tmp_path)
+    standalone = tmp_path / "budgets.bean"
+    standalone.write_text(
+        '2025-01-01 custom "budget" "Expenses:Fun" "weekly" 14 EUR\n'
+        '2025-01-01 custom "budget" "Expenses:Food" "weekly" 140 CRC\n',   # same day: the file wins
+        encoding="utf-8",
+    )
+    today, until = dt.date(2025, 1, 1), dt.date(2025, 1, 8)
+    rates = {"CRC": Decimal("1"), "USD": Decimal("0"), "EUR": Decimal("1")}
+
+    total, _ = b.compute_budget_planned_expenses(str(standalone), today, until, rates, "CRC", "average", str(journal))
+    assert total == Decimal("140") + Decimal("4") + Decimal("14")
+    # without a loadable journal only the standalone file counts
+    total, _ = b.compute_budget_planned_expenses(
+        str(standalone), today, until, rates, "CRC", "average", str(tmp_path / "absent.bean")
+    )
+    assert total == Decimal("140") + Decimal("14")
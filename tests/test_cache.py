@@ -0,0 +1,159 @@
+import os
+from decimal import Decimal
+
+import fava_forecast.cache as c
+import fava_forecast.forecast as fc
+
+
+# -----------------------------
+# journal_files / journal_fingerprint
+# -----------------------------
+def test_journal_files_follows_includes_and_globs(tmp_path):
+    (tmp_path / "sub").mkdir()
+    main = tmp_path / "main.bean"
+    main.write_text('include "accounts.bean"\ninclude "sub/*.bean"\n', encoding="utf-8")
+    (tmp_path / "accounts.bean").write_text("", encoding="utf-8")
+    (tmp_path / "sub" / "a.bean").write_text('include "../accounts.bean"\n', encoding="utf-8")
+    (tmp_path / "sub" / "b.bean").write_text("", encoding="utf-8")
+
+    files = c.journal_files(str(main))
+    assert files == [
+        str(main),
+        str(tmp_path / "accounts.bean"),
+        str(tmp_path / "sub" / "a.bean"),
+        str(tmp_path / "sub" / "b.bean"),
+    ]
+
+
+def test_fingerprint_changes_when_included_file_changes(tmp_path):
+    main = tmp_path / "main.bean"
+    inc = tmp_path / "inc.bean"
+    main.write_text('include "inc.bean"\n', encoding="utf-8")
+    inc.write_text("", encoding="utf-8")
+
+    fp1 = c.journal_fingerprint(str(main))
+    assert c.journal_fingerprint(str(main)) == fp1
+
+    inc.write_text("; changed\n", encoding="utf-8")
+    assert c.journal_fingerprint(str(main)) != fp1
+
+
+def test_content_hash_detects_same_size_same_mtime_edit(tmp_path):
+    main = tmp_path / "main.bean"
+    main.write_text("aaaa", encoding="utf-8")
+    st = os.stat(main)
+    fp1 = c.journal_fingerprint(str(main), content_hash=True)
+
+    main.write_text("bbbb", encoding="utf-8")
+    os.utime(main, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert c.journal_fingerprint(str(main)) == c.journal_fingerprint(str(main))
+    assert c.journal_fingerprint(str(main), content_hash=True) != fp1
+
+
+# -----------------------------
+# QueryCache
+# -----------------------------
+def test_query_cache_roundtrip_and_counters(tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text("", encoding="utf-8")
+    qc = c.QueryCache(directory=str(tmp_path / "cache"))
+
+    key = qc.key(str(j), "rows", "SELECT 1")
+    assert qc.get(key) is None
+    qc.put(key, {"value": c.encode_rows([("USD", Decimal("1.50"))])})
+    assert c.decode_rows(qc.get(key)["value"]) == [("USD", Decimal("1.50"))]
+    assert (qc.hits, qc.misses) == (1, 1)
+
+    # different query or changed journal -> different key
+    assert qc.key(str(j), "rows", "SELECT 2") != key
+    j.write_text("; edit\n", encoding="utf-8")
+    assert qc.key(str(j), "rows", "SELECT 1") != key
+
+
+def test_query_cache_evicts_least_recently_used(tmp_path):
+    qc = c.QueryCache(directory=str(tmp_path), max_bytes=250)
+    payload = "x" * 100
+    qc.put("a", payload)
+    qc.put("b", payload)
+    os.utime(tmp_path / "a.json", ns=(1, 1))
+    os.utime(tmp_path / "b.json", ns=(2, 2))
+    assert qc.get("a") == payload  # touch "a" -> "b" is now the oldest
+
+    qc.put("c", payload)
+    assert qc.get("b") is None
+    assert qc.get("a") == payload
+    assert qc.get("c") == payload
+
+
+def test_query_cache_lists_directory_only_when_over_limit(tmp_path, monkeypatch):
+    qc = c.QueryCache(directory=str(tmp_path), max_bytes=1000)
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+
+    for k in range(5):
+        qc.put(f"k{k}", "x" * 100)      # ~105 bytes each, well under the limit
+    assert len(scans) == 1              # first put learns the size, later puts track it
+    qc.put("k0", "x" * 100)             # overwriting does not grow the estimate
+    assert len(scans) == 1
+    for k in range(5, 12):
+        qc.put(f"k{k}", "x" * 100)
+    assert len(scans) >= 2               # crossed max_bytes: listed and evicted
+    assert sum(f.stat().st_size for f in tmp_path.glob("*.json")) <= 1000
+
+
+def test_include_memo_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(c, "_INCLUDES_MAX", 3)
+    monkeypatch.setattr(c, "_INCLUDES", c.OrderedDict())
+    paths = []
+    for k in range(5):
+        path = tmp_path / f"j{k}.bean"
+        path.write_text("", encoding="utf-8")
+        paths.append(str(path))
+        c.journal_files(str(path))
+    assert list(c._INCLUDES) == paths[2:]
+
+
+# -----------------------------
+# run_forecast integration
+# -----------------------------
+def test_run_forecast_warm_run_served_from_cache(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "xdg"))
+    journal = tmp_path / "main.bean"
+    budgets = tmp_path / "budgets.bean"
+    prices = tmp_path / "prices.bean"
+    for f in (journal, budgets, prices):
+        f.write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    calls = []
+
+    def fake_run_grouped_rows(_j, q, messages=None, engine="auto"):
+        calls.append(q)
+        if "^Assets" in q:
+            return [("CRC", Decimal("100"))]
+        return []
+
+    monkeypatch.setattr(fc, "run_grouped_rows", fake_run_grouped_rows)
+
+    def run():
+        return fc.run_forecast(
+            journal=str(journal),
+            budgets=str(budgets),
+            prices=str(prices),
+            until="2025-01-20",
+            today="2025-01-10",
+            currency="CRC",
+            engine="subprocess",
+            cache=c.QueryCache(),
+        )
+
+    cold = run()
+    assert len(calls) == 4
+    warm = run()
+    assert len(calls) == 4  # no queries on the warm run
+    assert warm["assets"] == cold["assets"] == (Decimal("100"), [("CRC", Decimal("100"), Decimal("1"), Decimal("100"))])
+
+    journal.write_text("; changed\n", encoding="utf-8")
+    run()
+    assert len(calls) == 8
@@ -1,7 +1,11 @@
 import sys
 from decimal import Decimal
+
+import pytest
+
 import fava_forecast.cli as cli
 import fava_forecast.forecast as forecast
+from fava_forecast.rates import RateTable
 
 def _run_main_with_args(args, monkeypatch, capsys):
     monkeypatch.setattr(sys, "argv", ["prog"] + args)
@@ -22,7 +26,7 @@ def test_cli_main_summary(monkeypatch, capsys, tmp_path):
     monkeypatch.setattr(forecast, "load_prices_to_op", lambda *_: {"CRC": Decimal("1"), "USD": Decimal("500")})
     monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
 
-    def fake_run_grouped_rows(_journal, query, messages=None):
+    def fake_run_grouped_rows(_journal, query, messages=None, engine="auto"):
         if "^Assets" in query:
             return [("CRC", Decimal("2000")), ("USD", Decimal("2"))]
         if "^Liabilities" in query:
@@ -45,6 +49,7 @@ def test_cli_main_summary(monkeypatch, capsys, tmp_path):
             "--prices", str(p),
             "--until", until,
             "--today", today,
+            "--engine", "subprocess",
         ],
         monkeypatch,
         capsys,
@@ -80,10 +85,14 @@ def test_cli_main_verbose(monkeypatch, capsys, tmp_path):
     today = "2025-01-10"
     until = "2025-01-20"
 
-    monkeypatch.setattr(forecast, "load_prices_to_op", lambda *_: {"CRC": Decimal("1"), "USD": Decimal("500")})
+    rates = RateTable(
+        {"CRC": Decimal("1"), "USD": Decimal("500"), "ETH": Decimal("1000000")},
+        paths={"CRC": ["CRC"], "USD": ["USD", "CRC"], "ETH": ["ETH", "USD", "CRC"]},
+    )
+    monkeypatch.setattr(forecast, "load_prices_to_op", lambda *_: rates)
     monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
 
-    def fake_run_grouped_rows(_journal, query, messages=None):
+    def fake_run_grouped_rows(_journal, query, messages=None, engine="auto"):
         if "^Assets" in query:
             return [("USD", Decimal("1"))]  # -> 500
         if "^Liabilities" in query:
@@ -107,6 +116,7 @@ def test_cli_main_verbose(monkeypatch, capsys, tmp_path):
             "--until", until,
             "--today", today,
             "--verbose",
+            "--engine", "subprocess",
         ],
         monkeypatch,
         capsys,
@@ -123,6 +133,107 @@ def test_cli_main_verbose(monkeypatch, capsys, tmp_path):
 
     assert "Net now (Assets - Liabilities):" in out and "450.00 CRC" in out
     assert "Forecast end balance:" in out and "650.00 CRC" in out
+    # only chained rates are listed
+    assert "Conversion paths:" in out and "ETH -> USD -> CRC" in out
+    assert "USD -> CRC\n" not in out.replace("ETH -> USD -> CRC", "")
+
+
+def test_cli_verbose_lists_budgets_by_account(monkeypatch, capsys, tmp_path):
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    for f in (j, p):
+        f.write_text("", encoding="utf-8")
+    b.write_text(
+        '2025-01-01 custom "budget" "Expenses:Food:Out" "weekly" 7 USD\n'
+        '2025-01-01 custom "budget" "Expenses:Gym" "weekly" 70 CRC\n',
+        encoding="utf-8",
+    )
+    monkeypatch.setattr(forecast, "load_prices_to_op", lambda *_: {"CRC": Decimal("1"), "USD": Decimal("500")})
+    monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+    monkeypatch.setattr(forecast, "run_grouped_rows", lambda *_a, **_k: [])
+
+    out = _run_main_with_args(
+        [
+            "--journal", str(j), "--budgets", str(b), "--prices", str(p),
+            "--until", "2025-01-20", "--today", "2025-01-10",
+            "--verbose", "--engine", "subprocess", "--no-cache",
+        ],
+        monkeypatch,
+        capsys,
+    )
+    assert "BUDGETED EXPENSES by account:" in out
+    lines = out.split("BUDGETED EXPENSES by account:")[1].splitlines()
+    assert lines[1].split() == ["Expenses", "5", "100.00", "CRC", "(10.00", "USD)"]
+    assert lines[2].split() == ["Food", "5", "000.00", "CRC", "(10.00", "USD)"]
+    assert lines[3].startswith("      Out ")
+    assert lines[4].split() == ["Gym", "100.00", "CRC"]
+
+
+def test_cli_budget_report(monkeypatch, capsys, tmp_path):
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    j.write_text(
+        "2025-01-01 open Assets:Bank\n2025-01-01 open Expenses:Food\n"
+        '2025-01-05 * "Groceries"\n  Expenses:Food  200 CRC\n  Assets:Bank\n',
+        encoding="utf-8",
+    )
+    b.write_text('2025-01-01 custom "budget" "Expenses:Food" "monthly" 310 CRC\n', encoding="utf-8")
+    p.write_text("", encoding="utf-8")
+    monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+
+    out = _run_main_with_args(
+        [
+            "--journal", str(j), "--budgets", str(b), "--prices", str(p),
+            "--until", "2025-01-20", "--today", "2025-01-10",
+            "--engine", "api", "--budget-mode", "calendar", "--budget-report", "--no-cache",
+        ],
+        monkeypatch,
+        capsys,
+    )
+    report = out.split("Budget vs actual (current period):")[1].splitlines()
+    assert report[1].split()[:2] == ["Account", "Period"]
+    # 200 spent against 100 accrued over Jan 1-10
+    assert report[2].split() == [
+        "Expenses:Food", "2025-01-01", "–", "2025-02-01", "200.00", "100.00", "310.00", "110.00", "CRC", "❌",
+    ]
+
+
+def test_cli_budget_report_messages_and_one_cache(monkeypatch, capsys, tmp_path):
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    j.write_text("2025-01-01 open Assets:Bank\n", encoding="utf-8")
+    b.write_text("", encoding="utf-8")
+    p.write_text("", encoding="utf-8")
+    monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+
+    caches, used = [], []
+    monkeypatch.setattr(cli, "QueryCache", lambda **kw: caches.append(object()) or caches[-1])
+    real_forecast = cli.run_forecast
+
+    def fake_forecast(**kwargs):
+        used.append(kwargs["cache"])
+        return real_forecast(**{**kwargs, "cache": None})
+
+    def fake_report(**kwargs):
+        used.append(kwargs["cache"])
+        return {"rows": [], "messages": [{"level": "info", "text": "no budgets"},
+                                         {"level": "warning", "code": "x", "text": "coded"}]}
+
+    monkeypatch.setattr(cli, "run_forecast", fake_forecast)
+    monkeypatch.setattr(cli, "run_budget_report", fake_report)
+
+    out = _run_main_with_args(
+        ["--journal", str(j), "--budgets", str(b), "--prices", str(p),
+         "--until", "2025-01-20", "--today", "2025-01-10", "--engine", "api", "--budget-report"],
+        monkeypatch,
+        capsys,
+    )
+    assert "[INFO] no budgets" in out and "[INFO] :" not in out
+    assert "[WARNING] x: coded" in out
+    assert len(caches) == 1 and used == [caches[0], caches[0]]
 
 
 def test_cli_main_with_future_warning(monkeypatch, capsys, tmp_path):
@@ -304,3 +415,136 @@ def test_cli_passes_accounts(monkeypatch, capsys, tmp_path):
     )
 
     assert captured["accounts"] == str(a)
+
+
+def test_cli_timeline_prints_lowest_point(monkeypatch, capsys, tmp_path):
+    import datetime as dt
+
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    for f in (j, b, p):
+        f.write_text("", encoding="utf-8")
+
+    def fake_run_forecast_timeline(**kwargs):
+        return {
+            "op_currency": "CRC",
+            "assets": (Decimal("100"), []),
+            "liabs": (Decimal("0"), []),
+            "planned_income": (Decimal("500"), []),
+            "planned_expenses": (Decimal("150"), []),
+            "planned_budget_exp": (Decimal("0"), []),
+            "net_now": Decimal("100"),
+            "forecast_end": Decimal("450"),
+            "ok": True,
+            "verbose": False,
+            "past_future": [],
+            "messages": [],
+            "timeline": {
+                "days": [
+                    (dt.date(2025, 1, 10), Decimal("100")),
+                    (dt.date(2025, 1, 11), Decimal("-50")),
+                    (dt.date(2025, 1, 12), Decimal("450")),
+                ],
+                "min_balance": Decimal("-50"),
+                "min_date": dt.date(2025, 1, 11),
+                "first_negative": dt.date(2025, 1, 11),
+            },
+        }
+
+    def no_plain_run(**kwargs):
+        raise AssertionError("--timeline must use run_forecast_timeline")
+
+    monkeypatch.setattr(cli, "run_forecast_timeline", fake_run_forecast_timeline)
+    monkeypatch.setattr(cli, "run_forecast", no_plain_run)
+    monkeypatch.setattr(cli, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+    monkeypatch.setattr(cli, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    out = _run_main_with_args(
+        [
+            "--journal", str(j),
+            "--budgets", str(b),
+            "--prices", str(p),
+            "--until", "2025-01-13",
+            "--today", "2025-01-10",
+            "--timeline",
+        ],
+        monkeypatch,
+        capsys,
+    )
+
+    assert "Projected balance by day:" in out
+    assert "2025-01-11" in out and "-50.00 CRC" in out
+    assert "Lowest balance:" in out and "on 2025-01-11" in out
+    assert "First deficit day:" in out
+
+
+def test_cli_timings_flag_prints_stages(monkeypatch, capsys, tmp_path):
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    for f in (j, b, p):
+        f.write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+    monkeypatch.setattr(forecast, "run_grouped_rows", lambda *_: [])
+    monkeypatch.setattr(cli, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+
+    out = _run_main_with_args(
+        [
+            "--journal", str(j),
+            "--budgets", str(b),
+            "--prices", str(p),
+            "--until", "2025-01-20",
+            "--today", "2025-01-10",
+            "--engine", "subprocess",
+            "--no-cache",
+            "--timings",
+        ],
+        monkeypatch,
+        capsys,
+    )
+
+    timings = out[out.index("Timings:"):]
+    for name in ("forecast", "prices", "queries", "budgets"):
+        assert name in timings
+    assert "Counters:" in timings and "bytes_parsed" in timings
+
+
+def test_cli_budget_mode_calendar(monkeypatch, capsys, tmp_path):
+    j = tmp_path / "main.bean"
+    b = tmp_path / "budgets.bean"
+    p = tmp_path / "prices.bean"
+    for f in (j, p):
+        f.write_text("", encoding="utf-8")
+    b.write_text('2025-01-01 custom "budget" "Expenses:Rent" "monthly" 2800 CRC\n', encoding="utf-8")
+
+    monkeypatch.setattr(forecast, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+    monkeypatch.setattr(forecast, "run_grouped_rows", lambda *_: [])
+    monkeypatch.setattr(cli, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+
+    args = [
+        "--journal", str(j),
+        "--budgets", str(b),
+        "--prices", str(p),
+        "--until", "2025-03-01",
+        "--today", "2025-02-01",
+        "--engine", "subprocess",
+        "--no-cache",
+    ]
+    calendar = _run_main_with_args(args + ["--budget-mode", "calendar"], monkeypatch, capsys)
+    average = _run_main_with_args(args, monkeypatch, capsys)
+
+    # February gets exactly one month's budget only with real period lengths
+    assert "Planned budget expenses:" in calendar and "2 800.00 CRC" in calendar
+    assert "2 800.00 CRC" not in average
+
+
+def test_cli_rejects_non_positive_workers(monkeypatch, capsys):
+    for bad in ("0", "-2", "two"):
+        monkeypatch.setattr(sys, "argv", ["prog", "--journal", "j", "--budgets", "b", "--prices", "p",
+                                          "--until", "2025-03-01", "--workers", bad])
+        with pytest.raises(SystemExit) as exc:
+            cli.main()
+        assert exc.value.code == 2
+        assert "--workers: expected a positive integer" in capsys.readouterr().err
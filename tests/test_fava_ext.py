@@ -185,6 +185,78 @@ def test_config_defaults_used_when_no_query(tmp_path, monkeypatch):
     assert data["paths"]["prices"] == "/custom/prices.bean"
 
 
+def test_budget_mode_from_config(tmp_path, monkeypatch):
+    base = tmp_path / "acc_mode"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+    modes = []
+
+    def fake_run_forecast(**kwargs):
+        modes.append(kwargs["budget_mode"])
+        return _mk_core_result()
+
+    monkeypatch.setattr(fx, "run_forecast", fake_run_forecast)
+
+    app = Flask(__name__)
+    for config, expected in ((None, "average"), ("budget_mode=calendar", "calendar"), ("budget_mode=calender", "average")):
+        ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")), config=config)
+        with app.test_request_context("/extension/budget-forecast/"):
+            data = ext.data()
+        assert modes[-1] == expected
+    # the typo falls back with a message instead of failing every page load
+    assert [m["code"] for m in data["messages"]] == ["config-invalid-budget-mode"]
+
+
+def test_invalid_workers_config_falls_back_with_message(tmp_path, monkeypatch):
+    base = tmp_path / "acc_workers"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+    workers = []
+
+    def fake_run_forecast(**kwargs):
+        workers.append(kwargs["workers"])
+        return _mk_core_result()
+
+    monkeypatch.setattr(fx, "run_forecast", fake_run_forecast)
+
+    app = Flask(__name__)
+    for config, expected in (("workers=4", 4), ("workers=four", 1), ("workers=0", 1)):
+        ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")), config=config)
+        with app.test_request_context("/extension/budget-forecast/"):
+            data = ext.data()
+        assert workers[-1] == expected
+        codes = [m["code"] for m in data["messages"]]
+        assert codes == ([] if expected == 4 else ["config-invalid-workers"])
+
+
+def test_budget_report_only_when_requested(tmp_path, monkeypatch):
+    base = tmp_path / "acc_report"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+    reports = []
+
+    def fake_run_budget_report(**kwargs):
+        reports.append(kwargs)
+        return {"op_currency": "CRC", "today": dt.date(2026, 4, 1), "rows": ["row"], "messages": []}
+
+    forecasts = []
+    monkeypatch.setattr(fx, "run_forecast", lambda **kwargs: forecasts.append(kwargs) or _mk_core_result())
+    monkeypatch.setattr(fx, "run_budget_report", fake_run_budget_report)
+
+    app = Flask(__name__)
+    ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")), config="budget_mode=lump")
+    with app.test_request_context("/extension/budget-forecast/?today=2026-04-01"):
+        data = ext.data()
+    assert data["budget_report"] is False and data["budget_status"] == [] and reports == []
+
+    with app.test_request_context("/extension/budget-forecast/?today=2026-04-01&budget_report=1"):
+        data = ext.data()
+    assert data["budget_report"] is True and data["budget_status"] == ["row"]
+    assert reports[0]["today"] == "2026-04-01" and reports[0]["budget_mode"] == "lump"
+    # toggling the report reuses the forecast instead of re-running its queries
+    assert len(forecasts) == 1
+
+
 def test_query_overrides_config(tmp_path, monkeypatch):
     # Journal
     base = tmp_path / "acc2"
@@ -364,3 +436,90 @@ def test_messages_passed_through(tmp_path, monkeypatch):
         data = ext.data()
 
     assert data["messages"][0]["code"] == "future-missing-accounts"
+
+
+def test_compare_shows_quick_horizons_from_one_sweep(tmp_path, monkeypatch):
+    base = tmp_path / "ledger_cmp"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+
+    calls = []
+
+    def fake_run_forecast_horizons(**kwargs):
+        calls.append(kwargs["untils"])
+        return [_mk_core_result(today=kwargs["today"], until=u) for u in kwargs["untils"]]
+
+    def no_single_run(**kwargs):
+        raise AssertionError("compare mode must use run_forecast_horizons")
+
+    monkeypatch.setattr(fx, "run_forecast_horizons", fake_run_forecast_horizons)
+    monkeypatch.setattr(fx, "run_forecast", no_single_run)
+
+    app = Flask(__name__)
+    ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")))
+
+    with app.test_request_context("/extension/budget-forecast/?today=2026-01-01&until=2026-01-20&compare=1"):
+        data = ext.data()
+
+    assert len(calls) == 1
+    assert calls[0][0] == "2026-01-20"
+    assert str(data["until"]) == "2026-01-20"
+    assert [h["label"] for h in data["horizons"]] == ["1w", "2w", "1m", "3m", "6m", "1y"]
+    assert str(data["horizons"][0]["until"]) == "2026-01-08"
+    assert data["horizons"][-1]["forecast_end"] == Decimal("115")
+
+
+def test_timings_param_adds_stage_timings(tmp_path, monkeypatch):
+    base = tmp_path / "ledger_t"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(fx, "run_forecast", lambda **kwargs: _mk_core_result())
+
+    app = Flask(__name__)
+    ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")))
+
+    with app.test_request_context("/extension/budget-forecast/"):
+        assert "timings" not in ext.data()
+    with app.test_request_context("/extension/budget-forecast/?timings=1"):
+        data = ext.data()
+
+    assert data["timings"]["stages"]["fava-data"]["calls"] == 1
+
+
+def test_currency_switch_reconverts_without_rerunning(tmp_path, monkeypatch):
+    base = tmp_path / "fx"
+    base.mkdir()
+    (base / "main.bean").write_text("", encoding="utf-8")
+    (base / "prices.bean").write_text("2025-01-01 price USD 500 CRC\n", encoding="utf-8")
+
+    calls = {"n": 0}
+
+    def fake_run_forecast(**kwargs):
+        calls["n"] += 1
+        core = _mk_core_result(cur="USD", today=kwargs["today"], until=kwargs["until"])
+        core["assets"] = (Decimal("4"), [("CRC", Decimal("1000"), Decimal("0.002"), Decimal("2")),
+                                         ("USD", Decimal("2"), Decimal("1"), Decimal("2"))])
+        return core
+
+    monkeypatch.setattr(fx, "run_forecast", fake_run_forecast)
+    app = Flask(__name__)
+    ext = fx.BudgetForecast(_LedgerStub(str(base / "main.bean")))
+
+    url = "/extension/budget-forecast/?today=2025-01-10&until=2025-01-20&currency="
+    with app.test_request_context(url + "USD"):
+        usd = ext.data()
+    with app.test_request_context(url + "CRC"):
+        crc = ext.data()
+
+    assert calls["n"] == 1
+    assert usd["summary"]["assets"] == Decimal("4")
+    assert crc["operating_currency"] == "CRC"
+    assert crc["summary"]["assets"] == Decimal("2000")  # 1000 CRC + 2 USD * 500
+    assert crc["breakdowns"]["assets"][1] == ("USD", Decimal("2"), Decimal("500"), Decimal("1000"))
+    assert crc["summary"]["net_now"] == Decimal("2000") + Decimal("-20")
+
+    # back to USD: converted from the original rows again, still no new run
+    with app.test_request_context(url + "USD"):
+        assert ext.data()["summary"]["assets"] == Decimal("4")
+    assert calls["n"] == 1
@@ -1,5 +1,6 @@
 from decimal import Decimal
 import datetime as dt
+import pytest
 import fava_forecast.forecast as fc
 
 
@@ -13,7 +14,7 @@ def test_run_forecast_minimal(monkeypatch, tmp_path):
     monkeypatch.setattr(fc, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
     monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
 
-    def fake_run_grouped_rows(_j, q, messages=None):
+    def fake_run_grouped_rows(_j, q, messages=None, engine="auto"):
         if "^Assets" in q:
             return [("CRC", Decimal("100"))]
         if "^Liabilities" in q:
@@ -36,6 +37,7 @@ def test_run_forecast_minimal(monkeypatch, tmp_path):
         until="2025-01-20",
         today="2025-01-10",
         currency="CRC",
+        engine="subprocess",
     )
 
     assert data["op_currency"] == "CRC"
@@ -61,7 +63,7 @@ def test_run_forecast_multicurrency(monkeypatch, tmp_path):
     # Conversion rates: 1 USD = 500 CRC, 1 EUR = 600 CRC
     monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1"), "USD": Decimal("500"), "EUR": Decimal("600")})
 
-    def fake_run_grouped_rows(_j, q, messages=None):
+    def fake_run_grouped_rows(_j, q, messages=None, engine="auto"):
         if "^Assets" in q:
             return [("CRC", Decimal("100")), ("USD", Decimal("1"))]     # 100 + 1×500 = 600
         if "^Liabilities" in q:
@@ -84,6 +86,7 @@ def test_run_forecast_multicurrency(monkeypatch, tmp_path):
         until="2025-01-20",
         today="2025-01-10",
         currency="CRC",
+        engine="subprocess",
     )
 
     # Calculation reference:
@@ -112,7 +115,7 @@ def test_run_forecast_with_future_file(monkeypatch, tmp_path):
     monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
 
     # main ledger provides base assets/liabilities
-    def fake_run_grouped_rows(journal_path, q, messages=None):
+    def fake_run_grouped_rows(journal_path, q, messages=None, engine="auto"):
         if journal_path == str(main_journal):
             if "^Assets" in q:
                 return [("CRC", Decimal("100"))]
@@ -133,7 +136,7 @@ def test_run_forecast_with_future_file(monkeypatch, tmp_path):
         "compute_budget_planned_expenses",
         lambda *_: (Decimal("5"), [("CRC", Decimal("5"), Decimal("1"), Decimal("5"))]),
     )
-    monkeypatch.setattr(fc, "_build_enriched_future", lambda _f, _a: str(future_journal))
+    monkeypatch.setattr(fc, "_build_enriched_future", lambda _f, _a, _d: str(future_journal))
 
 
     data = fc.run_forecast(
@@ -145,6 +148,7 @@ def test_run_forecast_with_future_file(monkeypatch, tmp_path):
         currency="CRC",
         future_journal=str(future_journal),
         accounts=str(accounts),
+        engine="subprocess",
     )
 
     # Reference calculation:
@@ -179,14 +183,14 @@ def test_run_forecast_future_past_entries(monkeypatch, tmp_path):
     # fake past rows from future.bean
     monkeypatch.setattr(
         fc,
-        "beanquery_run_lines",
+        "beanquery_lines",
         lambda *_: (
             ["2025-01-05 * \"Planned rent\" \"\""],
             [],
         ),
     )
 
-    monkeypatch.setattr(fc, "_build_enriched_future", lambda _f, _a: str(future_journal))
+    monkeypatch.setattr(fc, "_build_enriched_future", lambda _f, _a, _d: str(future_journal))
 
     data = fc.run_forecast(
         journal=str(main_journal),
@@ -197,8 +201,622 @@ def test_run_forecast_future_past_entries(monkeypatch, tmp_path):
         currency="CRC",
         future_journal=str(future_journal),
         accounts=str(accounts),
+        engine="subprocess",
     )
 
     # Сheck that past entries are detected
     assert data["past_future"]
     assert any(m["code"] == "future-past-entries" for m in data["messages"])
+
+
+def test_run_forecast_api_engine_single_pass(monkeypatch, tmp_path):
+    journal = tmp_path / "main.bean"
+    budgets = tmp_path / "budgets.bean"
+    prices = tmp_path / "prices.bean"
+    journal.write_text(
+        "\n".join(
+            [
+                '2025-01-01 open Assets:Bank',
+                '2025-01-01 open Income:Salary',
+                '2025-01-01 open Expenses:Food',
+                '2025-01-01 open Equity:Opening',
+                '2025-01-01 * "Opening"',
+                '  Assets:Bank  100 CRC',
+                '  Equity:Opening',
+                '2025-01-12 * "Food"',
+                '  Expenses:Food  10 CRC',
+                '  Assets:Bank',
+                '2025-01-15 * "Salary" #planned',
+                '  Assets:Bank  50 CRC',
+                '  Income:Salary',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    for f in (budgets, prices):
+        f.write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    def no_queries(*_a, **_k):
+        raise AssertionError("api engine must not run per-bucket queries")
+
+    monkeypatch.setattr(fc, "run_grouped_rows", no_queries)
+
+    data = fc.run_forecast(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+        engine="api",
+    )
+
+    # assets = 100 - 10 = 90 (planned salary excluded), income = 50, expenses = 10
+    assert data["assets"][0] == Decimal("90")
+    assert data["planned_income"][0] == Decimal("50")
+    assert data["planned_expenses"][0] == Decimal("10")
+    assert data["forecast_end"] == Decimal("130.00")
+
+
+def test_run_forecast_workers_run_queries_concurrently(monkeypatch, tmp_path):
+    import threading
+
+    journal = tmp_path / "main.bean"
+    budgets = tmp_path / "budgets.bean"
+    prices = tmp_path / "prices.bean"
+    for f in (journal, budgets, prices):
+        f.write_text("", encoding="utf-8")
+
+    monkeypatch.setattr(fc, "detect_operating_currency_from_journal", lambda *_, **__: "CRC")
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    monkeypatch.setattr(fc, "compute_budget_planned_expenses", lambda *_: (Decimal("0"), []))
+
+    # all four queries must be in flight at the same time to pass the barrier
+    barrier = threading.Barrier(4, timeout=5)
+    answers = {
+        "^Assets": [("CRC", Decimal("100"))],
+        "^Liabilities": [("CRC", Decimal("-20"))],
+        "^Income": [("CRC", Decimal("-50"))],
+        "^Expenses": [("CRC", Decimal("10"))],
+    }
+
+    def fake_run_grouped_rows(_j, q, messages=None, engine="auto"):
+        barrier.wait()
+        key = next(k for k in answers if k in q)
+        messages.append({"level": "warning", "code": "beanquery-warning", "text": key})
+        return answers[key]
+
+    monkeypatch.setattr(fc, "run_grouped_rows", fake_run_grouped_rows)
+
+    data = fc.run_forecast(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+        engine="subprocess",
+        workers=4,
+    )
+
+    assert data["forecast_end"] == Decimal("120.00")
+    # messages are merged in query order regardless of completion order
+    assert [m["text"] for m in data["messages"]] == ["^Assets", "^Liabilities", "^Income", "^Expenses"]
+
+
+def _write_small_ledger(tmp_path):
+    journal = tmp_path / "main.bean"
+    budgets = tmp_path / "budgets.bean"
+    prices = tmp_path / "prices.bean"
+    journal.write_text(
+        "\n".join(
+            [
+                '2025-01-01 open Assets:Bank',
+                '2025-01-01 open Income:Salary',
+                '2025-01-01 open Expenses:Food',
+                '2025-01-01 open Equity:Opening',
+                '2025-01-01 * "Opening"',
+                '  Assets:Bank  100 CRC',
+                '  Equity:Opening',
+                '2025-01-12 * "Food"',
+                '  Expenses:Food  10 CRC',
+                '  Assets:Bank',
+                '2025-01-15 * "Salary" #planned',
+                '  Assets:Bank  50 CRC',
+                '  Income:Salary',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    for f in (budgets, prices):
+        f.write_text("", encoding="utf-8")
+    return journal, budgets, prices
+
+
+def test_enriched_future_is_written_to_the_cache_dir_only_with_a_cache(tmp_path):
+    import os
+    from pathlib import Path
+
+    from fava_forecast.cache import QueryCache
+
+    future, accounts = tmp_path / "future.bean", tmp_path / "accounts.bean"
+    future.write_text('2025-02-01 * "Salary" #planned\n  Assets:Bank  100 CRC\n  Income:Salary\n', encoding="utf-8")
+    accounts.write_text("2025-01-01 open Assets:Bank\n2025-01-01 open Income:Salary\n", encoding="utf-8")
+    xdg = os.environ["XDG_CACHE_HOME"]
+
+    one_off = fc._build_enriched_future(str(future), str(accounts))
+    assert not one_off.startswith(xdg) and "open Assets:Bank" in Path(one_off).read_text(encoding="utf-8")
+    os.remove(one_off)
+    assert not any(files for _dir, _sub, files in os.walk(xdg))
+
+    cache = QueryCache(str(tmp_path / "qc"))
+    stable = fc._build_enriched_future(str(future), str(accounts), cache.directory)
+    assert stable.startswith(str(cache.directory))
+    assert fc._build_enriched_future(str(future), str(accounts), cache.directory) == stable
+
+
+def test_run_forecast_async_matches_sync(monkeypatch, tmp_path):
+    import asyncio
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+    )
+
+    for engine in ("subprocess", "api"):
+        sync = fc.run_forecast(engine=engine, **kwargs)
+        result = asyncio.run(fc.run_forecast_async(engine=engine, **kwargs))
+        assert result == sync
+        assert result["forecast_end"] == Decimal("130.00")
+
+
+def test_run_forecast_async_plans_and_budgets_off_the_event_loop(monkeypatch, tmp_path):
+    import asyncio
+    import threading
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    threads = {}
+    real_plan, real_budget = fc._plan_forecast, fc.compute_budget_planned_expenses
+
+    def plan(*args):
+        threads["plan"] = threading.current_thread()
+        return real_plan(*args)
+
+    def budget(*args):
+        threads["budget"] = threading.current_thread()
+        return real_budget(*args)
+
+    monkeypatch.setattr(fc, "_plan_forecast", plan)
+    monkeypatch.setattr(fc, "compute_budget_planned_expenses", budget)
+    asyncio.run(fc.run_forecast_async(journal=str(journal), budgets=str(budgets), prices=str(prices),
+                                      until="2025-01-20", today="2025-01-10", engine="subprocess"))
+    assert set(threads) == {"plan", "budget"}
+    assert all(t is not threading.main_thread() for t in threads.values())
+
+
+def test_run_forecast_async_timeout_is_reported(monkeypatch, tmp_path):
+    import asyncio
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    async def slow_csv(_j, q, timeout=None):
+        if "^Assets" in q:
+            raise RuntimeError(f"bean-query timed out after {timeout}s")
+        return ["currency"], []
+
+    monkeypatch.setattr(fc, "beanquery_run_csv_async", slow_csv)
+
+    data = asyncio.run(
+        fc.run_forecast_async(
+            journal=str(journal),
+            budgets=str(budgets),
+            prices=str(prices),
+            until="2025-01-20",
+            today="2025-01-10",
+            engine="subprocess",
+            timeout=0.5,
+        )
+    )
+
+    errors = [m for m in data["messages"] if m["code"] == "beanquery-error"]
+    assert len(errors) == 1 and "timed out" in errors[0]["text"]
+    assert data["assets"][0] == Decimal("0")
+
+
+def test_run_forecast_async_cancel_kills_bean_query(monkeypatch, tmp_path):
+    import asyncio
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    started = []
+    real_exec = asyncio.create_subprocess_exec
+
+    async def fake_exec(_prog, *_args, **kwargs):
+        proc = await real_exec("sleep", "30", **kwargs)
+        started.append(proc)
+        return proc
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", fake_exec)
+
+    async def scenario():
+        task = asyncio.create_task(
+            fc.run_forecast_async(
+                journal=str(journal),
+                budgets=str(budgets),
+                prices=str(prices),
+                until="2025-01-20",
+                today="2025-01-10",
+                engine="subprocess",
+            )
+        )
+        while len(started) < 4:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        codes = [proc.returncode for proc in started]
+        started.clear()  # release the transports while the loop is still running
+        return codes
+
+    codes = asyncio.run(scenario())
+
+    assert len(codes) == 4
+    assert all(code is not None for code in codes)
+
+
+def test_run_forecast_horizons_match_single_runs(monkeypatch, tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    budgets.write_text('2025-01-01 custom "budget" "Expenses:Food" "monthly" 3000 CRC\n', encoding="utf-8")
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        today="2025-01-10",
+        currency="CRC",
+    )
+    untils = ["2025-02-10", "2025-01-13", "2025-01-20", "2025-01-13"]
+
+    for engine in ("subprocess", "api"):
+        sweep = fc.run_forecast_horizons(untils=untils, engine=engine, **kwargs)
+        assert [str(r["until"]) for r in sweep] == untils
+        for until, result in zip(untils, sweep):
+            single = fc.run_forecast(until=until, engine=engine, **kwargs)
+            assert result == single, (engine, until)
+
+
+def test_run_forecast_calendar_budget_mode(monkeypatch, tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    budgets.write_text('2025-01-01 custom "budget" "Expenses:Food" "monthly" 2800 CRC\n', encoding="utf-8")
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        today="2025-02-01",
+        currency="CRC",
+        engine="api",
+        budget_mode="calendar",
+    )
+
+    single = fc.run_forecast(until="2025-03-01", **kwargs)
+    assert single["planned_budget_exp"][0] == Decimal("2800")
+    sweep = fc.run_forecast_horizons(untils=["2025-03-01", "2025-02-15"], **kwargs)
+    assert sweep[0] == single
+    assert sweep[1]["planned_budget_exp"][0] == Decimal("1400")
+    average = fc.run_forecast(until="2025-03-01", **dict(kwargs, budget_mode="average"))
+    assert average["planned_budget_exp"][0] < Decimal("2800")
+
+
+def test_run_forecast_api_engine_reads_budgets_from_ledger(monkeypatch, tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('\n2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n')
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+    )
+
+    # the budget lives in the journal, budgets.bean is empty: both engines see it
+    assert fc.run_forecast(engine="api", **kwargs)["planned_budget_exp"][0] == Decimal("100")
+    assert fc.run_forecast(engine="subprocess", **kwargs)["planned_budget_exp"][0] == Decimal("100")
+
+
+def test_warm_run_does_not_load_the_ledger_for_budgets(monkeypatch, tmp_path):
+    import fava_forecast.budgets as b
+    from fava_forecast.cache import QueryCache
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('\n2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n')
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(journal=str(journal), budgets=str(budgets), prices=str(prices), until="2025-01-20",
+                  today="2025-01-10", currency="CRC", engine="api", cache=QueryCache(str(tmp_path / "qc")))
+
+    assert fc.run_forecast(**kwargs)["planned_budget_exp"][0] == Decimal("100")
+    # a new process: nothing resident, the budget entries come from the query cache
+    b.clear_budget_cache()
+    monkeypatch.setattr(b, "load_ledger", lambda *_: pytest.fail("ledger loaded on a warm run"))
+    assert fc.run_forecast(**kwargs)["planned_budget_exp"][0] == Decimal("100")
+
+
+def test_subprocess_engine_never_parses_the_ledger_in_process(monkeypatch, tmp_path):
+    import asyncio
+
+    import fava_forecast.beancount_io as io
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    included = tmp_path / "envelopes.bean"
+    included.write_text('2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n', encoding="utf-8")
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('\ninclude "envelopes.bean"\n')
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    monkeypatch.setattr(io.bc_loader, "load_file", lambda *_: pytest.fail("ledger parsed in process"))
+    kwargs = dict(journal=str(journal), budgets=str(budgets), prices=str(prices), until="2025-01-20",
+                  today="2025-01-10", currency="CRC", engine="subprocess")
+
+    # the included budget line is still read, with the line parser
+    assert fc.run_forecast(**kwargs)["planned_budget_exp"][0] == Decimal("100")
+    assert asyncio.run(fc.run_forecast_async(**kwargs))["planned_budget_exp"][0] == Decimal("100")
+    report = fc.run_budget_report(**{k: v for k, v in kwargs.items() if k != "until"})
+    assert [row.account for row in report["rows"]] == ["Expenses:Food"]
+
+
+def test_budget_index_falls_back_when_the_ledger_cannot_be_loaded(monkeypatch, tmp_path):
+    import fava_forecast.budgets as b
+
+    journal, budgets, _prices = _write_small_ledger(tmp_path)
+    budgets.write_text('2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n', encoding="utf-8")
+
+    def broken(*_):
+        raise ValueError("unparsable ledger")
+
+    monkeypatch.setattr(b, "load_ledger", broken)
+    assert [it.account for it in b.budget_index(str(budgets), str(journal)).items()] == ["Expenses:Food"]
+
+
+def test_run_forecast_horizons_runs_one_query_per_bucket(monkeypatch, tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    seen = []
+    real = fc.run_dated_rows
+
+    def counting(j, q, messages=None, engine="auto"):
+        seen.append(q)
+        return real(j, q, messages, engine)
+
+    monkeypatch.setattr(fc, "run_dated_rows", counting)
+
+    sweep = fc.run_forecast_horizons(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        untils=["2025-01-17", "2025-01-11", "2025-03-10", "2025-01-20"],
+        today="2025-01-10",
+        engine="subprocess",
+    )
+
+    assert len(seen) == 4
+    assert all("GROUP BY date, currency" in q and "2025-03-10" in q for q in seen)
+    assert [r["planned_income"][0] for r in sweep] == [Decimal("50"), Decimal("0"), Decimal("50"), Decimal("50")]
+
+
+def test_forecast_timeline_summary():
+    d = dt.date
+    series = [
+        (d(2025, 1, 10), Decimal("50")),
+        (d(2025, 1, 11), Decimal("-5")),
+        (d(2025, 1, 12), Decimal("-20")),
+        (d(2025, 1, 13), Decimal("-20")),
+        (d(2025, 1, 14), Decimal("300")),
+    ]
+    t = fc.forecast_timeline(series)
+    assert t["min_balance"] == Decimal("-20")
+    assert t["min_date"] == d(2025, 1, 12)
+    assert t["first_negative"] == d(2025, 1, 11)
+
+    assert fc.forecast_timeline([(d(2025, 1, 10), Decimal("1"))])["first_negative"] is None
+    assert fc.forecast_timeline([])["min_date"] is None
+
+
+def test_run_forecast_timeline_detects_mid_period_deficit(monkeypatch, tmp_path):
+    journal = tmp_path / "main.bean"
+    budgets = tmp_path / "budgets.bean"
+    prices = tmp_path / "prices.bean"
+    journal.write_text(
+        "\n".join(
+            [
+                '2025-01-01 open Assets:Bank',
+                '2025-01-01 open Income:Salary',
+                '2025-01-01 open Expenses:Rent',
+                '2025-01-01 open Equity:Opening',
+                '2025-01-01 * "Opening"',
+                '  Assets:Bank  100 CRC',
+                '  Equity:Opening',
+                '2025-01-12 * "Rent" #planned',
+                '  Expenses:Rent  150 CRC',
+                '  Assets:Bank',
+                '2025-01-15 * "Salary" #planned',
+                '  Assets:Bank  500 CRC',
+                '  Income:Salary',
+            ]
+        ),
+        encoding="utf-8",
+    )
+    budgets.write_text('2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n', encoding="utf-8")
+    prices.write_text("", encoding="utf-8")
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+    )
+
+    for engine in ("subprocess", "api"):
+        data = fc.run_forecast_timeline(engine=engine, **kwargs)
+        t = data["timeline"]
+
+        days = [day for day, _bal in t["days"]]
+        assert days[0] == dt.date(2025, 1, 10) and days[-1] == dt.date(2025, 1, 19)
+        # 100 - 10/day budget; rent on the 12th: 100 - 30 - 150 = -80
+        assert dict(t["days"])[dt.date(2025, 1, 12)] == Decimal("-80.00")
+        assert t["first_negative"] == dt.date(2025, 1, 12)
+        assert t["min_date"] == dt.date(2025, 1, 14)
+        assert t["min_balance"] == Decimal("-100.00")
+        # salary on the 15th recovers the runway; the last day equals the end balance
+        assert t["days"][-1][1] == data["forecast_end"] == Decimal("350.00")
+
+        single = fc.run_forecast(engine=engine, **kwargs)
+        assert {k: v for k, v in data.items() if k != "timeline"} == single
+
+
+def test_run_forecast_timeline_lump_budgets_step_on_due_dates(monkeypatch, tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    budgets.write_text('2024-12-12 custom "budget" "Expenses:Rent" "monthly" 60 CRC\n', encoding="utf-8")
+    monkeypatch.setattr(fc, "load_prices_to_op", lambda *_: {"CRC": Decimal("1")})
+
+    data = fc.run_forecast_timeline(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-14",
+        today="2025-01-10",
+        engine="api",
+        budget_mode="lump",
+    )
+
+    # the whole rent is due on the 12th, together with the food posting
+    assert [bal for _day, bal in data["timeline"]["days"]] == [
+        Decimal("100.00"), Decimal("100.00"), Decimal("20.00"), Decimal("20.00"),
+    ]
+    assert data["planned_budget_exp"][0] == Decimal("60")
+
+
+def test_run_forecast_timings_and_counters(monkeypatch, tmp_path):
+    from fava_forecast.cache import QueryCache
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    cache = QueryCache(str(tmp_path / "qc"))
+    kwargs = dict(
+        journal=str(journal),
+        budgets=str(budgets),
+        prices=str(prices),
+        until="2025-01-20",
+        today="2025-01-10",
+        currency="CRC",
+        engine="subprocess",
+        cache=cache,
+    )
+
+    assert "timings" not in fc.run_forecast(**{**kwargs, "cache": None})
+
+    events = []
+    first = fc.run_forecast(timings=True, hook=lambda *e: events.append(e), **kwargs)
+    t = first["timings"]
+    for name in ("forecast", "setup", "queries", "bean-query", "budgets", "totals"):
+        assert name in t["stages"], name
+    # rates come from the process-wide cache filled by the first run: no "prices" stage
+    assert "prices" not in t["stages"] and t["counters"]["rate_cache_hits"] == 1
+    assert t["stages"]["bean-query"]["calls"] == 4
+    assert t["counters"]["subprocesses"] == 4
+    assert t["counters"]["cache_misses"] == 4
+    assert t["counters"]["bytes_parsed"] > 0 and t["counters"]["rows_parsed"] > 0
+    assert ("stage", "forecast", t["stages"]["forecast"]["seconds"]) in events
+
+    second = fc.run_forecast(timings=True, **kwargs)["timings"]
+    assert second["counters"]["cache_hits"] == 4
+    assert "subprocesses" not in second["counters"]
+
+
+def test_forecasts_record_stages_into_the_active_recorder(tmp_path):
+    from fava_forecast.instrument import Recorder, recording
+
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    kwargs = dict(journal=str(journal), budgets=str(budgets), prices=str(prices),
+                  until="2025-01-20", today="2025-01-10", engine="subprocess", cache=None)
+
+    rec = Recorder()
+    with recording(rec):
+        result = fc.run_forecast(timings=True, **kwargs)
+    stages = rec.as_dict()["stages"]
+    for name in ("forecast", "setup", "queries", "totals"):
+        assert name in stages, name
+    assert result["timings"]["stages"].keys() == stages.keys()
+
+    rec = Recorder()
+    with recording(rec):
+        fc.run_forecast_timeline(**kwargs)
+    stages = rec.as_dict()["stages"]
+    for name in ("forecast", "setup", "queries", "budgets", "totals"):
+        assert name in stages, name
+
+
+def test_convert_forecast_matches_run_in_other_currency(tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    prices.write_text("2025-01-01 price USD 500 CRC\n2025-01-01 price EUR 1.25 USD\n", encoding="utf-8")
+    budgets.write_text('2025-01-01 custom "budget" "Expenses:Food" "monthly" 2 USD\n', encoding="utf-8")
+    kwargs = dict(journal=str(journal), budgets=str(budgets), prices=str(prices),
+                  until="2025-01-20", today="2025-01-10", engine="api", cache=None, verbose=True)
+
+    in_crc = fc.run_forecast(currency="CRC", **kwargs)
+    in_eur = fc.run_forecast(currency="EUR", **kwargs)
+    rates = fc.load_prices_to_op(str(prices), "EUR", dt.date(2025, 1, 10))
+    converted = fc.convert_forecast(in_crc, rates, "EUR")
+
+    assert converted["op_currency"] == "EUR"
+    for key in ("assets", "liabs", "planned_income", "planned_expenses", "planned_budget_exp",
+                "budget_accounts", "net_now", "forecast_end", "ok"):
+        assert converted[key] == in_eur[key], key
+    assert converted["rate_paths"]["CRC"] == ["CRC", "USD", "EUR"]
+    assert [a for a, _cur, _total in converted["budget_accounts"]] == ["Expenses", "Expenses:Food"]
+    assert in_crc["op_currency"] == "CRC"  # original left untouched
+
+
+def test_run_budget_report_same_for_both_engines(tmp_path):
+    journal, budgets, prices = _write_small_ledger(tmp_path)
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write(
+            '\n2025-01-01 open Expenses:Food:Out\n'
+            '2025-01-10 * "Lunch"\n  Expenses:Food:Out  5 USD\n  Assets:Bank\n'
+        )
+    budgets.write_text(
+        '2025-01-01 custom "budget" "Expenses:Food" "weekly" 70 CRC\n'
+        '2024-12-01 custom "budget" "Expenses:Food" "monthly" 3100 CRC\n'
+        '2025-01-01 custom "budget" "Expenses:Gym" "monthly" 40 USD\n',
+        encoding="utf-8",
+    )
+    prices.write_text("2025-01-01 price USD 500 CRC\n", encoding="utf-8")
+    kwargs = dict(journal=str(journal), budgets=str(budgets), prices=str(prices), today="2025-01-12", cache=None)
+
+    api = fc.run_budget_report(engine="api", **kwargs)
+    sub = fc.run_budget_report(engine="subprocess", **kwargs)
+    assert api["rows"] == sub["rows"] and not api["messages"] and not sub["messages"]
+
+    food, gym = api["rows"]
+    # weekly budget from Jan 1 supersedes the monthly one: Jan 8-14 period, Jan 12 counted
+    assert (food.account, food.period_start, food.period_end) == ("Expenses:Food", dt.date(2025, 1, 8), dt.date(2025, 1, 15))
+    # Jan 12 food plus the USD lunch on Food:Out, converted to CRC
+    assert food.spent == Decimal("10") + 5 * 500 and food.accrued == Decimal("50")
+    assert (gym.spent, gym.currency, gym.amount) == (Decimal("0"), "USD", Decimal("40"))
@@ -0,0 +1,54 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import fava_forecast.instrument as ins
+
+
+def test_instrumentation_is_a_noop_when_off():
+    assert ins.active() is None
+    assert ins.stage("x") is ins._NOOP
+    with ins.stage("x"):
+        ins.count("rows_parsed", 10)
+    with ins.recording(None) as rec:
+        assert rec is None and ins.active() is None
+
+
+def test_recorder_sums_stages_and_counters_and_calls_hook():
+    events = []
+    rec = ins.Recorder(hook=lambda kind, name, value: events.append((kind, name)))
+
+    with ins.recording(rec):
+        for _ in range(2):
+            with ins.stage("query"):
+                ins.count("subprocesses")
+        ins.count("rows_parsed", 5)
+    assert ins.active() is None
+
+    snap = rec.as_dict()
+    assert snap["stages"]["query"]["calls"] == 2
+    assert snap["stages"]["query"]["seconds"] >= 0
+    assert snap["counters"] == {"subprocesses": 2, "rows_parsed": 5}
+    assert events == [
+        ("count", "subprocesses"),
+        ("stage", "query"),
+        ("count", "subprocesses"),
+        ("stage", "query"),
+        ("count", "rows_parsed"),
+    ]
+
+
+def test_in_context_carries_recorder_to_pool_threads():
+    rec = ins.Recorder()
+    barrier = threading.Barrier(4, timeout=5)
+
+    def work(n):
+        barrier.wait()  # all four run at once, each in its own context copy
+        with ins.stage("work"):
+            ins.count("rows_parsed", n)
+
+    with ins.recording(rec), ThreadPoolExecutor(max_workers=4) as pool:
+        for f in [pool.submit(ins.in_context(work), n) for n in range(1, 5)]:
+            f.result()
+
+    assert rec.as_dict()["counters"] == {"rows_parsed": 10}
+    assert rec.as_dict()["stages"]["work"]["calls"] == 4
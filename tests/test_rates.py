@@ -125,7 +125,7 @@ def test_load_prices_indirect_via_usd(tmp_path):
         # BTC -> USD
         "2025-01-05 price BTC 2.00 USD",
         "2025-01-20 price BTC 3.00 USD",  # beyond today -> ignored
-        # ETH -> BTC (must NOT be picked: USD is the only allowed bridge)
+        # ETH -> BTC -> USD -> CRC: three hops
         "2025-01-07 price ETH 1000.00 BTC",
     ]
     path = _write_prices(tmp_path, lines)
@@ -134,9 +134,13 @@ def test_load_prices_indirect_via_usd(tmp_path):
 
     # BTC -> USD (2.00) * USD -> CRC (520) = 1040
     assert rates["BTC"] == Decimal("520") * Decimal("2")
+    assert rates.paths["BTC"] == ["BTC", "USD", "CRC"]
 
-    # ETH should not appear: we do not support ETH -> BTC -> USD -> CRC
-    assert "ETH" not in rates
+    assert rates["ETH"] == Decimal("1000") * Decimal("1040")
+    assert rates.paths["ETH"] == ["ETH", "BTC", "USD", "CRC"]
+
+    # limited to one cross (two hops), ETH has no rate
+    assert "ETH" not in r.load_prices_to_op(path, "CRC", today, max_hops=2)
 
 
 def test_load_prices_indirect_skipped_if_no_usd_to_op(tmp_path):
@@ -169,7 +173,7 @@ def test_load_prices_reverse_common_quote_skip_double_cross(tmp_path):
         # Common quote in CRC
         "2025-01-01 price USD 500.00 CRC",        # 1 USD = 500 CRC
         "2025-01-01 price BTC 100000.00 CRC",     # 1 BTC = 100000 CRC → 100000 / 500 = 200 USD
-        # This would require a double cross (ETH -> BTC -> CRC -> USD) and must be ignored
+        # Double cross ETH -> BTC -> CRC -> USD: only within three hops
         "2025-01-02 price ETH 1000.00 BTC",
     ]
     path = _write_prices(tmp_path, lines)
@@ -179,4 +183,203 @@ def test_load_prices_reverse_common_quote_skip_double_cross(tmp_path):
 
     assert rates["USD"] == Decimal("1")
     assert rates["BTC"] == Decimal("200")
-    assert "ETH" not in rates
+    assert rates["ETH"] == Decimal("200000")
+    assert rates.paths["ETH"] == ["ETH", "BTC", "CRC", "USD"]
+
+    assert "ETH" not in r.load_prices_to_op(path, "USD", today, max_hops=2)
+
+
+# -----------------------------
+# PriceIndex
+# -----------------------------
+def test_price_index_latest_bisects_unsorted_input():
+    idx = r.PriceIndex()
+    idx.add(dt.date(2025, 2, 1), "USD", Decimal("2.0"), "CRC")
+    idx.add(dt.date(2025, 1, 1), "USD", Decimal("1.0"), "CRC")
+    idx.add(dt.date(2025, 1, 10), "USD", Decimal("1.5"), "CRC")
+    idx.add(dt.date(2025, 1, 10), "USD", Decimal("1.6"), "CRC")  # same day: later line wins
+
+    assert idx.latest("USD", "CRC", dt.date(2024, 12, 31)) is None
+    assert idx.latest("USD", "CRC", dt.date(2025, 1, 15)) == (dt.date(2025, 1, 10), Decimal("1.6"))
+    assert idx.latest("USD", "CRC", dt.date(2025, 2, 1)) == (dt.date(2025, 2, 1), Decimal("2.0"))
+    assert idx.latest("EUR", "CRC", dt.date(2025, 2, 1)) is None
+
+    idx.add(dt.date(2025, 1, 20), "USD", Decimal("1.8"), "CRC")  # invalidates the sorted series
+    assert idx.rate("USD", "CRC", dt.date(2025, 1, 25)) == Decimal("1.8")
+
+
+def test_price_index_rate_prefers_more_recent_of_direct_and_inverse():
+    idx = r.PriceIndex()
+    idx.add(dt.date(2025, 1, 1), "USD", Decimal("500"), "CRC")
+    idx.add(dt.date(2025, 1, 5), "CRC", Decimal("0.002"), "USD")  # newer inverse quote
+    assert idx.rate("USD", "CRC", dt.date(2025, 1, 3)) == Decimal("500")
+    assert idx.rate("USD", "CRC", dt.date(2025, 1, 6)) == Decimal("1") / Decimal("0.002")
+    assert idx.rate("CRC", "USD", dt.date(2025, 1, 3)) == Decimal("1") / Decimal("500")
+
+
+def test_rates_on_reuses_index_across_days(tmp_path):
+    path = _write_prices(tmp_path, [
+        "2025-01-01 price USD 500.00 CRC",
+        "2025-01-10 price USD 520.00 CRC",
+        "2025-01-12 price BTC 3.00 USD",   # newer line first in the file
+        "2025-01-05 price BTC 2.00 USD",
+    ])
+    idx = r.load_price_index(path)
+    assert r.rates_on(idx, "CRC", dt.date(2025, 1, 4)) == {"CRC": Decimal("1"), "USD": Decimal("500.00")}
+    assert r.rates_on(idx, "CRC", dt.date(2025, 1, 6))["BTC"] == Decimal("1000")
+    assert r.rates_on(idx, "CRC", dt.date(2025, 1, 15))["BTC"] == Decimal("1560")
+    assert r.rates_on(idx, "CRC", dt.date(2025, 1, 15)) == r.load_prices_to_op(path, "CRC", dt.date(2025, 1, 15))
+
+
+# -----------------------------
+# load_price_index (bulk parser)
+# -----------------------------
+@pytest.mark.parametrize("bad", [
+    "2025-04-01 price USD _ CRC",
+    "2025-04-04 price USD 1._23 CRC",
+    "2025-13-01 price USD 1.00 CRC",
+])
+@pytest.mark.parametrize("last", [False, True])
+def test_load_price_index_raises_like_parse_price_line(tmp_path, bad, last):
+    lines = ["2025-01-01 price USD 500 CRC", bad] + ([] if last else ["2025-01-02 price EUR 600 CRC"])
+    path = _write_prices(tmp_path, lines)
+    with open(path, encoding="utf-8") as f:
+        expected = None
+        for line in f:
+            try:
+                r._parse_price_line(line)
+            except PriceParseError as e:
+                expected = str(e)
+                break
+    with pytest.raises(PriceParseError) as exc:
+        r.load_price_index(path)
+    assert str(exc.value) == expected
+
+
+def test_load_price_index_keeps_amounts_lazy(tmp_path):
+    path = _write_prices(tmp_path, [
+        "2025-01-01 price USD 1_000.50 CRC\r",
+        "  2025-01-02 price USD 1_001 CRC  ; indented, trailing comment",
+        "; price history below is imported",
+        "2025-01-03 price EUR 600 CRC",
+    ])
+    idx = r.load_price_index(path)
+    assert idx._raw[("USD", "CRC")] == [(dt.date(2025, 1, 1), "1000.50"), (dt.date(2025, 1, 2), "1001")]
+
+    assert idx.latest("USD", "CRC", dt.date(2025, 1, 1)) == (dt.date(2025, 1, 1), Decimal("1000.50"))
+    _, values = idx._series[("USD", "CRC")]
+    assert values == [Decimal("1000.50"), "1001"]  # only the selected value was converted
+
+
+def test_load_price_index_mmap_path_matches_read(tmp_path, monkeypatch):
+    lines = [f"2025-01-{d:02d} price USD {500 + d}.25 CRC" for d in range(1, 29)] + ["2025-01-03 price BTC 2 USD"]
+    path = _write_prices(tmp_path, lines)
+    expected = r.load_prices_to_op(path, "CRC", dt.date(2025, 1, 20))
+    monkeypatch.setattr(r, "_MMAP_MIN_BYTES", 0)
+    r.clear_rate_cache()
+    assert r.load_prices_to_op(path, "CRC", dt.date(2025, 1, 20)) == expected
+    assert expected["BTC"] == Decimal("2") * Decimal("520.25")
+
+
+# -----------------------------
+# ConversionGraph
+# -----------------------------
+def test_conversion_graph_takes_shortest_chain_and_memoizes(tmp_path):
+    path = _write_prices(tmp_path, [
+        "2025-01-01 price USD 500 CRC",
+        "2025-01-01 price EUR 1.10 USD",
+        "2025-01-01 price GOLD 2000 EUR",    # GOLD -> EUR -> USD -> CRC
+        "2025-01-01 price GOLD 2300 USD",    # ... but GOLD -> USD -> CRC is shorter
+        "2025-01-01 price FUND 12 EUR",      # FUND -> EUR -> USD -> CRC
+        "2025-01-01 price DEEP 3 FUND",      # four hops
+        "2025-02-01 price LATE 7 USD",       # priced after the valuation day
+    ])
+    graph = r.ConversionGraph(r.load_price_index(path), dt.date(2025, 1, 15))
+    rates = graph.rates_to("CRC")
+
+    assert rates.paths["GOLD"] == ["GOLD", "USD", "CRC"]
+    assert rates["GOLD"] == Decimal("2300") * 500
+    assert rates["FUND"] == Decimal("12") * Decimal("1.10") * 500
+    assert rates.paths["DEEP"] == ["DEEP", "FUND", "EUR", "USD", "CRC"]
+    assert "LATE" not in rates
+
+    assert graph.rates_to("CRC") is rates
+    assert "DEEP" not in graph.rates_to("CRC", max_hops=3)
+    # any currency can be the target of the same graph
+    assert graph.rates_to("EUR")["CRC"] == Decimal("1") / 500 / Decimal("1.10")
+
+
+# -----------------------------
+# Process-wide rate cache
+# -----------------------------
+def test_load_prices_to_op_parses_unchanged_file_once(tmp_path, monkeypatch):
+    path = _write_prices(tmp_path, ["2025-01-01 price USD 500 CRC", "2025-01-01 price EUR 1.1 USD"])
+    parses = []
+    real = r.load_price_index
+    monkeypatch.setattr(r, "load_price_index", lambda p: parses.append(p) or real(p))
+
+    day = dt.date(2025, 1, 10)
+    first = r.load_prices_to_op(path, "CRC", day)
+    assert r.load_rate_matrix(path, day) is r.load_rate_matrix(path, day)
+    # another date or operating currency reuses the parsed file
+    assert r.load_prices_to_op(path, "USD", day)["CRC"] == Decimal("1") / 500
+    assert r.load_prices_to_op(path, "CRC", dt.date(2025, 1, 11)) == first
+    assert len(parses) == 1
+
+    # a changed file is parsed again
+    os.utime(path, ns=(0, 0))
+    assert r.load_prices_to_op(path, "CRC", day) == first
+    assert len(parses) == 2
+
+
+def test_load_prices_to_op_cache_is_bounded_lru(tmp_path, monkeypatch):
+    path = _write_prices(tmp_path, ["2025-01-01 price USD 500 CRC"])
+    monkeypatch.setattr(r, "_RATES_MAX", 2)
+    d1, d2, d3 = (dt.date(2025, 1, d) for d in (10, 11, 12))
+
+    m1 = r.load_rate_matrix(path, d1)
+    r.load_prices_to_op(path, "CRC", d2)
+    assert r.load_rate_matrix(path, d1) is m1           # d1 now most recently used
+    r.load_prices_to_op(path, "CRC", d3)                 # evicts d2
+    assert len(r._RATES) == 2
+    assert r.load_rate_matrix(path, d1) is m1
+    assert all(key[3] != d2 for key in r._RATES)
+
+
+# -----------------------------
+# RateMatrix
+# -----------------------------
+def test_rate_matrix_serves_every_operating_currency(tmp_path, monkeypatch):
+    path = _write_prices(tmp_path, [
+        "2025-01-01 price USD 500 CRC",
+        "2025-01-01 price EUR 1.25 USD",
+        "2025-01-01 price ZZZ 3 QQQ",        # separate component
+    ])
+    day = dt.date(2025, 1, 10)
+    matrix = r.load_rate_matrix(path, day)
+
+    assert set(matrix.currencies) == {"USD", "CRC", "EUR", "ZZZ", "QQQ"}
+    assert matrix.rate("EUR", "CRC") == Decimal("625")
+    assert matrix.rate("CRC", "EUR") == (Decimal("1") / 500) * (Decimal("1") / Decimal("1.25"))
+    assert matrix.rate("ZZZ", "QQQ") == Decimal("3") and matrix.rate("ZZZ", "CRC") is None
+    assert matrix.table("JPY") == {"JPY": Decimal("1")}
+
+    # switching the operating currency is a lookup in the cached matrix
+    monkeypatch.setattr(r, "rate_matrix", lambda *_: pytest.fail("matrix rebuilt"))
+    assert r.load_prices_to_op(path, "EUR", day) == matrix.table("EUR")
+    assert r.load_prices_to_op(path, "CRC", day)["EUR"] == Decimal("625")
+
+
+def test_rate_matrix_builds_rows_on_demand_and_callers_get_copies(tmp_path):
+    path = _write_prices(tmp_path, ["2025-01-01 price USD 500 CRC", "2025-01-01 price EUR 1.25 USD"])
+    day = dt.date(2025, 1, 10)
+    matrix = r.load_rate_matrix(path, day)
+    assert matrix._graph._tables == {}                  # no row computed up front
+
+    rates = r.load_prices_to_op(path, "CRC", day)
+    assert list(matrix._graph._tables) == [("CRC", r.MAX_HOPS)]
+    rates["EUR"] = Decimal("0")
+    rates.paths["EUR"] = ["EUR", "CRC"]
+    again = r.load_prices_to_op(path, "CRC", day)
+    assert again["EUR"] == Decimal("625")
+    assert again.paths["EUR"] == ["EUR", "USD", "CRC"]
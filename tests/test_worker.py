@@ -0,0 +1,159 @@
+import json
+import socketserver
+import threading
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+import fava_forecast.beancount_io as io
+import fava_forecast.worker as w
+from fava_forecast.errors import WorkerUnavailableError
+
+
+_LEDGER = """
+2025-01-01 open Assets:Bank
+2025-01-01 open Equity:Opening
+2025-01-01 * "Opening"
+  Assets:Bank     1000 CRC
+  Assets:Bank       10 BTC.X
+  Equity:Opening
+"""
+
+_Q = "SELECT currency, sum(position) WHERE account ~ '^Assets' GROUP BY currency"
+
+
+def _start(server):
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server
+
+
+@pytest.fixture
+def sock_path(tmp_path_factory):
+    # keep it short: AF_UNIX paths are limited to ~100 bytes
+    return str(tmp_path_factory.mktemp("w") / "q.sock")
+
+
+# -----------------------------
+# Client against a stand-in worker
+# -----------------------------
+class _StandIn(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, reply):
+        self.requests_seen = []
+        self.reply = reply
+        outer = self
+
+        class H(socketserver.StreamRequestHandler):
+            def handle(self):
+                outer.requests_seen.append(json.loads(self.rfile.readline()))
+                self.wfile.write((json.dumps(outer.reply) + "\n").encode("utf-8"))
+
+        super().__init__(path, H)
+
+
+def test_run_lines_uses_worker_when_available(monkeypatch, tmp_path, sock_path):
+    j = tmp_path / "main.bean"
+    j.write_text("", encoding="utf-8")
+    server = _start(_StandIn(sock_path, {"ok": True, "lines": ["USD 1 USD"], "warnings": ["w"]}))
+    monkeypatch.setenv(io.WORKER_ENV, sock_path)
+
+    def no_subprocess(*_a, **_k):
+        raise AssertionError("bean-query must not be spawned")
+
+    monkeypatch.setattr(io.subprocess, "run", no_subprocess)
+    try:
+        assert io.beanquery_run_lines(str(j), "Q") == (["USD 1 USD"], ["w"])
+        assert io.beanquery_run_csv(str(j), "Q") == (["USD 1 USD"], ["w"])
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [r["format"] for r in server.requests_seen] == ["text", "csv"]
+    assert server.requests_seen[0]["journal"] == str(j)
+
+
+def test_worker_error_reply_raises_runtime_error(sock_path):
+    server = _start(_StandIn(sock_path, {"ok": False, "error": "syntax error"}))
+    try:
+        with pytest.raises(RuntimeError, match="syntax error"):
+            io.worker_query(sock_path, "main.bean", "Q")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unreachable_worker_falls_back_to_subprocess(monkeypatch, tmp_path):
+    j = tmp_path / "main.bean"
+    j.write_text("", encoding="utf-8")
+    dead = tmp_path / "dead.sock"
+    dead.write_text("", encoding="utf-8")  # exists, but nobody listens
+    monkeypatch.setenv(io.WORKER_ENV, str(dead))
+
+    with pytest.raises(WorkerUnavailableError):
+        io.worker_query(str(dead), str(j), "Q")
+
+    monkeypatch.setattr(
+        io.subprocess,
+        "run",
+        lambda cmd, text=True, capture_output=True: SimpleNamespace(returncode=0, stdout="USD 1 USD\n", stderr=""),
+    )
+    assert io.beanquery_run_lines(str(j), "Q") == (["USD 1 USD"], [])
+
+
+# -----------------------------
+# Real worker server
+# -----------------------------
+def test_worker_server_answers_queries_and_reloads(tmp_path, sock_path):
+    j = tmp_path / "main.bean"
+    j.write_text(_LEDGER, encoding="utf-8")
+    server = _start(w.WorkerServer(sock_path))
+    try:
+        assert io.worker_request(sock_path, {"op": "ping"}) == {"ok": True}
+
+        lines, warns = io.worker_query(sock_path, str(j), _Q, "csv")
+        assert dict(io.beanquery_csv_amounts(lines)) == {"CRC": Decimal("1000"), "BTC.X": Decimal("10")}
+        assert warns == []
+
+        lines, _ = io.worker_query(sock_path, str(j), _Q, "text")
+        assert dict(io.beanquery_grouped_amounts(io.beanquery_table_body(lines)))["CRC"] == Decimal("1000")
+
+        # journal changes -> worker re-parses
+        j.write_text(_LEDGER.replace("1000 CRC", "2000 CRC"), encoding="utf-8")
+        lines, _ = io.worker_query(sock_path, str(j), _Q, "csv")
+        assert dict(io.beanquery_csv_amounts(lines))["CRC"] == Decimal("2000")
+
+        with pytest.raises(RuntimeError):
+            io.worker_request(sock_path, {"op": "nope"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_worker_server_refuses_live_socket_and_replaces_stale_one(tmp_path, sock_path):
+    import os
+    import socket
+
+    server = _start(w.WorkerServer(sock_path))
+    try:
+        assert os.stat(sock_path).st_mode & 0o777 == 0o600
+        with pytest.raises(OSError) as exc:
+            w.WorkerServer(sock_path)
+        assert exc.value.errno == w.errno.EADDRINUSE
+        assert io.worker_request(sock_path, {"op": "ping"}) == {"ok": True}   # still served
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    # a socket file nobody listens on is removed and re-bound
+    dead = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    dead.bind(sock_path)
+    dead.close()
+    server = _start(w.WorkerServer(sock_path))
+    try:
+        assert io.worker_request(sock_path, {"op": "ping"}) == {"ok": True}
+    finally:
+        server.shutdown()
+        server.server_close()